@@ -0,0 +1,78 @@
+"""Lịch đã đặt của tài sản dạng gọn: bitset (base64) hoặc các khoảng ngày liên tiếp.
+
+Bit thứ i (tính từ bit cao của byte đầu, như np.packbits) = ngày date_from + i đã có hợp đồng
+active. 1 năm = 46 byte -> 64 ký tự base64. Dữ liệu lấy bằng 1 query theo khoảng
+(index ix_contracts_property_status_dates), ngày bắt đầu / kết thúc tính sẵn thành số ngày trong
+SQL; mảng ngày dựng bằng mảng hiệu + cumsum, không lặp từng ngày.
+"""
+import base64
+from datetime import date, timedelta
+from typing import Dict, List, Sequence
+
+import numpy as np
+from sqlalchemy import select
+
+from . import models
+from .occupancy import day_offset
+
+# Khoảng ngày tối đa của 1 lịch (3 năm) và số tài sản tối đa trong 1 request
+MAX_CALENDAR_DAYS = 1096
+MAX_CALENDAR_PROPERTIES = 500
+DEFAULT_CALENDAR_DAYS = 365
+
+
+def booked_query(property_ids: Sequence[int], date_from: date, date_to: date, dialect: str):
+    contract = models.Contract
+    return select(
+        contract.property_id,
+        day_offset(contract.start_date, date_from, dialect),
+        day_offset(contract.end_date, date_from, dialect),
+    ).where(
+        contract.property_id.in_(property_ids),
+        contract.status == "active",
+        contract.start_date <= date_to,
+        contract.end_date >= date_from,
+    )
+
+
+def booked_days(property_ids: Sequence[int], days: int, rows: Sequence[tuple]) -> np.ndarray:
+    """Ma trận bool (số tài sản x số ngày) từ các dòng (property_id, ngày đầu, ngày cuối) của booked_query"""
+    index = {property_id: i for i, property_id in enumerate(property_ids)}
+    if not rows:
+        return np.zeros((len(property_ids), days), dtype=bool)
+    rows_idx = np.fromiter((index[row[0]] for row in rows), dtype=np.int64, count=len(rows))
+    low = np.clip(np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows)), 0, days)
+    high = np.clip(np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows)), -1, days - 1) + 1
+
+    width = days + 1
+    size = len(property_ids) * width
+    diff = (np.bincount(rows_idx * width + low, minlength=size)
+            - np.bincount(rows_idx * width + np.maximum(high, low), minlength=size))
+    return np.cumsum(diff.reshape(len(property_ids), width), axis=1)[:, :days] > 0
+
+
+def to_bitset(booked: np.ndarray) -> str:
+    return base64.b64encode(np.packbits(booked).tobytes()).decode("ascii")
+
+
+def to_ranges(booked: np.ndarray, date_from: date) -> List[List[date]]:
+    """[[ngày đầu, ngày cuối], ...] của các đoạn ngày đã đặt liên tiếp (hợp đồng nối nhau gộp thành 1 đoạn)"""
+    edges = np.flatnonzero(np.diff(np.r_[0, booked.astype(np.int8), 0]))
+    return [
+        [date_from + timedelta(days=int(start)), date_from + timedelta(days=int(end) - 1)]
+        for start, end in zip(edges[::2], edges[1::2])
+    ]
+
+
+def build(property_ids: Sequence[int], date_from: date, date_to: date, rows: Sequence[tuple], fmt: str) -> List[Dict]:
+    days = (date_to - date_from).days + 1
+    matrix = booked_days(property_ids, days, rows)
+    calendars = []
+    for property_id, booked in zip(property_ids, matrix):
+        item = {"property_id": property_id, "booked_days": int(booked.sum())}
+        if fmt == "bitset":
+            item["bitset"] = to_bitset(booked)
+        else:
+            item["ranges"] = to_ranges(booked, date_from)
+        calendars.append(item)
+    return calendars
@@ -0,0 +1,188 @@
+"""Xuất hóa đơn từng kỳ cho hợp đồng thuê theo tháng.
+
+Mỗi hợp đồng monthly được chia thành N kỳ (N = pricing.rental_months), kỳ thứ k đến hạn
+vào ngày bắt đầu + k tháng. Số tiền chia kỳ = total_price - deposit: tiền cọc đã được ghi
+thành thanh toán lúc tạo hợp đồng (và tính vào "đã trả") nên không xuất hóa đơn lần nữa.
+Cột contracts.next_invoice_date là hạn của kỳ kế tiếp chưa xuất, nên mỗi lần chạy chỉ quét
+các hợp đồng có kỳ đến hạn (index ix_contracts_next_invoice).
+
+Chạy theo lô: mỗi lô 1 transaction gồm 1 SELECT, 1 INSERT nhiều dòng
+(ON CONFLICT DO NOTHING) và 1 UPDATE next_invoice_date. Lô đã commit thì không chạy lại,
+bị ngắt giữa chừng thì chạy lại tiếp từ lô đó; unique (contract_id, installment) chặn trùng.
+
+    python -m app.billing run                     # xuất các kỳ đến hạn trong BILLING_LEAD_DAYS ngày tới
+    python -m app.billing run --as-of 2026-01-31
+"""
+import argparse
+import calendar
+import os
+import time
+from datetime import date, timedelta
+from typing import Iterator, Optional, Tuple
+
+from sqlalchemy import bindparam, select, update
+
+from . import jobs, models, versioning
+from .database import dialect_insert
+from .pricing import rental_months
+
+JOB_NAME = "billing"
+
+# Số hợp đồng mỗi lô
+BILLING_BATCH = int(os.getenv("BILLING_BATCH", "5000"))
+# Xuất trước hóa đơn các kỳ đến hạn trong số ngày này
+BILLING_LEAD_DAYS = int(os.getenv("BILLING_LEAD_DAYS", "7"))
+# Giờ (0-23, giờ server) chạy hằng ngày ngay trong process web; để trống nếu đã chạy bằng cron
+_schedule_hour = os.getenv("BILLING_SCHEDULE_HOUR", "")
+BILLING_SCHEDULE_HOUR = int(_schedule_hour) if _schedule_hour else None
+
+_contracts = models.Contract.__table__
+_invoices = models.Invoice.__table__
+
+
+def add_months(day: date, months: int) -> date:
+    """31/01 + 1 tháng -> 28/02 (hoặc 29/02)"""
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def installment_number(start_date: date, due_date: date) -> int:
+    """Kỳ có hạn thanh toán due_date (kỳ 1 đến hạn đúng ngày bắt đầu)"""
+    return (due_date.year - start_date.year) * 12 + due_date.month - start_date.month + 1
+
+
+def installments(start_date: date, end_date: date, total_price: float, deposit: float = 0,
+                 first: int = 1) -> Iterator[Tuple[int, date, float]]:
+    """Lần lượt (kỳ, hạn thanh toán, số tiền) từ kỳ `first`; kỳ cuối nhận phần lẻ để tổng đúng bằng
+    total_price - deposit. Cọc >= tổng tiền thì không còn kỳ nào phải xuất."""
+    count = rental_months(start_date, end_date)
+    total = max((total_price or 0) - (deposit or 0), 0)
+    if total <= 0:
+        return
+    amount = round(total / count, 2)
+    for number in range(first, count + 1):
+        yield number, add_months(start_date, number - 1), amount if number < count else round(total - amount * (count - 1), 2)
+
+
+def first_invoice_date(rental_type: Optional[str], start_date: date) -> Optional[date]:
+    """Giá trị next_invoice_date khi tạo hợp đồng"""
+    return start_date if rental_type == "monthly" else None
+
+
+def bill_batch(conn, horizon: date, batch_size: int) -> Tuple[int, int]:
+    """Xuất hóa đơn cho 1 lô hợp đồng có kỳ đến hạn <= horizon. Trả về (số hợp đồng, số hóa đơn mới)"""
+    rows = conn.execute(
+        select(
+            _contracts.c.id, _contracts.c.start_date, _contracts.c.end_date,
+            _contracts.c.total_price, _contracts.c.deposit, _contracts.c.next_invoice_date
+        ).where(
+            _contracts.c.next_invoice_date <= horizon,
+            _contracts.c.rental_type == "monthly",
+            # Hợp đồng đã hết hạn (sweeper.py) vẫn phải xuất nốt các kỳ chưa xuất
+            _contracts.c.status.in_(("active", "completed")),
+        ).order_by(_contracts.c.next_invoice_date, _contracts.c.id).limit(batch_size)
+        # 2 lần chạy song song (VD: 2 worker) chia nhau các hợp đồng thay vì chờ khóa
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        return 0, 0
+
+    invoices, updates = [], []
+    for row in rows:
+        next_date = None
+        first = installment_number(row.start_date, row.next_invoice_date)
+        for number, due_date, amount in installments(row.start_date, row.end_date, row.total_price, row.deposit, first):
+            if due_date > horizon:
+                next_date = due_date
+                break
+            invoices.append({
+                "contract_id": row.id, "installment": number, "due_date": due_date,
+                "amount": amount, "status": "open",
+            })
+        updates.append({"row_id": row.id, "next_date": next_date})
+
+    created = 0
+    if invoices:
+        created = len(conn.execute(
+            dialect_insert(conn)(_invoices)
+            .on_conflict_do_nothing(index_elements=["contract_id", "installment"])
+            .returning(_invoices.c.id),
+            invoices
+        ).all())
+    # Hợp đồng đã có hóa đơn trong DB cũng phải bị loại khỏi các lô sau
+    conn.execute(
+        update(_contracts).where(_contracts.c.id == bindparam("row_id"))
+        .values(next_invoice_date=bindparam("next_date")),
+        updates
+    )
+    return len(rows), created
+
+
+def run(engine, as_of: Optional[date] = None, batch_size: int = BILLING_BATCH,
+        lead_days: int = BILLING_LEAD_DAYS) -> dict:
+    """Xuất mọi kỳ đến hạn trước as_of + lead_days; an toàn khi chạy lại hoặc chạy tiếp sau khi bị ngắt"""
+    as_of = as_of or date.today()
+    horizon = as_of + timedelta(days=lead_days)
+    started = time.perf_counter()
+
+    run_id = jobs.start_run(engine, JOB_NAME, as_of)
+
+    processed = created = batches = 0
+    try:
+        while True:
+            with engine.begin() as conn:
+                count, new_invoices = bill_batch(conn, horizon, batch_size)
+            if new_invoices:
+                # Sau commit của lô, transaction riêng: không giữ khóa dòng version suốt lô
+                versioning.bump_committed(engine, ["invoices"])
+            if not count:
+                break
+            processed, created, batches = processed + count, created + new_invoices, batches + 1
+    except Exception as e:
+        jobs.finish_run(engine, run_id, "failed", processed, created, error=str(e))
+        raise
+
+    seconds = round(time.perf_counter() - started, 3)
+    jobs.finish_run(engine, run_id, "done", processed, created, metrics={"batches": batches, "seconds": seconds})
+    return {
+        "run_id": run_id, "as_of": as_of.isoformat(), "horizon": horizon.isoformat(),
+        "contracts": processed, "invoices_created": created, "batches": batches,
+        "seconds": seconds,
+    }
+
+
+async def schedule_daily(engine, hour: int):
+    """Vòng lặp nền: chạy run() mỗi ngày lúc `hour` giờ. Nhiều worker cùng chạy vẫn an toàn
+    (SKIP LOCKED + unique constraint), chỉ tốn thêm vài query rỗng."""
+    await jobs.run_daily(engine, JOB_NAME, hour, lambda: run(engine))
+
+
+def overdue_query(as_of: Optional[date] = None):
+    """Hóa đơn chưa thanh toán đã quá hạn (dùng index một phần ix_invoices_open_due)"""
+    return select(models.Invoice).where(
+        models.Invoice.status == "open",
+        models.Invoice.due_date < (as_of or date.today())
+    )
+
+
+def main():
+    import json
+
+    from .database import engine
+    from .migrations import migrate
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["run"])
+    parser.add_argument("--as-of", type=date.fromisoformat)
+    parser.add_argument("--batch-size", type=int, default=BILLING_BATCH)
+    parser.add_argument("--lead-days", type=int, default=BILLING_LEAD_DAYS)
+    args = parser.parse_args()
+
+    migrate(engine)
+    report = run(engine, args.as_of, args.batch_size, args.lead_days)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
+import asyncio
 import os
+import threading
+import time
 from dotenv import load_dotenv
+from fastapi import Request
 from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 # Load từ .env file (chỉ tác dụng ở Localhost)
 load_dotenv()
@@ -30,24 +38,264 @@ else:
     DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     print("🏠 Đang sử dụng cấu hình Localhost.")
 
+# 4. (Tùy chọn) DB replica chỉ đọc, dùng cho các endpoint GET
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+if DATABASE_READ_URL and DATABASE_READ_URL.startswith("postgres://"):
+    DATABASE_READ_URL = DATABASE_READ_URL.replace("postgres://", "postgresql://", 1)
+
+# =======================================================
+# CẤU HÌNH POOL KẾT NỐI (chỉnh bằng biến môi trường)
+# =======================================================
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+POOL_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))          # giây chờ lấy kết nối
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))          # giây, tránh kết nối bị DB/proxy cắt ngầm
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Số kết nối mở sẵn cho mỗi pool lúc khởi động (request đầu tiên không phải chờ TCP/TLS + xác thực)
+POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", "2"))
+
+# Sau khi ghi, client gửi lại X-Read-Your-Writes trong khoảng này thì đọc từ primary (replica có thể trễ)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+
+class PoolStats:
+    """Đếm số lần lấy kết nối, thời gian chờ và số lần hết thời gian chờ của 1 pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            return {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+                "max_overflow": POOL_MAX_OVERFLOW,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+class _TimedPoolMixin:
+    """Đo thời gian lấy kết nối (gồm cả thời gian xếp hàng khi pool đã hết)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return connection
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url, is_async: bool = False) -> dict:
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}  # SQLite in-memory không dùng QueuePool
+    return {
+        "poolclass": TimedAsyncQueuePool if is_async else TimedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": POOL_MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+
+
 # =======================================================
 # KẾT NỐI
 # =======================================================
 try:
-    engine = create_engine(DATABASE_URL)
+    engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
     print("✅ Database connected successfully!")
 except Exception as e:
     print(f"❌ Database connection failed: {e}")
     # Không raise lỗi ngay để tránh sập app khi import, nhưng log ra để biết
     pass
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+read_engine = engine
+if DATABASE_READ_URL:
+    read_engine = create_engine(DATABASE_READ_URL, **engine_options(DATABASE_READ_URL))
+    print("📖 Đọc dữ liệu từ replica (DATABASE_READ_URL).")
+
+# =======================================================
+# KẾT NỐI ASYNC (asyncpg) CHO CÁC ENDPOINT async def
+# =======================================================
+# Driver async tương ứng với từng loại DB
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str):
+    """postgresql://... -> postgresql+asyncpg://... (asyncpg không hiểu tham số sslmode của libpq)"""
+    parsed = make_url(url)
+    connect_args = {}
+    sslmode = parsed.query.get("sslmode")
+    if sslmode:
+        parsed = parsed.difference_update_query(["sslmode"])
+        connect_args["ssl"] = sslmode
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername)
+    return parsed.set(drivername=driver), connect_args
+
+
+def make_async_engine(url: str):
+    async_url, connect_args = to_async_url(url)
+    return create_async_engine(async_url, connect_args=connect_args, **engine_options(url, is_async=True))
+
+
+async_engine = async_read_engine = None
+try:
+    async_engine = make_async_engine(DATABASE_URL)
+    async_read_engine = make_async_engine(DATABASE_READ_URL) if DATABASE_READ_URL else async_engine
+except Exception as e:
+    # VD: chưa cài asyncpg / aiosqlite -> các endpoint async sẽ lỗi, endpoint sync vẫn chạy
+    print(f"❌ Async database engine failed: {e}")
+
+
+class AppSession(Session):
+    """Lớp Session chung cho cả sync lẫn async (AsyncSession bọc bên ngoài),
+    để các event listener (versioning, feed) chỉ cần đăng ký 1 lần"""
+
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AppSession)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine, class_=AppSession)
+
+# expire_on_commit=False: sau commit vẫn đọc được thuộc tính mà không phải lazy load (không được phép khi async)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False, sync_session_class=AppSession
+)
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine, autoflush=False, expire_on_commit=False, sync_session_class=AppSession
+)
 
 Base = declarative_base()
 
+
+def write_token() -> str:
+    """Gửi kèm response của request ghi (header X-Write-Token)"""
+    return str(int(time.time() * 1000))
+
+
+def wants_primary(request: Request) -> bool:
+    """Client vừa ghi xong (gửi lại X-Read-Your-Writes còn mới) -> đọc từ primary"""
+    token = request.headers.get("x-read-your-writes", "")
+    if not token.isdigit():
+        return False
+    return time.time() * 1000 - int(token) < READ_YOUR_WRITES_SECONDS * 1000
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def get_read_db(request: Request):
+    """Session chỉ đọc: replica nếu có cấu hình, trừ khi client cần thấy ngay dữ liệu vừa ghi"""
+    db = SessionLocal() if wants_primary(request) else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db(request: Request):
+    factory = AsyncSessionLocal if wants_primary(request) else AsyncReadSessionLocal
+    async with factory() as db:
+        yield db
+
+
+def pool_status() -> dict:
+    """Trạng thái + thống kê của từng pool kết nối"""
+    engines = {"primary": engine, "primary_async": async_engine and async_engine.sync_engine}
+    if DATABASE_READ_URL:
+        engines["replica"] = read_engine
+        engines["replica_async"] = async_read_engine and async_read_engine.sync_engine
+    return {
+        name: item.pool.stats.snapshot(item.pool)
+        for name, item in engines.items()
+        if item is not None and hasattr(item.pool, "stats")
+    }
+
+
+def warm_up_pools(count: int = POOL_WARMUP):
+    """Mở sẵn `count` kết nối cho mỗi pool sync rồi trả lại pool"""
+    for item in {engine, read_engine}:
+        conns = []
+        try:
+            for _ in range(min(count, POOL_SIZE)):
+                conn = item.connect()
+                conns.append(conn)
+                conn.exec_driver_sql("SELECT 1")
+        finally:
+            for conn in conns:
+                conn.close()
+
+
+async def warm_up_async_pools(count: int = POOL_WARMUP):
+    """Như warm_up_pools cho các pool async, mở các kết nối song song"""
+    for item in {async_engine, async_read_engine} - {None}:
+        opened = await asyncio.gather(
+            *(item.connect().start() for _ in range(min(count, POOL_SIZE))), return_exceptions=True
+        )
+        errors = [conn for conn in opened if isinstance(conn, BaseException)]
+        for conn in opened:
+            if not isinstance(conn, BaseException):
+                await conn.close()
+        if errors:
+            raise errors[0]
+
+
+async def dispose_engines():
+    for item in {async_engine, async_read_engine} - {None}:
+        await item.dispose()
+    for item in {engine, read_engine}:
+        item.dispose()
+
+
+def dialect_insert(bind):
+    """insert() hỗ trợ ON CONFLICT theo dialect đang dùng (PostgreSQL / SQLite)"""
+    if bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert
@@ -0,0 +1,106 @@
+"""Render văn bản hợp đồng (HTML) từ template biên dịch sẵn, có cache theo phiên bản nội dung."""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Tuple
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from sqlalchemy.orm import Session, joinedload
+
+from . import models
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+
+# Số văn bản giữ trong cache (LRU)
+CACHE_SIZE = int(os.getenv("DOCUMENT_CACHE_SIZE", "512"))
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(["html"]),
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+_env.filters["money"] = lambda value: f"{value:,.0f}"
+
+# Biên dịch 1 lần khi import module, các request sau chỉ render
+CONTRACT_TEMPLATE = _env.get_template("contract.html")
+
+# Sửa template thì mọi phiên bản cũ (cache, ETag, file PDF) đều hết hiệu lực
+with open(CONTRACT_TEMPLATE.filename, "rb") as _f:
+    TEMPLATE_HASH = hashlib.sha256(_f.read()).hexdigest()[:12]
+
+_cache: "OrderedDict[str, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def contract_query(db: Session):
+    """Hợp đồng + tài sản + khách thuê + thanh toán trong 1 query (JOIN)"""
+    return db.query(models.Contract).options(
+        joinedload(models.Contract.property),
+        joinedload(models.Contract.tenant),
+        joinedload(models.Contract.payments),
+    )
+
+
+def load_contract(db: Session, contract_id: int) -> Optional[models.Contract]:
+    return contract_query(db).filter(models.Contract.id == contract_id).first()
+
+
+def _sorted_payments(contract: models.Contract) -> list:
+    return sorted(contract.payments, key=lambda p: p.id)
+
+
+def contract_version(contract: models.Contract) -> str:
+    """Hash mọi dữ liệu có trên văn bản -> đổi dữ liệu là đổi phiên bản (dùng làm ETag)"""
+    prop, tenant = contract.property, contract.tenant
+    content = [
+        TEMPLATE_HASH,
+        [contract.id, contract.status, contract.start_date, contract.end_date,
+         contract.total_price, contract.deposit],
+        [prop.id, prop.name, prop.address, prop.category, prop.price, prop.status],
+        [tenant.id, tenant.full_name, tenant.username, tenant.email],
+        [[p.id, p.payment_date, p.note, p.amount] for p in _sorted_payments(contract)],
+    ]
+    raw = json.dumps(content, default=str, ensure_ascii=False).encode()
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+def render_contract(contract: models.Contract) -> Tuple[str, str]:
+    """Trả về (version, html); cùng version thì lấy lại bản đã render"""
+    version = contract_version(contract)
+    with _cache_lock:
+        html = _cache.get(version)
+        if html is not None:
+            _cache.move_to_end(version)
+            return version, html
+
+    payments = _sorted_payments(contract)
+    paid = sum(p.amount for p in payments)
+    html = CONTRACT_TEMPLATE.render(
+        contract=contract,
+        prop=contract.property,
+        tenant=contract.tenant,
+        payments=payments,
+        paid=paid,
+        remaining=contract.total_price - paid,
+        rendered_at=datetime.now(),
+    )
+
+    with _cache_lock:
+        _cache[version] = html
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return version, html
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """So khớp header If-None-Match (có thể là danh sách, có thể có W/)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in candidates
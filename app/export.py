@@ -0,0 +1,106 @@
+"""Xuất dữ liệu (CSV / NDJSON, tùy chọn gzip) theo dạng stream.
+
+Dùng server-side cursor (yield_per) nên bộ nhớ không phụ thuộc số dòng,
+và gửi dòng tiêu đề ngay trước khi query chạy xong.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+
+from . import models
+from .database import ReadSessionLocal
+
+# Số dòng lấy từ cursor mỗi lần (cũng là kích thước 1 chunk gửi đi)
+YIELD_PER = 2000
+
+EXPORTS = {
+    "contracts": [
+        models.Contract.id, models.Contract.property_id, models.Contract.tenant_id,
+        models.Contract.start_date, models.Contract.end_date, models.Contract.total_price,
+        models.Contract.deposit, models.Contract.status, models.Contract.created_at,
+    ],
+    "payments": [
+        models.Payment.id, models.Payment.contract_id, models.Payment.amount,
+        models.Payment.payment_date, models.Payment.note, models.Payment.is_paid,
+    ],
+    "damages": [
+        models.DamageReport.id, models.DamageReport.contract_id, models.DamageReport.property_id,
+        models.DamageReport.description, models.DamageReport.severity, models.DamageReport.repair_cost,
+        models.DamageReport.status, models.DamageReport.reported_date, models.DamageReport.repaired_date,
+        models.DamageReport.created_at,
+    ],
+}
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def build_query(kind: str, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    columns = EXPORTS[kind]
+    stmt = select(*columns)
+
+    if kind == "contracts":
+        # Giống bộ lọc của /contracts/: hợp đồng giao với khoảng ngày
+        if date_from:
+            stmt = stmt.where(models.Contract.end_date >= date_from)
+        if date_to:
+            stmt = stmt.where(models.Contract.start_date <= date_to)
+    else:
+        date_column = models.Payment.payment_date if kind == "payments" else models.DamageReport.reported_date
+        if date_from:
+            stmt = stmt.where(date_column >= date_from)
+        if date_to:
+            stmt = stmt.where(date_column <= date_to)
+
+    return stmt.order_by(columns[0])
+
+
+def _format_chunks(kind: str, rows: Iterator, fmt: str) -> Iterator[str]:
+    names = [column.key for column in EXPORTS[kind]]
+    buffer = io.StringIO()
+
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        yield buffer.getvalue()
+        for partition in rows:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(partition)
+            yield buffer.getvalue()
+    else:
+        for partition in rows:
+            yield "".join(
+                json.dumps(dict(zip(names, row)), ensure_ascii=False, default=str) + "\n"
+                for row in partition
+            )
+
+
+def stream_export(kind: str, fmt: str = "csv", date_from: Optional[date] = None,
+                  date_to: Optional[date] = None, compress: bool = False) -> Iterator[bytes]:
+    """Generator trả về từng chunk bytes; tự mở/đóng session vì chạy sau khi endpoint đã return"""
+    gzip = zlib.compressobj(wbits=31) if compress else None  # wbits=31 -> định dạng gzip
+
+    def rows():
+        db = ReadSessionLocal()  # xuất dữ liệu lớn -> đọc từ replica nếu có
+        try:
+            result = db.execute(build_query(kind, date_from, date_to).execution_options(yield_per=YIELD_PER))
+            for partition in result.partitions():
+                yield partition
+        finally:
+            db.close()
+
+    for chunk in _format_chunks(kind, rows(), fmt):
+        data = chunk.encode("utf-8")
+        if gzip:
+            # SYNC_FLUSH để client nhận được dữ liệu ngay, không đợi bộ nén đầy
+            data = gzip.compress(data) + gzip.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+
+    if gzip:
+        yield gzip.flush()
@@ -0,0 +1,263 @@
+"""Luồng sự kiện thay đổi (change feed) đẩy xuống trình duyệt qua Server-Sent Events.
+
+- Handler ghi dữ liệu gọi publish() -> 1 dòng change_events trong cùng transaction.
+- id của sự kiện là resume token: client kết nối lại với Last-Event-ID chỉ nhận phần bị lỡ.
+- Nhiều worker uvicorn: PostgreSQL LISTEN/NOTIFY đánh thức mọi worker ngay khi có commit.
+  DB khác (SQLite...): báo thức trong process + định kỳ đọc lại bảng (POLL_INTERVAL).
+- Mỗi worker chỉ có 1 vòng đọc DB (_pump), các client dùng chung buffer trong RAM.
+
+2 transaction có thể commit ngược thứ tự id (id cấp lúc INSERT, không phải lúc commit). Vòng đọc
+nhớ các id bị nhảy qua (gap) và đọc lại chúng ở các lượt sau, tới khi xuất hiện hoặc quá
+FEED_GAP_SECONDS (transaction rollback không bao giờ lấp gap). Buffer xếp theo thứ tự nhận
+được, client đang kết nối đi theo thứ tự đó nên vẫn nhận sự kiện id nhỏ đến muộn. Client
+nối lại bằng Last-Event-ID chỉ nhận id lớn hơn, nhưng luôn tải lại đầy đủ khi kết nối lại.
+"""
+import asyncio
+import json
+import os
+import select
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Iterable, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, event, func, or_, text
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import AppSession, SessionLocal, engine
+
+CHANNEL = "rental_changes"
+POLL_INTERVAL = float(os.getenv("FEED_POLL_INTERVAL", "2"))
+KEEPALIVE_SECONDS = 15
+BUFFER_SIZE = 2000
+CATCH_UP_BATCH = 500
+RETENTION_DAYS = int(os.getenv("FEED_RETENTION_DAYS", "7"))
+# Thời gian chờ 1 id bị nhảy qua (transaction chưa commit) trước khi coi như đã rollback
+GAP_SECONDS = float(os.getenv("FEED_GAP_SECONDS", "60"))
+MAX_GAPS = 1000
+
+
+def publish(db: Session, event_type: str, entity_id: int, contract_id: Optional[int] = None, **data):
+    """Ghi sự kiện vào transaction hiện tại (commit cùng dữ liệu, rollback thì mất theo)"""
+    db.add(models.ChangeEvent(
+        event_type=event_type,
+        entity_id=entity_id,
+        contract_id=contract_id,
+        payload=json.dumps(data, default=str, ensure_ascii=False),
+    ))
+
+
+def to_message(change: models.ChangeEvent) -> dict:
+    return {
+        "id": change.id,
+        "type": change.event_type,
+        "entity_id": change.entity_id,
+        "contract_id": change.contract_id,
+        "data": json.loads(change.payload or "{}"),
+    }
+
+
+def load_events_after(last_id: int, limit: int = CATCH_UP_BATCH, gaps: Iterable[int] = ()) -> List[dict]:
+    """Sự kiện có id > last_id, cộng các id trong `gaps` (đã bị nhảy qua, có thể vừa commit muộn)"""
+    condition = models.ChangeEvent.id > last_id
+    gaps = list(gaps)
+    if gaps:
+        condition = or_(condition, models.ChangeEvent.id.in_(gaps))
+    db = SessionLocal()
+    try:
+        rows = db.query(models.ChangeEvent).filter(condition).order_by(models.ChangeEvent.id).limit(limit).all()
+        return [to_message(row) for row in rows]
+    finally:
+        db.close()
+
+
+def oldest_and_latest_id() -> tuple:
+    db = SessionLocal()
+    try:
+        return db.query(func.min(models.ChangeEvent.id), func.max(models.ChangeEvent.id)).one()
+    finally:
+        db.close()
+
+
+def prune(db: Session, keep_days: int = RETENTION_DAYS) -> int:
+    """Xóa sự kiện cũ (client lỡ quá thời gian này sẽ nhận 'reset' và tải lại toàn bộ)"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=keep_days)
+    result = db.execute(delete(models.ChangeEvent).where(models.ChangeEvent.created_at < cutoff))
+    return result.rowcount
+
+
+async def wait_event(flag: asyncio.Event, timeout: float) -> bool:
+    """Chờ Event có timeout; dùng asyncio.wait vì wait_for (<3.12) có thể nuốt lệnh cancel"""
+    waiter = asyncio.ensure_future(flag.wait())
+    try:
+        done, _ = await asyncio.wait({waiter}, timeout=timeout)
+        return bool(done)
+    finally:
+        waiter.cancel()
+
+
+def format_sse(message: dict) -> str:
+    return f"id: {message['id']}\nevent: {message['type']}\ndata: {json.dumps(message, ensure_ascii=False)}\n\n"
+
+
+class ChangeFeed:
+    def __init__(self):
+        # (seq, message): seq = thứ tự nhận được, tăng dần kể cả khi id đến không theo thứ tự
+        self.buffer: deque = deque(maxlen=BUFFER_SIZE)
+        self.seq = 0
+        self.last_id = 0
+        # id bị nhảy qua -> thời điểm phát hiện
+        self._gaps: "OrderedDict[int, float]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._new_data: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    # ---------- Vòng đọc DB dùng chung ----------
+    async def start(self):
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._stop.clear()
+        self._wakeup = asyncio.Event()
+        self._new_data = asyncio.Event()
+        _, latest = await run_in_threadpool(oldest_and_latest_id)
+        self.last_id = latest or 0
+        self._task = asyncio.create_task(self._pump())
+
+        if engine.dialect.name == "postgresql":
+            threading.Thread(target=self._listen_postgres, name="feed-listener", daemon=True).start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def notify_threadsafe(self):
+        """Gọi từ thread bất kỳ (sau commit / khi có NOTIFY) để đánh thức vòng đọc"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _pump(self):
+        while True:
+            await wait_event(self._wakeup, POLL_INTERVAL)
+            self._wakeup.clear()
+
+            try:
+                messages = await run_in_threadpool(load_events_after, self.last_id, BUFFER_SIZE, list(self._gaps))
+            except Exception as e:
+                print(f"⚠️  Change feed đọc DB lỗi: {e}")
+                continue
+            self._receive(messages)
+            if messages:
+                # Đổi Event mới để các client đang chờ cùng thức dậy
+                self._new_data.set()
+                self._new_data = asyncio.Event()
+
+    def _receive(self, messages: List[dict]):
+        now = time.monotonic()
+        for message in messages:
+            event_id = message["id"]
+            self._gaps.pop(event_id, None)
+            if event_id > self.last_id:
+                # Các id ở giữa: transaction còn đang chạy (hoặc đã rollback)
+                for missing in range(max(self.last_id + 1, event_id - MAX_GAPS), event_id):
+                    self._gaps[missing] = now
+                self.last_id = event_id
+            self.seq += 1
+            self.buffer.append((self.seq, message))
+        while self._gaps and (len(self._gaps) > MAX_GAPS or next(iter(self._gaps.values())) < now - GAP_SECONDS):
+            self._gaps.popitem(last=False)
+
+    def _listen_postgres(self):
+        """Thread riêng giữ 1 kết nối LISTEN, mỗi NOTIFY -> đánh thức vòng đọc"""
+        dialect = engine.dialect
+        while not self._stop.is_set():
+            conn = None
+            try:
+                cargs, cparams = dialect.create_connect_args(engine.url)
+                conn = dialect.loaded_dbapi.connect(*cargs, **cparams)
+                conn.autocommit = True
+                conn.cursor().execute(f"LISTEN {CHANNEL}")
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        self.notify_threadsafe()
+            except Exception as e:
+                print(f"⚠️  LISTEN {CHANNEL} lỗi, thử lại sau: {e}")
+                self._stop.wait(5)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    # ---------- Phía client ----------
+    async def subscribe(self, since: Optional[int]) -> AsyncIterator[Optional[dict]]:
+        """Sinh lần lượt sự kiện có id > since; None = đến lúc gửi keepalive"""
+        await self.start()
+        cursor = None  # seq của sự kiện cuối đã gửi; None = đang đọc bù từ DB theo id
+        if since is None:
+            since, cursor = self.last_id, self.seq
+        elif since > 0:
+            oldest, _ = await run_in_threadpool(oldest_and_latest_id)
+            if oldest is None or since < oldest - 1:
+                # Resume token đã bị dọn khỏi DB -> client phải tải lại toàn bộ
+                yield {"id": since, "type": "reset", "entity_id": None, "contract_id": None, "data": {}}
+
+        while True:
+            if cursor is not None and self.buffer and cursor < self.buffer[0][0] - 1:
+                cursor = None  # client chậm, buffer đã trôi qua phần chưa gửi
+            if cursor is None and (since >= self.last_id or (self.buffer and since >= self.buffer[0][1]["id"] - 1)):
+                # Buffer đã có đủ phần sau `since` -> đi theo thứ tự nhận của buffer từ đây
+                pending = [seq for seq, message in self.buffer if message["id"] > since]
+                cursor = pending[0] - 1 if pending else self.seq
+
+            if cursor is not None:
+                messages = [message for seq, message in self.buffer if seq > cursor]
+                cursor = self.seq
+            else:
+                seq = self.seq
+                messages = await run_in_threadpool(load_events_after, since)
+                if not messages:
+                    # Phần sau `since` đã bị dọn / rollback -> đi theo buffer từ lúc đọc (không query liên tục)
+                    cursor = seq
+
+            for message in messages:
+                since = max(since, message["id"])
+                yield message
+
+            if cursor == self.seq and not await wait_event(self._new_data, KEEPALIVE_SECONDS):
+                yield None
+
+
+change_feed = ChangeFeed()
+
+
+def _after_flush(session: Session, flush_context):
+    if not any(isinstance(obj, models.ChangeEvent) for obj in session.new):
+        return
+    if engine.dialect.name == "postgresql":
+        # NOTIFY trong transaction chỉ được gửi đi khi commit
+        session.connection().execute(text("SELECT pg_notify(:channel, '')"), {"channel": CHANNEL})
+    session.info["feed_published"] = True
+
+
+def _after_commit(session: Session):
+    if session.info.pop("feed_published", False):
+        change_feed.notify_threadsafe()
+
+
+def _after_rollback(session: Session):
+    session.info.pop("feed_published", None)
+
+
+event.listen(AppSession, "after_flush", _after_flush)
+event.listen(AppSession, "after_commit", _after_commit)
+event.listen(AppSession, "after_rollback", _after_rollback)
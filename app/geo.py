@@ -0,0 +1,282 @@
+"""Tọa độ tài sản: geocoding (đổi địa chỉ -> lat/lng), geohash và tìm theo bán kính.
+
+- Cột properties.geohash (index B-tree) là chỉ mục không gian: các điểm gần nhau có
+  chung tiền tố, nên "trong vùng X" = vài khoảng `geohash BETWEEN tiền tố000.. AND tiền tốzzz..`.
+- Geocoder cắm được qua biến môi trường GEOCODER="module:Class"; mặc định dùng
+  LocalGeocoder (bảng tọa độ quận / thành phố có sẵn, không gọi mạng).
+
+    python -m app.geo backfill   # geocode các tài sản chưa có tọa độ
+"""
+import importlib
+import math
+import os
+import re
+import sys
+from typing import Dict, Iterable, List, Optional, Protocol, Tuple
+
+from sqlalchemy import event, literal, or_
+
+from . import models
+from .search import normalize
+
+EARTH_RADIUS_KM = 6371.0
+GEOHASH_PRECISION = 9  # ~5m, đủ cho tìm theo bán kính
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Số ô geohash tối đa khi phủ 1 vùng tìm kiếm (nhiều ô hơn -> điều kiện OR dài hơn)
+MAX_COVER_CELLS = 16
+
+DEFAULT_RADIUS_KM = 3.0
+MAX_RADIUS_KM = 50.0
+# Số tài sản tối đa lấy từ DB trong 1 vùng trước khi tính khoảng cách
+MAX_CANDIDATES = 2000
+
+LatLng = Tuple[float, float]
+
+_WORDS = re.compile(r"\w+")
+
+
+# ---------- Geohash ----------
+def encode(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if coord >= mid:
+            value = (value << 1) | 1
+            rng[0] = mid
+        else:
+            value <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> LatLng:
+    """(chiều cao, chiều rộng) của 1 ô geohash, tính bằng độ"""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision - lng_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def _steps(low: float, high: float, step: float) -> List[float]:
+    values, current = [], low
+    while current < high:
+        values.append(current)
+        current += step
+    values.append(high)
+    return values
+
+
+def cover(min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> List[str]:
+    """Các tiền tố geohash phủ kín hình chữ nhật, dùng độ chính xác cao nhất có thể"""
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        d_lat, d_lng = cell_size(precision)
+        rows = math.ceil((max_lat - min_lat) / d_lat) + 1
+        cols = math.ceil((max_lng - min_lng) / d_lng) + 1
+        if rows * cols <= MAX_COVER_CELLS:
+            return sorted({
+                encode(lat, lng, precision)
+                for lat in _steps(min_lat, max_lat, d_lat)
+                for lng in _steps(min_lng, max_lng, d_lng)
+            })
+    return [""]
+
+
+# ---------- Khoảng cách ----------
+def haversine_km(a: LatLng, b: LatLng) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def bounding_box(center: LatLng, radius_km: float) -> Tuple[float, float, float, float]:
+    lat, lng = center
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    d_lng = math.degrees(radius_km / (EARTH_RADIUS_KM * max(math.cos(math.radians(lat)), 1e-6)))
+    return max(lat - d_lat, -90.0), max(lng - d_lng, -180.0), min(lat + d_lat, 90.0), min(lng + d_lng, 180.0)
+
+
+def area_filter(query, min_lat: float, min_lng: float, max_lat: float, max_lng: float):
+    """Lọc bằng index geohash (thô) rồi lat/lng (chính xác theo hình chữ nhật)"""
+    prop = models.Property
+    ranges = []
+    for prefix in cover(min_lat, min_lng, max_lat, max_lng):
+        # Mọi geohash dài bằng nhau và chỉ gồm 0-9 a-z nên so sánh chuỗi đúng với mọi collation
+        pad = GEOHASH_PRECISION - len(prefix)
+        ranges.append(prop.geohash.between(prefix + "0" * pad, prefix + "z" * pad))
+    return query.filter(
+        or_(*ranges),
+        prop.latitude.between(min_lat, max_lat),
+        prop.longitude.between(min_lng, max_lng),
+    )
+
+
+def proximity(center: LatLng):
+    """Biểu thức SQL tăng dần theo khoảng cách tới center (xấp xỉ phẳng, đúng thứ tự trong vài chục km):
+    ORDER BY trước LIMIT để vùng dày đặc không cắt mất các điểm gần nhất"""
+    lat, lng = center
+    scale = math.cos(math.radians(lat))
+    d_lat = models.Property.latitude - literal(lat)
+    d_lng = (models.Property.longitude - literal(lng)) * literal(scale)
+    return d_lat * d_lat + d_lng * d_lng
+
+
+def sort_by_distance(items: Iterable, center: LatLng, radius_km: Optional[float] = None) -> List[tuple]:
+    """[(khoảng cách km, tài sản)] gần nhất trước; bỏ các điểm ở góc hình chữ nhật nằm ngoài bán kính"""
+    scored = [(haversine_km(center, (item.latitude, item.longitude)), item) for item in items]
+    if radius_km is not None:
+        scored = [pair for pair in scored if pair[0] <= radius_km]
+    return sorted(scored, key=lambda pair: (pair[0], pair[1].id))
+
+
+# ---------- Geocoding ----------
+class Geocoder(Protocol):
+    def geocode(self, address: str) -> Optional[LatLng]:
+        ...
+
+
+class LocalGeocoder:
+    """Geocoder offline: khớp tên quận / thành phố trong địa chỉ (không dấu) với bảng tọa độ trung tâm"""
+
+    PLACES: Dict[str, LatLng] = {
+        "quan 1": (10.7756, 106.7019),
+        "quan 3": (10.7843, 106.6844),
+        "quan 5": (10.7540, 106.6634),
+        "quan 7": (10.7340, 106.7219),
+        "binh thanh": (10.8106, 106.7091),
+        "phu nhuan": (10.7992, 106.6803),
+        "tan binh": (10.8015, 106.6526),
+        "go vap": (10.8387, 106.6653),
+        "thu duc": (10.8494, 106.7537),
+        "ho chi minh": (10.7769, 106.7009),
+        "sai gon": (10.7769, 106.7009),
+        "ha noi": (21.0278, 105.8342),
+        "hoan kiem": (21.0285, 105.8542),
+        "cau giay": (21.0362, 105.7906),
+        "da nang": (16.0544, 108.2022),
+        "hai phong": (20.8449, 106.6881),
+        "can tho": (10.0452, 105.7469),
+        "da lat": (11.9404, 108.4583),
+        "nha trang": (12.2388, 109.1967),
+        "hue": (16.4637, 107.5909),
+        "vung tau": (10.4114, 107.1362),
+        "bien hoa": (10.9574, 106.8427),
+        "quy nhon": (13.7820, 109.2197),
+        "phu quoc": (10.2899, 103.9840),
+        "ha long": (20.9599, 107.0425),
+    }
+    # Cách viết tắt thường gặp -> tên trong PLACES
+    ALIASES: Dict[str, str] = {
+        "hcm": "ho chi minh",
+        "tphcm": "ho chi minh",
+        "saigon": "sai gon",
+        "hn": "ha noi",
+    }
+    # Tiền tố hành chính bỏ đi khi so cả 1 phần địa chỉ với tên địa danh
+    PREFIXES = ("thanh pho ", "tp ", "tinh ")
+
+    def geocode(self, address: str) -> Optional[LatLng]:
+        # Địa chỉ Việt Nam viết từ nhỏ đến lớn (số nhà + đường, phường, quận, thành phố), ngăn bởi dấu phẩy:
+        # phần sớm nhất khớp được là cụ thể nhất. Phần đầu thường là số nhà + đường ("Nguyễn Huệ" không
+        # phải Huế) nên chỉ dùng khi cả phần đúng là 1 địa danh ("Quận 1, TP HCM")
+        parts = [" ".join(_WORDS.findall(part)) for part in normalize(address).split(",")]
+        for index, part in enumerate(parts):
+            name = self._exact(part) if index == 0 and len(parts) > 1 else self._find(part)
+            if name:
+                return self.PLACES[name]
+        return None
+
+    def _exact(self, part: str) -> Optional[str]:
+        for prefix in ("", *self.PREFIXES):
+            if part.startswith(prefix):
+                name = self.ALIASES.get(part[len(prefix):], part[len(prefix):])
+                if name in self.PLACES:
+                    return name
+        return None
+
+    def _find(self, part: str) -> Optional[str]:
+        text = f" {part} "
+        found = [(text.find(f" {key} "), key) for key in (*self.PLACES, *self.ALIASES) if f" {key} " in text]
+        if not found:
+            return None
+        key = min(found)[1]
+        return self.ALIASES.get(key, key)
+
+
+_geocoder: Optional[Geocoder] = None
+
+
+def get_geocoder() -> Geocoder:
+    global _geocoder
+    if _geocoder is None:
+        spec = os.getenv("GEOCODER", "")
+        if spec:
+            module_name, class_name = spec.split(":")
+            _geocoder = getattr(importlib.import_module(module_name), class_name)()
+        else:
+            _geocoder = LocalGeocoder()
+    return _geocoder
+
+
+def locate(address: Optional[str], latitude: Optional[float], longitude: Optional[float]) -> Tuple[Optional[float], Optional[float]]:
+    """Tọa độ đã nhập thì giữ nguyên, chưa có thì thử geocode từ địa chỉ"""
+    if latitude is not None and longitude is not None:
+        return latitude, longitude
+    if address:
+        try:
+            found = get_geocoder().geocode(address)
+        except Exception as e:
+            print(f"⚠️  Geocode lỗi ({address}): {e}")
+            found = None
+        if found:
+            return found
+    return None, None
+
+
+def geohash_of(latitude: Optional[float], longitude: Optional[float]) -> Optional[str]:
+    if latitude is None or longitude is None:
+        return None
+    return encode(latitude, longitude)
+
+
+def _fill_geohash(mapper, connection, target: models.Property):
+    target.geohash = geohash_of(target.latitude, target.longitude)
+
+
+event.listen(models.Property, "before_insert", _fill_geohash)
+event.listen(models.Property, "before_update", _fill_geohash)
+
+
+def backfill(batch_size: int = 500) -> int:
+    """Geocode các tài sản chưa có tọa độ (theo lô, commit từng lô)"""
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    updated, last_id = 0, 0
+    try:
+        while True:
+            props = db.query(models.Property).filter(
+                models.Property.latitude.is_(None), models.Property.id > last_id
+            ).order_by(models.Property.id).limit(batch_size).all()
+            if not props:
+                return updated
+            for prop in props:
+                prop.latitude, prop.longitude = locate(prop.address, None, None)
+                updated += prop.latitude is not None
+            last_id = props[-1].id
+            db.commit()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["backfill"]:
+        print("Cách dùng: python -m app.geo backfill")
+        sys.exit(2)
+    print(f"✅ Đã geocode {backfill()} tài sản")
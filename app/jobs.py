@@ -0,0 +1,88 @@
+"""Lịch sử chạy job định kỳ (bảng job_runs) và lịch chạy hằng ngày trong process web.
+
+Mỗi job (billing, sweeper) ghi 1 dòng job_runs mỗi lần chạy: as_of, trạng thái, số dòng
+xử lý và metrics. Lần chạy thành công gần nhất là watermark: server khởi động lại sau
+khi lỡ giờ chạy thì chạy bù ngay.
+"""
+import asyncio
+import json
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, insert, select, update
+
+from . import models
+
+_job_runs = models.JobRun.__table__
+
+
+def start_run(engine, job: str, as_of: date) -> int:
+    with engine.begin() as conn:
+        return conn.execute(
+            insert(_job_runs).values(job=job, as_of=as_of, status="running").returning(_job_runs.c.id)
+        ).scalar_one()
+
+
+def finish_run(engine, run_id: int, status: str, processed: int = 0, created: int = 0,
+               metrics: Optional[dict] = None, error: Optional[str] = None):
+    with engine.begin() as conn:
+        conn.execute(update(_job_runs).where(_job_runs.c.id == run_id).values(
+            status=status, processed=processed, created=created, error=error,
+            metrics=json.dumps(metrics, default=str) if metrics is not None else None,
+            finished_at=datetime.now(timezone.utc)
+        ))
+
+
+def watermark(conn, job: str) -> Optional[date]:
+    """as_of của lần chạy thành công gần nhất"""
+    value = conn.execute(
+        select(func.max(_job_runs.c.as_of)).where(_job_runs.c.job == job, _job_runs.c.status == "done")
+    ).scalar()
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def load_watermark(engine, job: str) -> Optional[date]:
+    with engine.connect() as conn:
+        return watermark(conn, job)
+
+
+def last_runs(conn) -> Dict[str, dict]:
+    """Lần chạy gần nhất của từng job (kể cả đang chạy / lỗi) + watermark"""
+    latest = select(_job_runs.c.job, func.max(_job_runs.c.id).label("id")).group_by(_job_runs.c.job).subquery()
+    rows = conn.execute(select(_job_runs).join(latest, latest.c.id == _job_runs.c.id)).mappings().all()
+    report = {}
+    for row in rows:
+        item = dict(row)
+        item["metrics"] = json.loads(item["metrics"]) if item["metrics"] else None
+        item["watermark"] = watermark(conn, row["job"])
+        report[row["job"]] = item
+    return report
+
+
+async def run_daily(engine, name: str, hour: int, call: Callable[[], dict], catch_up: bool = False):
+    """Vòng lặp nền: gọi call() mỗi ngày lúc `hour` giờ (giờ server).
+
+    catch_up: watermark cũ hơn hôm nay (server tắt lúc đến giờ chạy) thì chạy bù ngay khi khởi động.
+    """
+    if catch_up:
+        last = await run_in_threadpool(load_watermark, engine, name)
+        if last is None or last < date.today():
+            await _run_logged(name, call)
+
+    while True:
+        now = datetime.now()
+        next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        await asyncio.sleep((next_run - now).total_seconds())
+        await _run_logged(name, call)
+
+
+async def _run_logged(name: str, call: Callable[[], dict]):
+    try:
+        report = await run_in_threadpool(call)
+        print(f"⏰ Job {name}: {json.dumps(report, ensure_ascii=False, default=str)}")
+    except Exception as e:
+        # Lỗi đã được ghi vào job_runs, lần sau chạy lại
+        print(f"⚠️  Job {name} lỗi: {e}")
@@ -1,19 +1,105 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+import codecs
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+import anyio
+from anyio import from_thread
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from datetime import date, datetime
-from typing import List, Optional
+from sqlalchemy import and_, func, literal, literal_column, select, true
+from sqlalchemy.exc import IntegrityError
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
 from uuid import uuid4
 
-from . database import get_db, engine
-from .  import models, schemas
+from . database import (
+    SessionLocal, dialect_insert, dispose_engines, engine, get_async_db, get_async_read_db, get_db, get_read_db,
+    pool_status, warm_up_async_pools, warm_up_pools, write_token
+)
+from .  import (
+    availability, billing, documents, feed, geo, jobs, models, occupancy, pdf, pricing, profiling, rollups, schemas,
+    search, sweeper, versioning,
+)
+from .bulk_import import (
+    BulkImporter, DEFAULT_BATCH_SIZE, KINDS, booked_ranges_query, detect_format, find_overlap, group_ranges
+)
+from .export import EXPORTS, MEDIA_TYPES, stream_export
+from .pagination import DEFAULT_LIMIT, MAX_LIMIT, paginate, make_page
+from .migrations import BOOKING_CONSTRAINT, MIGRATE_ON_STARTUP, migrate
+from .pricing import calculate_total_price
+
+# Số hợp đồng tối đa trong 1 file ZIP
+PDF_ZIP_MAX = 500
+# Số chunk upload chờ sẵn cho thread nhập dữ liệu
+IMPORT_BUFFER_CHUNKS = 16
+
+# Trạng thái khởi động, trả về ở /health/ready
+startup_state = {"ready": False, "migrations": None, "timings_ms": {}}
+
+
+async def timed(name: str, call, *args):
+    started = time.perf_counter()
+    try:
+        return await call(*args)
+    finally:
+        startup_state["timings_ms"][name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Khởi động: migrate (bỏ qua nếu schema không đổi) -> mở sẵn kết nối -> nạp id ông chủ -> nghe change feed.
+    Import main.py không còn chạm vào DB."""
+    started = time.perf_counter()
+    if MIGRATE_ON_STARTUP:
+        applied = await timed("migrations", run_in_threadpool, migrate, engine)
+        startup_state["migrations"] = "applied" if applied else "up_to_date"
+    else:
+        startup_state["migrations"] = "skipped"
+
+    try:
+        await timed("pool_warmup", run_in_threadpool, warm_up_pools)
+        await timed("async_pool_warmup", warm_up_async_pools)
+    except Exception as e:
+        # Không làm nóng được thì request đầu tiên tự mở kết nối như trước
+        print(f"⚠️  Làm nóng pool kết nối lỗi: {e}")
+    try:
+        await timed("owner_id", run_in_threadpool, load_owner_id)
+    except Exception as e:
+        # DB chưa sẵn sàng (VD: MIGRATE_ON_STARTUP=false, không có vòng thử lại) -> get_owner_id tự nạp lần đầu dùng
+        print(f"⚠️  Nạp id ông chủ lỗi, sẽ nạp khi cần: {e}")
+    try:
+        await feed.change_feed.start()
+    except Exception as e:
+        # Client SSE đầu tiên gọi lại start()
+        print(f"⚠️  Khởi động change feed lỗi, sẽ thử lại khi có client: {e}")
+    billing_task = None
+    if billing.BILLING_SCHEDULE_HOUR is not None:
+        billing_task = asyncio.create_task(billing.schedule_daily(engine, billing.BILLING_SCHEDULE_HOUR))
+    sweeper_task = None
+    if sweeper.SWEEP_SCHEDULE_HOUR is not None:
+        sweeper_task = asyncio.create_task(sweeper.schedule_daily(engine, sweeper.SWEEP_SCHEDULE_HOUR))
+
+    startup_state["timings_ms"]["total"] = round((time.perf_counter() - started) * 1000, 1)
+    startup_state["ready"] = True
+    print(f"🚀 Sẵn sàng sau {startup_state['timings_ms']['total']:.0f} ms ({startup_state['migrations']})")
+    try:
+        yield
+    finally:
+        startup_state["ready"] = False
+        for task in (billing_task, sweeper_task):
+            if task:
+                task.cancel()
+        await feed.change_feed.stop()
+        pdf.shutdown_pool()
+        await dispose_engines()
 
-# Tạo bảng nếu chưa có
-models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="ADMIN RENTAL SYSTEM (AUTO PILOT - PG FIX)")
+app = FastAPI(title="ADMIN RENTAL SYSTEM (AUTO PILOT - PG FIX)", lifespan=lifespan)
 
 # --- CẤU HÌNH CORS ---
 origins = [
@@ -28,13 +114,47 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Write-Token", "Server-Timing"],
 )
 
+
+@app.middleware("http")
+async def add_write_token(request: Request, call_next):
+    """Request ghi thành công -> trả token; client gửi lại qua X-Read-Your-Writes
+    để các lần đọc ngay sau đó đi vào primary thay vì replica (có thể còn trễ)"""
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        response.headers["X-Write-Token"] = write_token()
+    return response
+
+
+# Đăng ký sau cùng -> bọc ngoài cùng: Server-Timing tính cả thời gian của các middleware khác
+app.middleware("http")(profiling.profile_request)
+
+
 @app.get("/")
 def root():
     return {"message": "hihihihi ckao cau nka"}
 
 
+@app.get("/health/ready")
+def health_ready():
+    """Readiness cho load balancer: 200 khi đã migrate + làm nóng xong, 503 trong lúc khởi động / tắt"""
+    return JSONResponse(startup_state, status_code=200 if startup_state["ready"] else 503)
+
+
+@app.get("/health/pool")
+def health_pool():
+    """Thống kê pool kết nối DB: số kết nối đang dùng, overflow, thời gian chờ lấy kết nối"""
+    return pool_status()
+
+
+@app.get("/health/jobs")
+def health_jobs(db: Session = Depends(get_read_db)):
+    """Lần chạy gần nhất của từng job định kỳ (billing, sweeper): trạng thái, metrics, watermark"""
+    return jobs.last_runs(db)
+
+
 # ==================================================
 # HELPER FUNCTIONS (AUTO CREATE USER)
 # ==================================================
@@ -61,30 +181,73 @@ def get_or_create_admin(db: Session):
                 raise HTTPException(status_code=500, detail=f"Cannot create admin: {str(e)}")
     return admin
 
-def get_or_create_tenant(db: Session, email: str):
-    """Tự động tìm hoặc tạo khách thuê"""
-    tenant = db. query(models.User).filter(models.User.email == email).first()
-    
-    if not tenant:
+_owner_id: Optional[int] = None
+
+
+def get_owner_id(db: Session) -> int:
+    """id ông chủ hệ thống: chỉ query lần đầu, sau đó dùng lại (lifespan nạp sẵn lúc khởi động)"""
+    global _owner_id
+    if _owner_id is None:
+        _owner_id = get_or_create_admin(db).id
+    return _owner_id
+
+
+def load_owner_id() -> int:
+    with SessionLocal() as db:
+        return get_owner_id(db)
+
+async def upsert_tenant_ids(db: AsyncSession, emails: List[str]) -> Dict[str, int]:
+    """Tạo khách thuê còn thiếu và trả về {email: id}, 1 câu lệnh INSERT ... ON CONFLICT ... RETURNING.
+    Không commit: chạy trong transaction của người gọi (lỗi phía sau thì khách mới cũng rollback)."""
+    users = models.User.__table__
+    rows = []
+    # Bỏ email trùng (1 lệnh không được cập nhật cùng 1 dòng 2 lần), sắp xếp để tránh deadlock
+    for email in sorted(set(emails)):
         base_name = email.split('@')[0]
-        username_gen = f"{base_name}_{uuid4().hex[:8]}"
-        
-        try:
-            tenant = models.User(
-                email=email,
-                username=username_gen,
-                full_name=base_name. capitalize(),
-                hashed_password="123",
-                role="user"
-            )
-            db.add(tenant)
-            db.commit()
-            db.refresh(tenant)
-        except Exception as e:
-            db.rollback()
-            raise HTTPException(status_code=500, detail=f"Cannot create tenant: {str(e)}")
-    
-    return tenant
+        rows.append({
+            "email": email,
+            "username": f"{base_name}_{uuid4().hex[:8]}",
+            "full_name": base_name.capitalize(),
+            "hashed_password": "123",
+            "role": "user",
+            "is_active": True,
+        })
+    stmt = dialect_insert(db.bind)(users).values(rows)
+    # DO UPDATE (không đổi gì) thay vì DO NOTHING để RETURNING trả cả id của khách đã có
+    inserted = literal_column("xmax = 0") if db.bind.dialect.name == "postgresql" else literal(True)
+    result = (await db.execute(
+        stmt.on_conflict_do_update(index_elements=[users.c.email], set_={"email": stmt.excluded.email})
+        .returning(users.c.email, users.c.id, inserted.label("inserted"))
+    )).all()
+    if any(row.inserted for row in result):
+        versioning.mark_changed(db.sync_session, "users")
+    return {row.email: row.id for row in result}
+
+
+async def upsert_tenant(db: AsyncSession, email: str) -> int:
+    return (await upsert_tenant_ids(db, [email]))[email]
+
+
+async def not_modified(request: Request, response: Response, db: AsyncSession, *tables: str) -> Optional[Response]:
+    """Conditional GET: trả 304 nếu dữ liệu các bảng chưa đổi so với ETag client đang giữ"""
+    etag, last_modified = await versioning.current(db, tables)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+
+    if documents.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
+
+
+def is_booking_conflict(error: IntegrityError) -> bool:
+    """Lỗi do exclusion constraint chống trùng lịch (SQLSTATE 23P01)"""
+    return (
+        getattr(error.orig, "pgcode", None) == "23P01"
+        or BOOKING_CONSTRAINT in str(error.orig)
+    )
 
 
 # ==================================================
@@ -111,9 +274,25 @@ def create_user(user: schemas. UserCreate, db: Session = Depends(get_db)):
     return new_user
 
 
-@app.get("/users/", response_model=List[schemas. UserResponse])
-def list_users(db: Session = Depends(get_db)):
-    return db.query(models.User).all()
+@app.get("/users/", response_model=schemas.Page[schemas.UserResponse])
+async def list_users(
+    request: Request,
+    response: Response,
+    role: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    cached = await not_modified(request, response, db, "users")
+    if cached:
+        return cached
+
+    query = select(models.User)
+    if role:
+        query = query.filter(models.User.role == role)
+
+    rows = (await db.scalars(paginate(query, models.User.id, cursor, limit))).all()
+    return make_page(rows, limit)
 
 
 # ==================================================
@@ -121,7 +300,8 @@ def list_users(db: Session = Depends(get_db)):
 # ==================================================
 @app.post("/properties/", response_model=schemas.PropertyResponse)
 def create_property(prop: schemas.PropertyCreate, db: Session = Depends(get_db)):
-    admin = get_or_create_admin(db)
+    owner_id = get_owner_id(db)
+    latitude, longitude = geo.locate(prop.address, prop.latitude, prop.longitude)
     
     new_prop = models.Property(
         name=prop.name,
@@ -130,25 +310,68 @@ def create_property(prop: schemas.PropertyCreate, db: Session = Depends(get_db))
         description=prop.description,
         category=prop.category,
         image_url=prop.image_url,
-        owner_id=admin.id,
+        latitude=latitude,
+        longitude=longitude,
+        owner_id=owner_id,
         status="available"
     )
     db.add(new_prop)
+    db.flush()
+    feed.publish(db, "property.created", new_prop.id)
     db.commit()
     db.refresh(new_prop)
     return new_prop
 
 
-@app.get("/properties/", response_model=List[schemas.PropertyResponse])
-def list_properties(
+@app.get("/properties/", response_model=schemas.Page[schemas.PropertyResponse])
+async def list_properties(
+    request: Request,
+    response: Response,
     category: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     keyword: Optional[str] = None,
-    db: Session = Depends(get_db)
+    q: Optional[str] = None,
+    status: Optional[str] = None,
+    available_from: Optional[date] = None,
+    available_to: Optional[date] = None,
+    near_lat: Optional[float] = Query(None, ge=-90, le=90),
+    near_lng: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: float = Query(geo.DEFAULT_RADIUS_KM, gt=0, le=geo.MAX_RADIUS_KM),
+    bbox: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    query = db.query(models.Property)
+    """Danh sách tài sản.
+
+    keyword: lọc không dấu theo tên / địa chỉ / mô tả, phân trang theo id như bình thường.
+    q: tìm kiếm xếp hạng theo độ liên quan, trả về tối đa search.MAX_RESULTS kết quả (không có trang sau).
+    near_lat + near_lng (+ radius_km): tài sản trong bán kính, gần nhất trước, có distance_km.
+    bbox=min_lat,min_lng,max_lat,max_lng: tài sản trong khung bản đồ, gần tâm khung nhất trước.
+    """
+    cached = await not_modified(request, response, db, "properties", "contracts")
+    if cached:
+        return cached
+
+    query = select(models.Property)
+
+    if available_from or available_to:
+        # Tài sản còn trống: không có hợp đồng active nào giao với [from, to]
+        if not (available_from and available_to):
+            raise HTTPException(status_code=400, detail="Cần cả available_from và available_to")
+        if available_from > available_to:
+            raise HTTPException(status_code=400, detail="Ngày bắt đầu phải nhỏ hơn ngày kết thúc")
+        booked = select(models.Contract.id).where(
+            models.Contract.property_id == models.Property.id,
+            models.Contract.status == "active",
+            models.Contract.start_date <= available_to,
+            models.Contract.end_date >= available_from
+        )
+        query = query.filter(~booked.exists())
 
+    if status:
+        query = query.filter(models.Property.status == status)
     if category:
         query = query.filter(models.Property. category == category)
     if min_price is not None:
@@ -156,9 +379,114 @@ def list_properties(
     if max_price is not None: 
         query = query.filter(models.Property.price <= max_price)
     if keyword:
-        query = query.filter(models. Property.name.contains(keyword))
-
-    return query.all()
+        query = search.keyword_filter(query, keyword)
+
+    if (near_lat is None) != (near_lng is None):
+        raise HTTPException(status_code=400, detail="Cần cả near_lat và near_lng")
+    if near_lat is not None or bbox:
+        if near_lat is not None:
+            center, radius = (near_lat, near_lng), radius_km
+            area = geo.bounding_box(center, radius_km)
+        else:
+            area = parse_bbox(bbox)
+            center, radius = ((area[0] + area[2]) / 2, (area[1] + area[3]) / 2), None
+        if q and search.tokens(q):
+            query = search.keyword_filter(query, q)
+        query = geo.area_filter(query, *area).order_by(geo.proximity(center), models.Property.id)
+        candidates = (await db.scalars(query.limit(geo.MAX_CANDIDATES))).all()
+        nearest = geo.sort_by_distance(candidates, center, radius)[:limit]
+        return {
+            "items": [
+                schemas.PropertyResponse.model_validate(prop).model_copy(update={"distance_km": round(km, 3)})
+                for km, prop in nearest
+            ],
+            "next_cursor": None
+        }
+
+    if q and search.tokens(q):
+        score = search.rank(db.bind.dialect.name, q)
+        query = search.keyword_filter(query, q).order_by(score.desc(), models.Property.id)
+        rows = (await db.scalars(query.limit(min(limit, search.MAX_RESULTS)))).all()
+        return {"items": rows, "next_cursor": None}
+
+    rows = (await db.scalars(paginate(query, models.Property.id, cursor, limit))).all()
+    return make_page(rows, limit)
+
+
+def parse_bbox(bbox: str) -> tuple:
+    try:
+        min_lat, min_lng, max_lat, max_lng = (float(part) for part in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox phải có dạng min_lat,min_lng,max_lat,max_lng")
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        raise HTTPException(status_code=400, detail="bbox không hợp lệ")
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def calendar_window(date_from: Optional[date], date_to: Optional[date]) -> tuple:
+    date_from = date_from or date.today()
+    date_to = date_to or date_from + timedelta(days=availability.DEFAULT_CALENDAR_DAYS - 1)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from phải nhỏ hơn hoặc bằng date_to")
+    if (date_to - date_from).days + 1 > availability.MAX_CALENDAR_DAYS:
+        raise HTTPException(status_code=400, detail=f"Khoảng ngày tối đa {availability.MAX_CALENDAR_DAYS} ngày")
+    return date_from, date_to
+
+
+async def load_calendars(db: AsyncSession, property_ids: List[int], date_from: date, date_to: date, fmt: str) -> dict:
+    rows = (await db.execute(
+        availability.booked_query(property_ids, date_from, date_to, db.bind.dialect.name)
+    )).all()
+    return {
+        "date_from": date_from, "date_to": date_to, "days": (date_to - date_from).days + 1, "format": fmt,
+        "calendars": availability.build(property_ids, date_from, date_to, rows, fmt),
+    }
+
+
+@app.get("/properties/{property_id}/calendar", response_model=schemas.CalendarResponse, response_model_exclude_none=True)
+async def get_property_calendar(
+    property_id: int,
+    request: Request,
+    response: Response,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    format: str = Query("bitset", pattern="^(bitset|ranges)$"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Các ngày đã có hợp đồng active của 1 tài sản (mặc định 365 ngày từ hôm nay), dạng bitset hoặc khoảng ngày"""
+    date_from, date_to = calendar_window(date_from, date_to)
+    cached = await not_modified(request, response, db, "contracts")
+    if cached:
+        return cached
+    if await db.get(models.Property, property_id) is None:
+        raise HTTPException(status_code=404, detail="Tài sản không tồn tại")
+    return await load_calendars(db, [property_id], date_from, date_to, format)
+
+
+@app.get("/calendars", response_model=schemas.CalendarResponse, response_model_exclude_none=True)
+async def get_calendars(
+    request: Request,
+    response: Response,
+    property_ids: str = Query(..., description="Danh sách id, cách nhau bởi dấu phẩy"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    format: str = Query("bitset", pattern="^(bitset|ranges)$"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Lịch của nhiều tài sản trong 1 response (tối đa MAX_CALENDAR_PROPERTIES); id không tồn tại trả lịch trống"""
+    try:
+        ids = list(dict.fromkeys(int(part) for part in property_ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="property_ids phải có dạng 1,2,3")
+    if not ids or len(ids) > availability.MAX_CALENDAR_PROPERTIES:
+        raise HTTPException(
+            status_code=400, detail=f"Cần từ 1 đến {availability.MAX_CALENDAR_PROPERTIES} tài sản"
+        )
+    date_from, date_to = calendar_window(date_from, date_to)
+    cached = await not_modified(request, response, db, "contracts")
+    if cached:
+        return cached
+    return await load_calendars(db, ids, date_from, date_to, format)
 
 
 @app.delete("/properties/{property_id}")
@@ -180,6 +508,7 @@ def delete_property(property_id: int, db: Session = Depends(get_db)):
         )
     
     db.delete(prop)
+    feed.publish(db, "property.deleted", property_id)
     db.commit()
     return {"message": "Tài sản đã bị xóa"}
 
@@ -187,83 +516,330 @@ def delete_property(property_id: int, db: Session = Depends(get_db)):
 # ==================================================
 # CONTRACT API
 # ==================================================
+async def load_rule_book(db: AsyncSession) -> pricing.RuleBook:
+    """Quy tắc giá (cache trong RAM, xem pricing.RULES_CACHE_SECONDS)"""
+    book = pricing.cached_rules()
+    if book is None:
+        book = pricing.store_rules(
+            (await db.scalars(select(models.PricingRule).order_by(models.PricingRule.id))).all()
+        )
+    return book
+
+
+def build_contract(data: schemas.ContractCreate, prop: models.Property, tenant_id: int,
+                   book: pricing.RuleBook) -> models.Contract:
+    """Hợp đồng mới + thanh toán cọc tự động; đánh dấu tài sản đang cho thuê nếu hợp đồng bao hôm nay"""
+    contract = models.Contract(
+        property_id=data.property_id,
+        tenant_id=tenant_id,
+        start_date=data.start_date,
+        end_date=data.end_date,
+        total_price=calculate_total_price(
+            prop.price, data.start_date, data.end_date, data.rental_type, book.rule_set(prop.id, prop.category)
+        ),
+        deposit=data.deposit,
+        status="active",
+        rental_type=data.rental_type,
+        next_invoice_date=billing.first_invoice_date(data.rental_type, data.start_date)
+    )
+    if data.deposit > 0:
+        # Gắn qua relationship: cùng 1 lần flush với hợp đồng, không cần biết trước contract.id
+        contract.payments.append(models.Payment(
+            amount=data.deposit,
+            payment_date=date.today(),
+            note="Thanh toán tiền cọc (Auto)",
+            is_paid=True
+        ))
+    if data.start_date <= date.today() <= data.end_date:
+        prop.status = "rented"
+    return contract
+
+
 @app.post("/contracts/", response_model=schemas. ContractResponse)
-def create_contract(data: schemas.ContractCreate, db: Session = Depends(get_db)):
+async def create_contract(data: schemas.ContractCreate, db: AsyncSession = Depends(get_async_db)):
     if data.start_date >= data.end_date:
         raise HTTPException(status_code=400, detail="Ngày bắt đầu phải nhỏ hơn ngày kết thúc")
 
-    prop = db.query(models.Property).filter(models.Property.id == data.property_id).first()
-    if not prop:
-        raise HTTPException(status_code=404, detail="Tài sản không tồn tại")
-
-    tenant = get_or_create_tenant(db, data.tenant_email)
-
-    overlap = db.query(models.Contract).filter(
+    # 1 query: tài sản + hợp đồng active đầu tiên giao với khoảng ngày (nếu có).
+    # Kiểm tra sớm để báo lỗi kèm ngày cụ thể; chốt chặn thật sự (kể cả khi
+    # nhiều request chạy song song) là exclusion constraint trên PostgreSQL
+    overlap = select(models.Contract.start_date, models.Contract.end_date).where(
         models.Contract.property_id == data.property_id,
         models.Contract.status == "active",
         and_(
             models.Contract.start_date <= data.end_date,
             models.Contract.end_date >= data.start_date
         )
-    ).first()
-
-    if overlap:
+    ).limit(1).subquery()
+    found = (await db.execute(
+        select(models.Property, overlap.c.start_date, overlap.c.end_date)
+        .outerjoin(overlap, true())
+        .where(models.Property.id == data.property_id)
+    )).first()
+
+    if not found:
+        raise HTTPException(status_code=404, detail="Tài sản không tồn tại")
+    prop, overlap_start, overlap_end = found
+    if overlap_start is not None:
         raise HTTPException(
             status_code=409,
-            detail=f"Trùng lịch!  Đã có khách thuê từ {overlap.start_date} đến {overlap.end_date}"
+            detail=f"Trùng lịch!  Đã có khách thuê từ {overlap_start} đến {overlap_end}"
         )
 
-    days = (data.end_date - data.start_date).days
-    
-    if data.rental_type == "daily": 
-        total_price = days * prop.price
-    elif data.rental_type == "monthly":
-        months = max(1, (days + 15) // 30) 
-        total_price = months * prop.price
-    else:
-        total_price = days * prop.price
-
-    contract = models.Contract(
-        property_id=data.property_id,
-        tenant_id=tenant.id,
-        start_date=data.start_date,
-        end_date=data.end_date,
-        total_price=total_price,
-        deposit=data.deposit,
-        status="active"
-    )
-
-    if data.start_date <= date.today() <= data.end_date:
-        prop.status = "rented"
-    
     try:
-        db.add(contract)
-        db.add(prop)
-        db.flush() 
-        
-        if data.deposit > 0:
-            deposit_payment = models.Payment(
-                contract_id=contract.id,
-                amount=data.deposit,
-                payment_date=date.today(),
-                note="Thanh toán tiền cọc (Auto)",
-                is_paid=True
-            )
-            db.add(deposit_payment)
+        tenant_id = await upsert_tenant(db, data.tenant_email)
 
-        db.commit()
-        db.refresh(contract)
-        
+        contract = build_contract(data, prop, tenant_id, await load_rule_book(db))
+        db.add(contract)
+        await db.flush()
+        feed.publish(db, "contract.created", contract.id, contract.id, property_id=contract.property_id)
+        # created_at (server default) đã được lấy về bằng RETURNING lúc INSERT -> không cần refresh
+        await db.commit()
+
+    except IntegrityError as e:
+        await db.rollback()
+        if is_booking_conflict(e):
+            # Request song song đã chen vào giữa bước kiểm tra và bước insert
+            raise HTTPException(status_code=409, detail="Trùng lịch! Tài sản vừa được đặt trong khoảng thời gian này")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
         
     return contract
 
 
-@app. get("/contracts/", response_model=List[schemas.ContractResponse])
-def list_contracts(db: Session = Depends(get_db)):
-    return db.query(models.Contract).all()
+async def book_contracts(db: AsyncSession, items: List[schemas.ContractCreate], atomic: bool) -> list:
+    """Kiểm tra + ghi cả lô trong transaction hiện tại, trả về kết quả theo thứ tự items.
+
+    Trùng lịch được kiểm tra bằng 1 query cho cả lô (với DB) và so từng cặp trong lô với nhau.
+    """
+    results: List[Optional[schemas.ContractBatchItemResult]] = [None] * len(items)
+
+    def fail(index: int, status_code: int, error: str):
+        results[index] = schemas.ContractBatchItemResult(index=index, status_code=status_code, error=error)
+
+    valid = []
+    for index, item in enumerate(items):
+        if item.start_date >= item.end_date:
+            fail(index, 400, "Ngày bắt đầu phải nhỏ hơn ngày kết thúc")
+        else:
+            valid.append(index)
+
+    props, booked = {}, {}
+    if valid:
+        props = {prop.id: prop for prop in await db.scalars(
+            select(models.Property).where(models.Property.id.in_({items[i].property_id for i in valid}))
+        )}
+        booked = group_ranges((await db.execute(booked_ranges_query([items[i] for i in valid]))).all())
+
+    in_batch = defaultdict(list)  # property_id -> [(start, end, index)] các mục đã nhận trong lô
+    accepted = []
+    for index in valid:
+        item = items[index]
+        if item.property_id not in props:
+            fail(index, 404, f"Tài sản #{item.property_id} không tồn tại")
+            continue
+        overlap = find_overlap(booked.get(item.property_id, []), item.start_date, item.end_date)
+        if overlap:
+            fail(index, 409, f"Trùng lịch! Đã có khách thuê từ {overlap[0]} đến {overlap[1]}")
+            continue
+        clash = next((
+            other for start, end, other in in_batch[item.property_id]
+            if start <= item.end_date and end >= item.start_date
+        ), None)
+        if clash is not None:
+            fail(index, 409, f"Trùng lịch với mục #{clash} trong cùng lô")
+            continue
+        in_batch[item.property_id].append((item.start_date, item.end_date, index))
+        accepted.append(index)
+
+    if atomic and len(accepted) < len(items):
+        for index in accepted:
+            fail(index, 424, "Không ghi vì có mục khác trong lô bị lỗi")
+        return results
+    if not accepted:
+        return results
+
+    tenant_ids = await upsert_tenant_ids(db, [items[i].tenant_email for i in accepted])
+    book = await load_rule_book(db)
+    contracts = {
+        index: build_contract(
+            items[index], props[items[index].property_id], tenant_ids[items[index].tenant_email], book
+        )
+        for index in accepted
+    }
+    db.add_all(contracts.values())
+    await db.flush()  # hợp đồng + cọc của cả lô ghi bằng vài câu INSERT nhiều dòng
+    for contract in contracts.values():
+        feed.publish(db, "contract.created", contract.id, contract.id, property_id=contract.property_id)
+    await db.commit()
+
+    for index, contract in contracts.items():
+        results[index] = schemas.ContractBatchItemResult(
+            index=index, status_code=200, contract=schemas.ContractResponse.model_validate(contract)
+        )
+    return results
+
+
+@app.post("/contracts/batch", response_model=schemas.ContractBatchResponse)
+async def create_contracts_batch(
+    data: schemas.ContractBatchCreate,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Đặt nhiều hợp đồng trong 1 transaction (VD: 20 máy ảnh + 1 xe cùng ngày).
+
+    mode=atomic (mặc định): có mục lỗi thì không ghi gì, trả mã lỗi của mục lỗi đầu tiên.
+    mode=partial: ghi các mục hợp lệ, trả 200 kèm lỗi của từng mục.
+    """
+    atomic = data.mode == "atomic"
+    for attempt in range(2):
+        try:
+            results = await book_contracts(db, data.items, atomic)
+            break
+        except IntegrityError as e:
+            await db.rollback()
+            if not is_booking_conflict(e):
+                raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+            if atomic or attempt:
+                raise HTTPException(status_code=409, detail="Trùng lịch! Tài sản vừa được đặt trong khoảng thời gian này")
+            # partial: request song song vừa chen vào -> kiểm tra lại, lần này sẽ thấy và bỏ mục bị trùng
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    failed = [item for item in results if item.status_code != 200]
+    if atomic and failed:
+        response.status_code = next(item.status_code for item in failed if item.status_code != 424)
+    return schemas.ContractBatchResponse(
+        mode=data.mode, created=len(results) - len(failed), failed=len(failed), items=results
+    )
+
+
+def filter_contracts(
+    query,
+    status: Optional[str] = None,
+    property_id: Optional[int] = None,
+    tenant_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
+):
+    """Lọc hợp đồng; date_from/date_to lấy các hợp đồng có thời gian thuê giao với khoảng đó"""
+    if status:
+        query = query.filter(models.Contract.status == status)
+    if property_id is not None:
+        query = query.filter(models.Contract.property_id == property_id)
+    if tenant_id is not None:
+        query = query.filter(models.Contract.tenant_id == tenant_id)
+    if date_from:
+        query = query.filter(models.Contract.end_date >= date_from)
+    if date_to:
+        query = query.filter(models.Contract.start_date <= date_to)
+    return query
+
+
+@app. get("/contracts/", response_model=schemas.Page[schemas.ContractResponse])
+async def list_contracts(
+    request: Request,
+    response: Response,
+    status: Optional[str] = None,
+    property_id: Optional[int] = None,
+    tenant_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    cached = await not_modified(request, response, db, "contracts")
+    if cached:
+        return cached
+
+    query = filter_contracts(
+        select(models.Contract), status, property_id, tenant_id, date_from, date_to
+    )
+    rows = (await db.scalars(paginate(query, models.Contract.id, cursor, limit))).all()
+    return make_page(rows, limit)
+
+
+def contract_summary_query():
+    """Hợp đồng kèm tổng đã thu, số giao dịch và chi phí hư hỏng (1 query GROUP BY)"""
+    paid_sq = select(
+        models.Payment.contract_id.label("contract_id"),
+        func.sum(models.Payment.amount).label("paid"),
+        func.count(models.Payment.id).label("payment_count")
+    ).filter(
+        models.Payment.is_paid == True
+    ).group_by(models.Payment.contract_id).subquery()
+
+    damage_sq = select(
+        models.DamageReport.contract_id.label("contract_id"),
+        func.sum(models.DamageReport.repair_cost).label("damage_total")
+    ).group_by(models.DamageReport.contract_id).subquery()
+
+    return select(
+        models.Contract,
+        func.coalesce(paid_sq.c.paid, 0).label("paid"),
+        func.coalesce(paid_sq.c.payment_count, 0).label("payment_count"),
+        func.coalesce(damage_sq.c.damage_total, 0).label("damage_total")
+    ).outerjoin(
+        paid_sq, paid_sq.c.contract_id == models.Contract.id
+    ).outerjoin(
+        damage_sq, damage_sq.c.contract_id == models.Contract.id
+    )
+
+
+def to_contract_summary(row) -> schemas.ContractSummaryResponse:
+    contract, paid, payment_count, damage_total = row
+    return schemas.ContractSummaryResponse(
+        **schemas.ContractResponse.model_validate(contract).model_dump(),
+        paid=paid,
+        remaining=contract.total_price - paid,
+        payment_count=payment_count,
+        damage_total=damage_total
+    )
+
+
+@app.get("/contracts/summary", response_model=schemas.Page[schemas.ContractSummaryResponse])
+async def list_contract_summaries(
+    request: Request,
+    response: Response,
+    status: Optional[str] = None,
+    property_id: Optional[int] = None,
+    tenant_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Danh sách hợp đồng kèm số liệu thanh toán (thay cho N lần gọi /payments)"""
+    cached = await not_modified(request, response, db, "contracts", "payments", "damage_reports")
+    if cached:
+        return cached
+
+    query = filter_contracts(
+        contract_summary_query(), status, property_id, tenant_id, date_from, date_to
+    )
+    rows = (await db.execute(paginate(query, models.Contract.id, cursor, limit))).all()
+    page = make_page(rows, limit, key=lambda row: row[0].id)
+    page["items"] = [to_contract_summary(row) for row in page["items"]]
+    return page
+
+
+@app.get("/contracts/{contract_id}/summary", response_model=schemas.ContractSummaryResponse)
+async def get_contract_summary(contract_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Số liệu thanh toán của 1 hợp đồng
+
+    Luôn đọc từ primary: frontend gọi ngay khi nhận sự kiện thay đổi (/events),
+    replica lúc đó có thể chưa kịp có dữ liệu mới.
+    """
+    result = await db.execute(contract_summary_query().where(models.Contract.id == contract_id))
+    row = result.first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Hợp đồng không tồn tại")
+    return to_contract_summary(row)
 
 
 @app.delete("/contracts/{contract_id}")
@@ -277,16 +853,97 @@ def delete_contract(contract_id: int, db: Session = Depends(get_db)):
     prop.status = "available"
     
     db.delete(contract)
+    feed.publish(db, "contract.deleted", contract_id, contract_id, property_id=prop.id)
     db.commit()
     return {"message": "Hợp đồng đã bị hủy"}
 
 
+# ==================================================
+# PRICING / QUOTE API (BÁO GIÁ)
+# ==================================================
+@app.post("/pricing-rules/", response_model=schemas.PricingRuleResponse)
+def create_pricing_rule(data: schemas.PricingRuleCreate, db: Session = Depends(get_db)):
+    """Thêm quy tắc giá cho 1 tài sản, 1 danh mục hoặc toàn hệ thống (bỏ trống cả 2)"""
+    if data.property_id is not None and data.category:
+        raise HTTPException(status_code=400, detail="Chỉ chọn 1 phạm vi: tài sản hoặc danh mục")
+    if data.kind == "season" and (not data.start_date or not data.end_date or data.start_date > data.end_date):
+        raise HTTPException(status_code=400, detail="Quy tắc theo mùa cần start_date <= end_date")
+    if data.kind == "long_stay" and not data.min_days:
+        raise HTTPException(status_code=400, detail="Quy tắc thuê dài cần min_days")
+    if data.property_id is not None and db.get(models.Property, data.property_id) is None:
+        raise HTTPException(status_code=404, detail="Tài sản không tồn tại")
+
+    rule = models.PricingRule(**data.model_dump())
+    db.add(rule)
+    db.commit()
+    db.refresh(rule)
+    pricing.invalidate_rules()
+    return rule
+
+
+@app.get("/pricing-rules/", response_model=List[schemas.PricingRuleResponse])
+def list_pricing_rules(
+    property_id: Optional[int] = None,
+    category: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    query = db.query(models.PricingRule)
+    if property_id is not None:
+        query = query.filter(models.PricingRule.property_id == property_id)
+    if category:
+        query = query.filter(models.PricingRule.category == category)
+    return query.order_by(models.PricingRule.id).all()
+
+
+@app.delete("/pricing-rules/{rule_id}")
+def delete_pricing_rule(rule_id: int, db: Session = Depends(get_db)):
+    rule = db.get(models.PricingRule, rule_id)
+    if not rule:
+        raise HTTPException(status_code=404, detail="Quy tắc giá không tồn tại")
+    db.delete(rule)
+    db.commit()
+    pricing.invalidate_rules()
+    return {"message": "Đã xóa quy tắc giá"}
+
+
+@app.post("/quotes", response_model=schemas.QuoteResponse)
+def create_quotes(data: schemas.QuoteRequest, db: Session = Depends(get_read_db)):
+    """Báo giá nhiều (tài sản, ngày bắt đầu, ngày kết thúc, kiểu thuê) trong 1 lần gọi, không tạo hợp đồng.
+    Cùng công thức với lúc tạo hợp đồng; lỗi từng mục trả trong `error`, không làm hỏng cả lô."""
+    items = data.items
+    props = {row.id: row for row in db.execute(
+        select(models.Property.id, models.Property.price, models.Property.category)
+        .where(models.Property.id.in_({item.property_id for item in items}))
+    )}
+
+    results = [schemas.QuoteResult(**item.model_dump()) for item in items]
+    valid = []
+    for index, item in enumerate(items):
+        if item.start_date >= item.end_date:
+            results[index].error = "Ngày bắt đầu phải nhỏ hơn ngày kết thúc"
+        elif item.property_id not in props:
+            results[index].error = f"Tài sản #{item.property_id} không tồn tại"
+        else:
+            valid.append(index)
+
+    totals = pricing.quote_many(
+        pricing.get_rule_book(db),
+        [tuple(props[items[i].property_id]) for i in valid],
+        [items[i].start_date for i in valid],
+        [items[i].end_date for i in valid],
+        [items[i].rental_type for i in valid],
+    )
+    for index, total in zip(valid, totals.tolist()):
+        results[index].total_price = total
+    return {"items": results}
+
+
 # ==================================================
 # PAYMENT API
 # ==================================================
 @app.post("/payments/", response_model=schemas.PaymentResponse)
-def create_payment(pay: schemas.PaymentCreate, db: Session = Depends(get_db)):
-    contract = db.query(models.Contract).filter(models.Contract.id == pay.contract_id).first()
+async def create_payment(pay: schemas.PaymentCreate, db: AsyncSession = Depends(get_async_db)):
+    contract = await db.get(models.Contract, pay.contract_id)
     if not contract: 
         raise HTTPException(status_code=404, detail="Hợp đồng không tồn tại")
 
@@ -298,385 +955,224 @@ def create_payment(pay: schemas.PaymentCreate, db: Session = Depends(get_db)):
         is_paid=True
     )
     db.add(payment)
-    db.commit()
-    db.refresh(payment)
+    await db.flush()
+    feed.publish(db, "payment.added", payment.id, payment.contract_id)
+    await db.commit()
     return payment
 
 
 @app.put("/payments/{payment_id}", response_model=schemas.PaymentResponse)
-def update_payment(payment_id: int, pay:  schemas.PaymentCreate, db: Session = Depends(get_db)):
+async def update_payment(payment_id: int, pay:  schemas.PaymentCreate, db: AsyncSession = Depends(get_async_db)):
     """Cập nhật thanh toán"""
-    payment = db.query(models.Payment).filter(models.Payment.id == payment_id).first()
+    payment = await db.get(models.Payment, payment_id)
     if not payment:
         raise HTTPException(status_code=404, detail="Thanh toán không tồn tại")
 
-    contract = db.query(models.Contract).filter(models.Contract.id == pay.contract_id).first()
-    if not contract: 
+    # Chỉ kiểm tra khi đổi sang hợp đồng khác; hợp đồng cũ chắc chắn còn (FK)
+    if pay.contract_id != payment.contract_id and not await db.get(models.Contract, pay.contract_id):
         raise HTTPException(status_code=404, detail="Hợp đồng không tồn tại")
 
     payment.amount = pay.amount
     payment.payment_date = pay. payment_date
     payment.note = pay.note
     
-    db.commit()
-    db.refresh(payment)
+    feed.publish(db, "payment.edited", payment.id, payment.contract_id)
+    await db.commit()
     return payment
 
 
 @app.delete("/payments/{payment_id}")
-def delete_payment(payment_id: int, db: Session = Depends(get_db)):
+async def delete_payment(payment_id: int, db: AsyncSession = Depends(get_async_db)):
     """Xóa thanh toán"""
-    payment = db. query(models.Payment).filter(models.Payment.id == payment_id).first()
+    payment = await db.get(models.Payment, payment_id)
     if not payment:
         raise HTTPException(status_code=404, detail="Thanh toán không tồn tại")
 
-    db.delete(payment)
-    db.commit()
+    await db.delete(payment)
+    feed.publish(db, "payment.removed", payment_id, payment.contract_id)
+    await db.commit()
     return {"message":  f"Đã xóa thanh toán #{payment_id}"}
 
 
-@app.get("/contracts/{contract_id}/payments", response_model=List[schemas. PaymentResponse])
-def list_payments(contract_id: int, db: Session = Depends(get_db)):
-    return db.query(models.Payment).filter(
+@app.get("/contracts/{contract_id}/payments", response_model=schemas.Page[schemas.PaymentResponse])
+async def list_payments(
+    contract_id: int,
+    request: Request,
+    response: Response,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    cached = await not_modified(request, response, db, "payments")
+    if cached:
+        return cached
+
+    query = select(models.Payment).where(
         models.Payment.contract_id == contract_id
-    ).all()
+    )
+    if date_from:
+        query = query.filter(models.Payment.payment_date >= date_from)
+    if date_to:
+        query = query.filter(models.Payment.payment_date <= date_to)
+
+    rows = (await db.scalars(paginate(query, models.Payment.id, cursor, limit))).all()
+    return make_page(rows, limit)
+
+
+# ==================================================
+# INVOICE API (HÓA ĐƠN TỪNG KỲ)
+# ==================================================
+@app.get("/invoices/", response_model=schemas.Page[schemas.InvoiceResponse])
+async def list_invoices(
+    request: Request,
+    response: Response,
+    contract_id: Optional[int] = None,
+    status: Optional[str] = Query(None, pattern="^(open|paid)$"),
+    overdue: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Hóa đơn từng kỳ; overdue=true: chưa thanh toán và đã quá hạn (tính đến hôm nay)"""
+    cached = await not_modified(request, response, db, "invoices")
+    if cached:
+        return cached
+
+    query = billing.overdue_query() if overdue else select(models.Invoice)
+    if contract_id is not None:
+        query = query.filter(models.Invoice.contract_id == contract_id)
+    if status:
+        query = query.filter(models.Invoice.status == status)
+
+    rows = (await db.scalars(paginate(query, models.Invoice.id, cursor, limit))).all()
+    return make_page(rows, limit)
+
+
+@app.post("/invoices/{invoice_id}/pay", response_model=schemas.InvoiceResponse)
+async def pay_invoice(invoice_id: int, data: schemas.InvoicePay, db: AsyncSession = Depends(get_async_db)):
+    """Ghi nhận thanh toán cho 1 kỳ: tạo Payment và đánh dấu hóa đơn đã trả"""
+    invoice = await db.get(models.Invoice, invoice_id, with_for_update=True)
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Hóa đơn không tồn tại")
+    if invoice.status != "open":
+        raise HTTPException(status_code=409, detail="Hóa đơn đã được thanh toán")
+
+    payment = models.Payment(
+        contract_id=invoice.contract_id,
+        amount=invoice.amount,
+        payment_date=data.payment_date or date.today(),
+        note=data.note or f"Thanh toán kỳ {invoice.installment}",
+        is_paid=True
+    )
+    invoice.payment = payment
+    invoice.status = "paid"
+    invoice.paid_at = datetime.now(timezone.utc)
+    await db.flush()
+    feed.publish(db, "payment.added", payment.id, payment.contract_id, invoice_id=invoice.id)
+    await db.commit()
+    return invoice
+
+
+@app.post("/billing/run", response_model=schemas.BillingRunReport)
+def run_billing(as_of: Optional[date] = None):
+    """Xuất hóa đơn các kỳ đến hạn (giống `python -m app.billing run`, thường chạy theo lịch hằng đêm)"""
+    return billing.run(engine, as_of)
+
+
+@app.post("/sweeper/run", response_model=schemas.SweepReport)
+def run_sweeper(as_of: Optional[date] = None):
+    """Cập nhật trạng thái hợp đồng hết hạn / tài sản trống (giống `python -m app.sweeper run`)"""
+    return sweeper.run(engine, as_of)
 
 
 # ==================================================
 # CONTRACT DOWNLOAD PDF ✅ MỚI
 # ==================================================
 @app.get("/contracts/{contract_id}/download")
-def download_contract(contract_id:  int, db: Session = Depends(get_db)):
+def download_contract(contract_id:  int, request: Request, db: Session = Depends(get_read_db)):
     """Tải hợp đồng dưới dạng HTML (in PDF)"""
-    contract = db. query(models.Contract).filter(models.Contract.id == contract_id).first()
+    contract = documents.load_contract(db, contract_id)
     if not contract: 
         raise HTTPException(status_code=404, detail="Hợp đồng không tồn tại")
 
-    tenant = contract.tenant
-    prop = contract.property
-    
-    payments = db.query(models.Payment).filter(models.Payment.contract_id == contract_id).all()
-    paid = sum(p.amount for p in payments)
-    remaining = contract.total_price - paid
+    version, html_content = documents.render_contract(contract)
+    headers = {"ETag": f'"{version}"', "Cache-Control": "no-cache"}
+
+    # Trình duyệt đã có đúng bản này -> 304, không gửi lại nội dung
+    if documents.etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    return HTMLResponse(content=html_content, headers=headers)
+
+
+def render_contract_by_id(db: Session, contract_id: int):
+    contract = documents.load_contract(db, contract_id)
+    if not contract:
+        return None
+    return documents.render_contract(contract)
 
-    # Xác định trạng thái
-    status_text = "✅ ĐÃ THANH TOÁN ĐỦ" if remaining <= 0 else f"⏳ CÒN THIẾU {remaining: ,.0f}đ"
-    status_class = "status-paid" if remaining <= 0 else "status-pending"
-    
-    # Xây dựng bảng thanh toán
-    payment_rows = ""
-    if not payments:
-        payment_rows = '<tr><td colspan="4" style="text-align: center; color: #6b7280;">Chưa có giao dịch nào</td></tr>'
-    else:
-        for idx, payment in enumerate(payments, 1):
-            payment_rows += f"""
-            <tr>
-                <td>{idx}</td>
-                <td>{payment.payment_date.strftime('%d/%m/%Y')}</td>
-                <td>{payment.note or '—'}</td>
-                <td style="text-align: right; font-weight: bold; color: #10b981;">{payment.amount:,.0f}đ</td>
-            </tr>
-            """
-
-    html_content = f"""
-<! DOCTYPE html>
-<html lang="vi">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Hợp Đồng Cho Thuê #{contract_id}</title>
-    <style>
-        body {{
-            font-family: 'Arial', sans-serif;
-            max-width: 900px;
-            margin: 0 auto;
-            padding: 40px 20px;
-            color: #333;
-        }}
-        .header {{
-            text-align: center;
-            border-bottom: 3px solid #667eea;
-            padding-bottom: 20px;
-            margin-bottom: 30px;
-        }}
-        .header h1 {{
-            margin: 0;
-            color: #667eea;
-            font-size: 28px;
-        }}
-        . contract-number {{
-            color: #6b7280;
-            font-size: 14px;
-            margin-top: 5px;
-        }}
-        . section {{
-            margin-bottom: 30px;
-        }}
-        . section-title {{
-            background:  #f3f4f6;
-            padding: 12px 15px;
-            font-weight: bold;
-            color: #667eea;
-            margin-bottom: 15px;
-            border-left: 4px solid #667eea;
-        }}
-        . info-row {{
-            display: flex;
-            margin-bottom: 12px;
-            padding: 8px 0;
-            border-bottom:  1px solid #e5e7eb;
-        }}
-        .info-label {{
-            flex: 0 0 200px;
-            font-weight: bold;
-            color: #374151;
-        }}
-        . info-value {{
-            flex:  1;
-            color: #1f2937;
-        }}
-        .highlight {{
-            background:  #fef08a;
-            padding: 15px;
-            border-radius:  8px;
-            margin-bottom: 20px;
-        }}
-        .highlight-row {{
-            display: flex;
-            justify-content: space-between;
-            margin-bottom: 8px;
-            font-weight: bold;
-        }}
-        .footer {{
-            margin-top: 40px;
-            padding-top:  20px;
-            border-top: 2px solid #e5e7eb;
-            text-align: center;
-            font-size: 12px;
-            color: #6b7280;
-        }}
-        .signature-area {{
-            display: flex;
-            justify-content: space-around;
-            margin-top: 40px;
-            padding-top: 30px;
-        }}
-        .signature-box {{
-            text-align: center;
-            flex: 1;
-        }}
-        .signature-box-line {{
-            border-bottom: 2px solid #000;
-            margin:  50px 0 10px 0;
-            min-width: 150px;
-        }}
-        . signature-box-label {{
-            font-size: 12px;
-            font-weight: bold;
-        }}
-        .status-badge {{
-            display: inline-block;
-            padding: 8px 16px;
-            border-radius: 6px;
-            font-weight: bold;
-            margin-bottom: 20px;
-        }}
-        . status-paid {{
-            background: #d1fae5;
-            color: #065f46;
-        }}
-        .status-pending {{
-            background: #fed7aa;
-            color: #92400e;
-        }}
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-            margin-bottom: 20px;
-        }}
-        thead {{
-            background:  #f3f4f6;
-        }}
-        th {{
-            padding: 10px;
-            text-align:  left;
-            border-bottom:  2px solid #667eea;
-        }}
-        td {{
-            padding: 10px;
-            border-bottom:  1px solid #e5e7eb;
-        }}
-        . print-button {{
-            padding: 10px 20px;
-            background: #667eea;
-            color: white;
-            border: none;
-            border-radius: 6px;
-            cursor: pointer;
-            margin-bottom: 20px;
-            font-weight: bold;
-        }}
-        .print-button:hover {{
-            background: #764ba2;
-        }}
-        @media print {{
-            body {{
-                padding: 0;
-            }}
-            .print-button {{
-                display: none;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <button class="print-button" onclick="window.print()">
-        🖨️ In / In PDF
-    </button>
-
-    <div class="header">
-        <h1>HỢP ĐỒNG CHO THUÊ</h1>
-        <div class="contract-number">Số:  HĐ-{contract_id: 04d} | Ngày lập:  {datetime.now().strftime('%d/%m/%Y')}</div>
-    </div>
-
-    <div class="section">
-        <div class="status-badge {status_class}">
-            {status_text}
-        </div>
-    </div>
-
-    <div class="section">
-        <div class="section-title">📋 THÔNG TIN HỢP ĐỒNG</div>
-        <div class="info-row">
-            <div class="info-label">Mã hợp đồng:</div>
-            <div class="info-value">HĐ-{contract_id: 04d}</div>
-        </div>
-        <div class="info-row">
-            <div class="info-label">Trạng thái:</div>
-            <div class="info-value">{contract.status. upper()}</div>
-        </div>
-        <div class="info-row">
-            <div class="info-label">Ngày bắt đầu:</div>
-            <div class="info-value">{contract.start_date.strftime('%d/%m/%Y')}</div>
-        </div>
-        <div class="info-row">
-            <div class="info-label">Ngày kết thúc:</div>
-            <div class="info-value">{contract.end_date.strftime('%d/%m/%Y')}</div>
-        </div>
-    </div>
-
-    <div class="section">
-        <div class="section-title">🏠 THÔNG TIN TÀI SẢN CHO THUÊ</div>
-        <div class="info-row">
-            <div class="info-label">Tên tài sản:</div>
-            <div class="info-value">{prop.name}</div>
-        </div>
-        <div class="info-row">
-            <div class="info-label">Địa chỉ:</div>
-            <div class="info-value">{prop.address}</div>
-        </div>
-        <div class="info-row">
-            <div class="info-label">Loại: </div>
-            <div class="info-value">{prop.category}</div>
-        </div>
-        <div class="info-row">
-            <div class="info-label">Giá thuê/ngày: </div>
-            <div class="info-value">{prop.price: ,.0f}đ</div>
-        </div>
-        <div class="info-row">
-            <div class="info-label">Trạng thái tài sản:</div>
-            <div class="info-value">{prop.status}</div>
-        </div>
-    </div>
-
-    <div class="section">
-        <div class="section-title">👤 THÔNG TIN KHÁCH THUÊ</div>
-        <div class="info-row">
-            <div class="info-label">Tên: </div>
-            <div class="info-value">{tenant.full_name or tenant.username}</div>
-        </div>
-        <div class="info-row">
-            <div class="info-label">Email:</div>
-            <div class="info-value">{tenant. email}</div>
-        </div>
-        <div class="info-row">
-            <div class="info-label">Tên đăng nhập:</div>
-            <div class="info-value">{tenant.username}</div>
-        </div>
-    </div>
-
-    <div class="section">
-        <div class="section-title">💰 THÔNG TIN THANH TOÁN</div>
-        <div class="highlight">
-            <div class="highlight-row">
-                <span>Tổng tiền hợp đồng:</span>
-                <span>{contract.total_price:,.0f}đ</span>
-            </div>
-            <div class="highlight-row">
-                <span>Tiền cọc:</span>
-                <span>{contract.deposit: ,.0f}đ</span>
-            </div>
-            <div class="highlight-row">
-                <span>Đã thanh toán:</span>
-                <span style="color: #10b981;">{paid:,.0f}đ</span>
-            </div>
-            <div class="highlight-row" style="color: {'#065f46' if remaining <= 0 else '#dc2626'}; font-size: 18px; margin-top: 10px;">
-                <span>Còn thiếu:</span>
-                <span>{remaining:,.0f}đ</span>
-            </div>
-        </div>
-    </div>
-
-    <div class="section">
-        <div class="section-title">📊 LỊCH SỬ THANH TOÁN</div>
-        <table>
-            <thead>
-                <tr>
-                    <th>STT</th>
-                    <th>Ngày</th>
-                    <th>Ghi chú</th>
-                    <th style="text-align:  right;">Số tiền</th>
-                </tr>
-            </thead>
-            <tbody>
-                {payment_rows}
-            </tbody>
-        </table>
-    </div>
-
-    <div class="section">
-        <div class="section-title">📝 ĐIỀU KHOẢN VÀ ĐIỀU KIỆN</div>
-        <ul style="line-height: 1.8; color: #1f2937;">
-            <li>Khách thuê phải trả tiền đúng hạn theo hợp đồng</li>
-            <li>Khách thuê chịu trách nhiệm bảo quản tài sản</li>
-            <li>Chủ nhà sẽ ghi nhận mọi thanh toán ngay khi nhận tiền</li>
-            <li>Trong trường hợp hư hỏng, khách thuê phải bồi thường theo định giá</li>
-            <li>Hợp đồng sẽ tự động kết thúc khi hết thời gian cho thuê</li>
-        </ul>
-    </div>
-
-    <div class="signature-area">
-        <div class="signature-box">
-            <div class="signature-box-label">Chủ nhà/Chủ tài sản</div>
-            <div class="signature-box-line"></div>
-            <small>Ký tên, ngày tháng</small>
-        </div>
-        <div class="signature-box">
-            <div class="signature-box-label">Khách thuê</div>
-            <div class="signature-box-line"></div>
-            <small>Ký tên, ngày tháng</small>
-        </div>
-    </div>
-
-    <div class="footer">
-        <p>Hợp đồng này được tạo bởi Rental Pro | © 2024</p>
-        <p>Ngày tạo: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}</p>
-    </div>
-</body>
-</html>
-    """
-    
-    return HTMLResponse(content=html_content)
+
+@app.get("/contracts/{contract_id}/pdf")
+async def download_contract_pdf(contract_id: int, request: Request, db: Session = Depends(get_read_db)):
+    """Tải hợp đồng dạng PDF thật (render trên process pool, cache theo nội dung)"""
+    if not pdf.is_available():
+        raise HTTPException(status_code=501, detail="Server chưa cài weasyprint để xuất PDF")
+
+    rendered = await run_in_threadpool(render_contract_by_id, db, contract_id)
+    if not rendered:
+        raise HTTPException(status_code=404, detail="Hợp đồng không tồn tại")
+
+    version, html_content = rendered
+    headers = {
+        "ETag": f'"{version}"',
+        "Cache-Control": "no-cache",
+        "Content-Disposition": f'inline; filename="HD-{contract_id:04d}.pdf"',
+    }
+    if documents.etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        future = pdf.submit_render(version, html_content)
+    except pdf.PdfBusyError:
+        raise HTTPException(status_code=503, detail="Đang có quá nhiều PDF chờ render, thử lại sau")
+
+    try:
+        content = await asyncio.wrap_future(future)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Render PDF lỗi: {e}")
+    return Response(content=content, media_type="application/pdf", headers=headers)
+
+
+@app.post("/contracts/pdf-zip")
+def download_contracts_zip(req: schemas.ContractZipRequest, db: Session = Depends(get_db)):
+    """Tải nhiều hợp đồng PDF trong 1 file ZIP (theo danh sách id hoặc bộ lọc)"""
+    if not pdf.is_available():
+        raise HTTPException(status_code=501, detail="Server chưa cài weasyprint để xuất PDF")
+
+    query = filter_contracts(
+        documents.contract_query(db), req.status, req.property_id, req.tenant_id, req.date_from, req.date_to
+    )
+    if req.contract_ids is not None:
+        query = query.filter(models.Contract.id.in_(req.contract_ids))
+
+    contracts = query.order_by(models.Contract.id).limit(PDF_ZIP_MAX + 1).all()
+    if not contracts:
+        raise HTTPException(status_code=404, detail="Không có hợp đồng nào phù hợp")
+    if len(contracts) > PDF_ZIP_MAX:
+        raise HTTPException(status_code=400, detail=f"Tối đa {PDF_ZIP_MAX} hợp đồng mỗi lần tải")
+
+    docs = []
+    for contract in contracts:
+        version, html_content = documents.render_contract(contract)
+        docs.append((f"HD-{contract.id:04d}.pdf", version, html_content))
+
+    return StreamingResponse(
+        pdf.stream_zip(docs),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="hop-dong_{date.today().isoformat()}.zip"'}
+    )
 
 # ==================================================
 # DAMAGE TRACKING API ✅ MỚI
@@ -703,17 +1199,42 @@ def create_damage_report(damage:  schemas.DamageReportCreate, db: Session = Depe
     )
     
     db.add(new_damage)
+    db.flush()
+    feed.publish(db, "damage.reported", new_damage.id, new_damage.contract_id)
     db.commit()
     db.refresh(new_damage)
     return new_damage
 
 
-@app.get("/contracts/{contract_id}/damages", response_model=List[schemas. DamageReportResponse])
-def list_damages(contract_id: int, db: Session = Depends(get_db)):
+@app.get("/contracts/{contract_id}/damages", response_model=schemas.Page[schemas.DamageReportResponse])
+async def list_damages(
+    contract_id: int,
+    request: Request,
+    response: Response,
+    status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_read_db)
+):
     """Lấy danh sách hư hỏng của hợp đồng"""
-    return db.query(models.DamageReport).filter(
+    cached = await not_modified(request, response, db, "damage_reports")
+    if cached:
+        return cached
+
+    query = select(models.DamageReport).where(
         models.DamageReport.contract_id == contract_id
-    ).all()
+    )
+    if status:
+        query = query.filter(models.DamageReport.status == status)
+    if date_from:
+        query = query.filter(models.DamageReport.reported_date >= date_from)
+    if date_to:
+        query = query.filter(models.DamageReport.reported_date <= date_to)
+
+    rows = (await db.scalars(paginate(query, models.DamageReport.id, cursor, limit))).all()
+    return make_page(rows, limit)
 
 
 @app.put("/damage-reports/{damage_id}", response_model=schemas.DamageReportResponse)
@@ -728,6 +1249,7 @@ def update_damage(damage_id: int, damage:  schemas.DamageReportCreate, db: Sessi
     report.repair_cost = damage.repair_cost
     report.reported_date = damage.reported_date
     
+    feed.publish(db, "damage.updated", report.id, report.contract_id)
     db.commit()
     db.refresh(report)
     return report
@@ -743,6 +1265,7 @@ def mark_repaired(damage_id: int, db: Session = Depends(get_db)):
     report.status = "repaired"
     report.repaired_date = date.today()
     
+    feed.publish(db, "damage.repaired", report.id, report.contract_id)
     db.commit()
     db.refresh(report)
     return report
@@ -756,5 +1279,254 @@ def delete_damage(damage_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Báo cáo không tồn tại")
     
     db.delete(report)
+    feed.publish(db, "damage.removed", damage_id, report.contract_id)
     db.commit()
     return {"message": "Đã xóa báo cáo hư hỏng"}
+
+
+# ==================================================
+# STATS API (DASHBOARD)
+# ==================================================
+STATS_GROUPS = {
+    "property": models.RevenueRollup.property_id,
+    "category": models.Property.category,
+    "month": models.RevenueRollup.month,
+}
+
+
+def to_stats(revenue, contract_value, deposits, damage_cost) -> dict:
+    return {
+        "revenue": revenue or 0,
+        "contract_value": contract_value or 0,
+        "outstanding": (contract_value or 0) - (revenue or 0),
+        "deposits": deposits or 0,
+        "damage_cost": damage_cost or 0,
+    }
+
+
+@app.get("/stats", response_model=schemas.StatsResponse)
+async def get_stats(
+    request: Request,
+    response: Response,
+    group_by: Optional[str] = Query(None, pattern="^(property|category|month)$"),
+    month_from: Optional[date] = None,
+    month_to: Optional[date] = None,
+    property_id: Optional[int] = None,
+    category: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Tổng doanh thu / còn phải thu / tiền cọc / chi phí hư hỏng, đọc từ bảng rollup
+    (số dòng = số tài sản x số tháng, không phụ thuộc số lượng thanh toán)"""
+    cached = await not_modified(request, response, db, "contracts", "payments", "damage_reports")
+    if cached:
+        return cached
+
+    rollup = models.RevenueRollup
+    sums = [func.sum(getattr(rollup, name)) for name in rollups.MEASURES]
+    conditions = []
+    if month_from:
+        conditions.append(rollup.month >= rollups.month_start(month_from))
+    if month_to:
+        conditions.append(rollup.month <= month_to)
+    if property_id is not None:
+        conditions.append(rollup.property_id == property_id)
+    if category:
+        conditions.append(models.Property.category == category)
+
+    def build(*columns):
+        query = select(*columns, *sums).where(*conditions)
+        if category or group_by == "category":
+            query = query.join(models.Property, models.Property.id == rollup.property_id)
+        return query
+
+    totals = (await db.execute(build())).one()
+    groups = []
+    if group_by:
+        key = STATS_GROUPS[group_by]
+        rows = await db.execute(build(key).group_by(key).order_by(key))
+        groups = [dict(to_stats(*values), key=str(group_key)) for group_key, *values in rows]
+
+    return {"totals": to_stats(*totals), "groups": groups}
+
+
+@app.get("/analytics/occupancy", response_model=schemas.OccupancyReport)
+async def get_occupancy(
+    request: Request,
+    response: Response,
+    date_from: date,
+    date_to: date,
+    interval: str = Query("month", pattern="^(day|month)$"),
+    group_by: Optional[str] = Query("property", pattern="^(property|category)$"),
+    property_id: Optional[int] = None,
+    category: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Tỷ lệ lấp đầy, số ngày trống, doanh thu / ngày khả dụng theo tài sản hoặc danh mục,
+    kèm chuỗi theo ngày / tháng. 2 query dạng cột, phần tính toán bằng NumPy (xem occupancy.py)"""
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from phải nhỏ hơn hoặc bằng date_to")
+    if (date_to - date_from).days + 1 > occupancy.MAX_HORIZON_DAYS:
+        raise HTTPException(status_code=400, detail=f"Khoảng ngày tối đa {occupancy.MAX_HORIZON_DAYS} ngày")
+    cached = await not_modified(request, response, db, "properties", "contracts")
+    if cached:
+        return cached
+
+    prop, contract = models.Property, models.Contract
+    prop_filter = []
+    if property_id is not None:
+        prop_filter.append(prop.id == property_id)
+    if category:
+        prop_filter.append(prop.category == category)
+    props = (await db.execute(select(prop.id, prop.category).where(*prop_filter))).all()
+
+    contract_query = occupancy.contracts_query(date_from, date_to, db.bind.dialect.name)
+    if property_id is not None:
+        contract_query = contract_query.where(contract.property_id == property_id)
+    elif category:
+        contract_query = contract_query.join(prop, prop.id == contract.property_id).where(prop.category == category)
+    contracts = (await db.execute(contract_query)).all()
+
+    return await run_in_threadpool(
+        occupancy.compute, date_from, date_to,
+        [row.id for row in props], [row.category for row in props], contracts, group_by, interval
+    )
+
+
+# ==================================================
+# BULK IMPORT API
+# ==================================================
+async def iter_request_lines(request: Request):
+    """Đọc body khi dữ liệu đang được upload (không chờ hết file), mỗi chunk -> list các dòng đủ (giữ "\n").
+    1 bộ giải mã cho cả luồng: ký tự UTF-8 nhiều byte bị cắt giữa 2 chunk vẫn ghép đúng"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    first = True
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        if first and buffer:
+            buffer = buffer.lstrip("\ufeff")
+            first = False
+        lines = buffer.split("\n")
+        buffer = lines.pop()
+        if lines:
+            yield [line + "\n" for line in lines]
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield [buffer]
+
+
+def iter_received_lines(receive) -> Iterator[str]:
+    """Chạy trong thread: lấy các lô dòng event loop gửi sang qua memory stream"""
+    while True:
+        try:
+            lines = from_thread.run(receive.receive)
+        except anyio.EndOfStream:
+            return
+        yield from lines
+
+
+@app.post("/import/{kind}", response_model=schemas.ImportReport)
+async def bulk_import(
+    kind: str,
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """Nhập hàng loạt properties / tenants / contracts / payments từ CSV hoặc NDJSON (body thô)"""
+    if kind not in KINDS:
+        raise HTTPException(status_code=404, detail=f"Không hỗ trợ nhập '{kind}'")
+
+    owner_id = None
+    if kind == "properties":
+        owner_id = await run_in_threadpool(get_owner_id, db)
+
+    importer = BulkImporter(db, kind, format or detect_format(request.headers.get("content-type")), owner_id)
+
+    # 1 thread đọc liên tục cả luồng (csv.reader cần thấy dòng kế tiếp khi ô có xuống dòng),
+    # event loop đẩy dữ liệu upload sang; buffer có giới hạn nên upload nhanh hơn ghi DB thì phải chờ
+    send, receive = anyio.create_memory_object_stream(IMPORT_BUFFER_CHUNKS)
+
+    def consume():
+        with receive:
+            importer.import_stream(iter_received_lines(receive), batch_size)
+
+    worker = asyncio.ensure_future(run_in_threadpool(consume))
+    try:
+        async with send:
+            async for lines in iter_request_lines(request):
+                await send.send(lines)
+    except anyio.BrokenResourceError:
+        pass  # thread đã dừng vì lỗi -> lỗi thật nhận ở `await worker`
+    finally:
+        # Client ngắt giữa chừng: vẫn chờ thread ghi xong lô đang dở trước khi session bị đóng
+        await worker
+
+    report = importer.report()
+    if report["inserted"]:
+        # 1 sự kiện cho cả lô: client tải lại toàn bộ thay vì nhận hàng nghìn sự kiện lẻ
+        await run_in_threadpool(publish_import, db, kind, report["inserted"])
+    return report
+
+
+def publish_import(db: Session, kind: str, inserted: int):
+    feed.publish(db, "import.completed", None, kind=kind, inserted=inserted)
+    db.commit()
+
+
+# ==================================================
+# EXPORT API (STREAMING)
+# ==================================================
+@app.get("/export/{kind}")
+def export_data(
+    kind: str,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    gzip: bool = False
+):
+    """Xuất contracts / payments / damages cho kế toán, stream từng phần thay vì trả 1 lần"""
+    if kind not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Không hỗ trợ xuất '{kind}'")
+
+    filename = f"{kind}_{date.today().isoformat()}.{format}"
+    media_type = MEDIA_TYPES[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        stream_export(kind, format, date_from, date_to, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+# ==================================================
+# CHANGE FEED API (SERVER-SENT EVENTS)
+# ==================================================
+@app.get("/events")
+async def stream_events(request: Request, last_event_id: Optional[int] = Query(None, ge=0)):
+    """Đẩy thay đổi xuống trình duyệt (EventSource) thay cho việc poll định kỳ.
+
+    Kết nối lại với header Last-Event-ID (trình duyệt tự gửi) hoặc ?last_event_id=
+    để nhận tiếp các sự kiện bị lỡ.
+    """
+    header = request.headers.get("last-event-id")
+    since = last_event_id
+    if since is None and header and header.isdigit():
+        since = int(header)
+
+    async def event_stream():
+        # Trình duyệt tự kết nối lại sau 3s nếu mất kết nối
+        yield "retry: 3000\n\n"
+        async for message in feed.change_feed.subscribe(since):
+            if await request.is_disconnected():
+                break
+            yield ": ping\n\n" if message is None else feed.format_sse(message)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
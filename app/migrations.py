@@ -0,0 +1,191 @@
+import hashlib
+import os
+import sys
+import time
+
+from sqlalchemy import bindparam, inspect, select, text, update
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from . import models, rollups, search, versioning
+from .database import dialect_insert
+
+# Tên constraint chống trùng lịch (dùng để nhận diện lỗi 23P01 -> 409)
+BOOKING_CONSTRAINT = "contracts_no_overlap"
+
+# Các lệnh nâng cấp chỉ chạy trên PostgreSQL, viết idempotent để chạy lại nhiều lần
+POSTGRES_UPGRADES = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    f"""
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = '{BOOKING_CONSTRAINT}') THEN
+            ALTER TABLE contracts ADD CONSTRAINT {BOOKING_CONSTRAINT}
+                EXCLUDE USING gist (
+                    property_id WITH =,
+                    daterange(start_date, end_date, '[]') WITH &&
+                ) WHERE (status = 'active');
+        END IF;
+    END $$;
+    """,
+    # Tìm kiếm không dấu: LIKE '%từ khóa%' + word_similarity dùng được index này
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_properties_search_trgm ON properties USING gin (search_text gin_trgm_ops)",
+    # DB cũ: FK revenue_rollups -> properties chưa có ON DELETE CASCADE (xóa tài sản bị lỗi FK)
+    """
+    DO $$
+    DECLARE fk text;
+    BEGIN
+        SELECT conname INTO fk FROM pg_constraint
+        WHERE conrelid = 'revenue_rollups'::regclass AND confrelid = 'properties'::regclass
+            AND contype = 'f' AND confdeltype <> 'c';
+        IF fk IS NOT NULL THEN
+            EXECUTE format('ALTER TABLE revenue_rollups DROP CONSTRAINT %I', fk);
+            ALTER TABLE revenue_rollups ADD CONSTRAINT revenue_rollups_property_id_fkey
+                FOREIGN KEY (property_id) REFERENCES properties (id) ON DELETE CASCADE;
+        END IF;
+    END $$;
+    """,
+]
+
+# Số dòng mỗi lần điền dữ liệu cho cột mới
+BACKFILL_BATCH = 1000
+
+# Số lần thử lại khi DB chưa sẵn sàng lúc khởi động (VD: Render cold start), chờ tăng dần
+MIGRATION_RETRIES = int(os.getenv("MIGRATION_RETRIES", "5"))
+MIGRATION_RETRY_DELAY = float(os.getenv("MIGRATION_RETRY_DELAY", "1"))
+
+# Tắt (false) khi đã chạy `python -m app.migrations` ở bước release/deploy riêng
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+_migrations = models.SchemaMigration.__table__
+
+
+def add_missing_columns(engine):
+    """create_all không sửa bảng đã có -> thêm các cột mới (luôn nullable) cho DB cũ"""
+    inspector = inspect(engine)
+    for table in models.Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            print(f"🛠️  Thêm cột {table.name}.{column.name}")
+
+
+def backfill_search_text(engine):
+    """Điền search_text cho các tài sản tạo trước khi có cột này"""
+    prop = models.Property
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(prop.id, prop.name, prop.address, prop.description)
+                .where(prop.search_text.is_(None)).limit(BACKFILL_BATCH)
+            ).all()
+            if not rows:
+                return
+            conn.execute(
+                update(prop.__table__).where(prop.__table__.c.id == bindparam("row_id")),
+                [
+                    {"row_id": row.id, "search_text": search.property_search_text(row.name, row.address, row.description)}
+                    for row in rows
+                ]
+            )
+
+
+def schema_fingerprint(engine) -> str:
+    """Băm DDL của toàn bộ bảng / index + các lệnh nâng cấp: đổi model là đổi fingerprint"""
+    digest = hashlib.sha256()
+    for table in models.Base.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=engine.dialect)).encode())
+        for index in sorted(table.indexes, key=lambda item: item.name):
+            digest.update(str(CreateIndex(index).compile(dialect=engine.dialect)).encode())
+    for statement in POSTGRES_UPGRADES:
+        digest.update(statement.encode())
+    return digest.hexdigest()
+
+
+def is_current(engine, fingerprint: str) -> bool:
+    """1 query: schema trong DB đã đúng phiên bản code hiện tại chưa"""
+    try:
+        with engine.connect() as conn:
+            found = conn.execute(select(_migrations.c.fingerprint).where(_migrations.c.fingerprint == fingerprint))
+            return found.first() is not None
+    except (OperationalError, DBAPIError) as e:
+        if not is_table_missing(e):
+            raise
+        return False  # DB mới, chưa có bảng schema_migrations
+
+
+def is_table_missing(error: DBAPIError) -> bool:
+    # PostgreSQL: 42P01 undefined_table; SQLite: "no such table"
+    return getattr(error.orig, "pgcode", None) == "42P01" or "no such table" in str(error.orig)
+
+
+def migrate(engine, force: bool = False) -> bool:
+    """Chạy migration nếu schema đổi (hoặc force), thử lại khi chưa kết nối được DB.
+    Trả về True nếu đã chạy, False nếu bỏ qua vì schema không đổi."""
+    fingerprint = schema_fingerprint(engine)
+    for attempt in range(1, MIGRATION_RETRIES + 1):
+        try:
+            if not force and is_current(engine, fingerprint):
+                return False
+            if run_migrations(engine):
+                with engine.begin() as conn:
+                    conn.execute(dialect_insert(conn)(_migrations).on_conflict_do_nothing(), {"fingerprint": fingerprint})
+            return True
+        except OperationalError as e:
+            if attempt == MIGRATION_RETRIES:
+                raise
+            delay = MIGRATION_RETRY_DELAY * 2 ** (attempt - 1)
+            print(f"⏳ Chưa kết nối được DB (lần {attempt}/{MIGRATION_RETRIES}), thử lại sau {delay:g}s: {e.orig}")
+            time.sleep(delay)
+
+
+def run_migrations(engine) -> bool:
+    """Tạo bảng còn thiếu, index còn thiếu và các constraint riêng của PostgreSQL.
+    Trả về False nếu có lệnh nâng cấp bị bỏ qua (lần khởi động sau sẽ thử lại)."""
+    models.Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+    backfill_search_text(engine)
+
+    # create_all bỏ qua bảng đã tồn tại -> bổ sung index mới cho DB cũ
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    with engine.begin() as conn:
+        versioning.seed(conn)
+        # Bảng rollup mới tạo trên DB đã có dữ liệu -> tính lần đầu
+        if rollups.is_empty(conn):
+            rollups.rebuild(conn)
+
+    if engine.dialect.name != "postgresql":
+        return True
+
+    complete = True
+    for statement in POSTGRES_UPGRADES:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(statement))
+        except Exception as e:
+            # VD: dữ liệu cũ đang trùng lịch hoặc thiếu quyền CREATE EXTENSION
+            print(f"⚠️  Migration bị bỏ qua: {e}")
+            complete = False
+    return complete
+
+
+if __name__ == "__main__":
+    from .database import engine
+
+    if sys.argv[1:] not in ([], ["--force"]):
+        print("Cách dùng: python -m app.migrations [--force]")
+        sys.exit(2)
+    started = time.perf_counter()
+    applied = migrate(engine, force=bool(sys.argv[1:]))
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"✅ Đã chạy migration ({elapsed:.0f} ms)" if applied else f"✅ Schema đã đúng phiên bản, bỏ qua ({elapsed:.0f} ms)")
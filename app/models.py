@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, Date, DateTime, Text
+from sqlalchemy import BigInteger, Boolean, Column, ForeignKey, Integer, String, Float, Date, DateTime, Text, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from . database import Base
@@ -28,6 +28,12 @@ class Property(Base):
     category = Column(String, default="real_estate") 
     image_url = Column(String, nullable=True)
     status = Column(String, default="available")
+    # Tên + địa chỉ + mô tả đã bỏ dấu, viết thường (xem search.py), có index trigram trên PostgreSQL
+    search_text = Column(Text, nullable=True)
+    # Tọa độ + geohash (xem geo.py); geohash có index để tìm theo bán kính
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    geohash = Column(String(12), nullable=True, index=True)
     
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="properties")
@@ -37,16 +43,35 @@ class Property(Base):
 # --- 3. CONTRACT ---
 class Contract(Base):
     __tablename__ = "contracts"
+    __table_args__ = (
+        # Phục vụ kiểm tra trùng lịch / tìm tài sản trống theo khoảng ngày
+        Index("ix_contracts_property_status_dates", "property_id", "status", "start_date", "end_date"),
+        # Lần chạy tính tiền chỉ quét các hợp đồng đến hạn xuất hóa đơn
+        Index(
+            "ix_contracts_next_invoice", "next_invoice_date",
+            postgresql_where=text("next_invoice_date IS NOT NULL"),
+            sqlite_where=text("next_invoice_date IS NOT NULL"),
+        ),
+        # Job quét trạng thái tìm hợp đồng đang hiệu lực đã hết hạn
+        Index(
+            "ix_contracts_active_end", "end_date",
+            postgresql_where=text("status = 'active'"),
+            sqlite_where=text("status = 'active'"),
+        ),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    property_id = Column(Integer, ForeignKey("properties.id"))
-    tenant_id = Column(Integer, ForeignKey("users.id"))
+    property_id = Column(Integer, ForeignKey("properties.id"), index=True)
+    tenant_id = Column(Integer, ForeignKey("users.id"), index=True)
     
     start_date = Column(Date)
     end_date = Column(Date)
     
     total_price = Column(Float, default=0) 
     deposit = Column(Float, default=0)
-    status = Column(String, default="active")
+    status = Column(String, default="active")  # active / completed (hết hạn, xem sweeper.py)
+    rental_type = Column(String, default="daily")  # daily / monthly
+    # Hạn của kỳ hóa đơn kế tiếp chưa xuất (hợp đồng theo tháng); NULL = đã xuất đủ
+    next_invoice_date = Column(Date, nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -54,12 +79,13 @@ class Contract(Base):
     tenant = relationship("User", back_populates="contracts")
     payments = relationship("Payment", back_populates="contract")
     damages = relationship("DamageReport", back_populates="contract")
+    invoices = relationship("Invoice", back_populates="contract", cascade="all, delete-orphan")
 
 # --- 4. PAYMENT ---
 class Payment(Base):
     __tablename__ = "payments"
     id = Column(Integer, primary_key=True, index=True)
-    contract_id = Column(Integer, ForeignKey("contracts.id"))
+    contract_id = Column(Integer, ForeignKey("contracts.id"), index=True)
     amount = Column(Float)
     payment_date = Column(Date)
     note = Column(String, nullable=True)
@@ -72,7 +98,7 @@ class DamageReport(Base):
     __tablename__ = "damage_reports"
     
     id = Column(Integer, primary_key=True, index=True)
-    contract_id = Column(Integer, ForeignKey("contracts.id"))
+    contract_id = Column(Integer, ForeignKey("contracts.id"), index=True)
     property_id = Column(Integer, ForeignKey("properties.id"))
     
     description = Column(Text)
@@ -86,4 +112,103 @@ class DamageReport(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     contract = relationship("Contract", back_populates="damages")
-    property = relationship("Property", back_populates="damages")
\ No newline at end of file
+    property = relationship("Property", back_populates="damages")
+
+# --- 6. CHANGE VERSION (phiên bản dữ liệu từng bảng, phục vụ ETag / 304) ---
+class ChangeVersion(Base):
+    __tablename__ = "change_versions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# --- 7. CHANGE EVENT (luồng sự kiện thay đổi cho SSE, id dùng làm resume token) ---
+class ChangeEvent(Base):
+    __tablename__ = "change_events"
+    # SQLite mặc định dùng lại id đã xóa -> resume token cũ sẽ trỏ nhầm sự kiện
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    event_type = Column(String, nullable=False)
+    entity_id = Column(Integer)
+    contract_id = Column(Integer, nullable=True)
+    payload = Column(Text)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+# --- 8. REVENUE ROLLUP (số liệu tài chính cộng dồn theo tài sản + tháng, cho dashboard) ---
+class RevenueRollup(Base):
+    __tablename__ = "revenue_rollups"
+
+    # Xóa tài sản -> xóa luôn số liệu cộng dồn của nó
+    property_id = Column(Integer, ForeignKey("properties.id", ondelete="CASCADE"), primary_key=True)
+    month = Column(Date, primary_key=True)  # ngày đầu tháng
+
+    revenue = Column(Float, nullable=False, default=0)          # tiền đã thu (payments.is_paid)
+    contract_value = Column(Float, nullable=False, default=0)   # tổng giá trị hợp đồng (theo tháng bắt đầu)
+    deposits = Column(Float, nullable=False, default=0)         # tiền cọc đang giữ
+    damage_cost = Column(Float, nullable=False, default=0)      # chi phí hư hỏng (theo ngày báo)
+
+# --- 9. SCHEMA MIGRATION (dấu vân tay schema đã áp dụng, khởi động bỏ qua migration nếu không đổi) ---
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+
+    fingerprint = Column(String(64), primary_key=True)
+    applied_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# --- 10. INVOICE (hóa đơn từng kỳ của hợp đồng theo tháng) ---
+class Invoice(Base):
+    __tablename__ = "invoices"
+    __table_args__ = (
+        # Mỗi kỳ của 1 hợp đồng chỉ có 1 hóa đơn -> chạy lại lần tính tiền không tạo trùng
+        UniqueConstraint("contract_id", "installment", name="uq_invoices_contract_installment"),
+        # Truy vấn hóa đơn quá hạn chỉ đọc phần index của hóa đơn chưa thanh toán
+        Index(
+            "ix_invoices_open_due", "due_date",
+            postgresql_where=text("status = 'open'"),
+            sqlite_where=text("status = 'open'"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False)
+    installment = Column(Integer, nullable=False)  # kỳ thứ 1, 2, ...
+    due_date = Column(Date, nullable=False)
+    amount = Column(Float, nullable=False)
+    status = Column(String, nullable=False, default="open")  # open / paid
+    payment_id = Column(Integer, ForeignKey("payments.id"), nullable=True)
+    paid_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    contract = relationship("Contract", back_populates="invoices")
+    payment = relationship("Payment")
+
+# --- 11. JOB RUN (lịch sử các lần chạy job định kỳ) ---
+class JobRun(Base):
+    __tablename__ = "job_runs"
+
+    id = Column(Integer, primary_key=True)
+    job = Column(String, nullable=False, index=True)
+    as_of = Column(Date, nullable=False)
+    status = Column(String, nullable=False, default="running")  # running / done / failed
+    processed = Column(Integer, nullable=False, default=0)
+    created = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    metrics = Column(Text, nullable=True)  # JSON: số dòng từng bước, thời gian chạy
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+# --- 12. PRICING RULE (giá tuần, hệ số cuối tuần / theo mùa, giảm giá thuê dài; xem pricing.py) ---
+class PricingRule(Base):
+    __tablename__ = "pricing_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Phạm vi: tài sản cụ thể > danh mục > toàn hệ thống (cả 2 cột NULL)
+    property_id = Column(Integer, ForeignKey("properties.id", ondelete="CASCADE"), nullable=True, index=True)
+    category = Column(String, nullable=True)
+    kind = Column(String, nullable=False)  # weekly / weekend / season / long_stay
+    factor = Column(Float, nullable=False)  # hệ số nhân giá (0.9 = giảm 10%)
+    start_date = Column(Date, nullable=True)  # season: từ ngày
+    end_date = Column(Date, nullable=True)  # season: đến hết ngày
+    min_days = Column(Integer, nullable=True)  # long_stay: thuê từ số ngày này trở lên
+    name = Column(String, nullable=True)
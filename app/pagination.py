@@ -0,0 +1,43 @@
+import base64
+import json
+from typing import Any, Callable, List, Optional
+
+from fastapi import HTTPException
+
+# Số bản ghi mặc định / tối đa cho 1 trang
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def encode_cursor(last_id: int) -> str:
+    """Mã hóa id cuối trang thành cursor (client coi như chuỗi mờ)"""
+    raw = json.dumps({"id": last_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor không hợp lệ")
+
+
+def paginate(query, key_column, cursor: Optional[str], limit: int):
+    """Keyset pagination: WHERE key > cursor ORDER BY key LIMIT n+1 (không OFFSET)
+
+    Dùng được cho cả Query (ORM) lẫn select() vì đều có filter/order_by/limit.
+    Lấy dư 1 dòng để biết còn trang sau hay không.
+    """
+    last_id = decode_cursor(cursor)
+    if last_id is not None:
+        query = query.filter(key_column > last_id)
+    return query.order_by(key_column).limit(limit + 1)
+
+
+def make_page(rows: List[Any], limit: int, key: Callable[[Any], int] = lambda r: r.id) -> dict:
+    items = rows[:limit]
+    next_cursor = encode_cursor(key(items[-1])) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
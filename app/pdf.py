@@ -0,0 +1,154 @@
+"""Chuyển văn bản hợp đồng (HTML) sang PDF trên process pool riêng.
+
+Render PDF tốn CPU nên chạy ở process khác, không chiếm event loop / threadpool
+của API. Kết quả lưu ra đĩa theo version nội dung (xem documents.contract_version).
+Module này không import database để process con khởi động nhanh.
+"""
+import importlib.util
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional, Tuple
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+# Số job tối đa được xếp hàng cùng lúc, quá mức thì từ chối (503) thay vì dồn ứ
+PDF_MAX_PENDING = int(os.getenv("PDF_MAX_PENDING", str(PDF_WORKERS * 8)))
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "rental_pdf_cache"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(PDF_MAX_PENDING)
+
+
+class PdfBusyError(Exception):
+    pass
+
+
+def is_available() -> bool:
+    return importlib.util.find_spec("weasyprint") is not None
+
+
+def html_to_pdf(html: str) -> bytes:
+    """Chạy trong process con"""
+    from weasyprint import HTML
+    return HTML(string=html).write_pdf()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn thay vì fork: process cha đang có nhiều thread (uvicorn, pool DB)
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# ---------- Cache trên đĩa ----------
+def cache_path(version: str) -> str:
+    return os.path.join(PDF_CACHE_DIR, f"{version}.pdf")
+
+
+def read_cached(version: str) -> Optional[bytes]:
+    try:
+        with open(cache_path(version), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_cached(version: str, data: bytes):
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    # Ghi ra file tạm rồi rename để request khác không đọc phải file dở dang
+    fd, tmp_path = tempfile.mkstemp(dir=PDF_CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, cache_path(version))
+
+
+# ---------- Render ----------
+def submit_render(version: str, html: str, block: bool = False) -> "Future[bytes]":
+    """Trả về Future[bytes]; lấy từ cache đĩa nếu đã có"""
+    cached = read_cached(version)
+    if cached is not None:
+        future: "Future[bytes]" = Future()
+        future.set_result(cached)
+        return future
+
+    if not _pending.acquire(blocking=block):
+        raise PdfBusyError("Hàng đợi render PDF đang đầy")
+
+    try:
+        try:
+            future = get_pool().submit(html_to_pdf, html)
+        except BrokenProcessPool:
+            # Process con chết (VD: bị OOM kill) -> tạo pool mới và thử lại 1 lần
+            shutdown_pool()
+            future = get_pool().submit(html_to_pdf, html)
+    except Exception:
+        _pending.release()
+        raise
+
+    def on_done(done: "Future[bytes]"):
+        _pending.release()
+        if not done.cancelled() and done.exception() is None:
+            write_cached(version, done.result())
+
+    future.add_done_callback(on_done)
+    return future
+
+
+class _ZipStream:
+    """File-like chỉ ghi, để zipfile ghi vào rồi lấy bytes ra gửi dần"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(documents: List[Tuple[str, str, str]]) -> Iterator[bytes]:
+    """documents: [(tên file, version, html)] -> stream file ZIP, file nào xong trước ghi trước"""
+    sink = _ZipStream()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        todo = list(documents)
+        futures = {}
+        while todo or futures:
+            # Giữ số job đang chạy có giới hạn, tránh dồn hết vào hàng đợi của pool
+            while todo and len(futures) < PDF_WORKERS * 2:
+                filename, version, html = todo.pop(0)
+                futures[submit_render(version, html, block=True)] = filename
+
+            done = next(as_completed(futures))
+            filename = futures.pop(done)
+            try:
+                archive.writestr(filename, done.result())
+            except Exception as e:
+                archive.writestr(f"{filename}.error.txt", f"Không render được: {e}")
+            yield sink.pop()
+
+    yield sink.pop()
@@ -0,0 +1,189 @@
+"""Tính tiền thuê: 1 hợp đồng hoặc cả lô báo giá (NumPy, không lặp từng ngày).
+
+Giá gốc là properties.price. Quy tắc giá (bảng pricing_rules) là các hệ số nhân, đặt cho
+1 tài sản, 1 danh mục hoặc toàn hệ thống; mỗi loại quy tắc lấy theo phạm vi cụ thể nhất có đặt:
+
+- weekend:   hệ số cho đêm thứ 6 và thứ 7
+- season:    hệ số cho các đêm trong khoảng ngày (VD: Tết x1.5); các mùa không nên chồng nhau
+- weekly:    giá tuần = hệ số trên phần số đêm đủ tuần (VD: 0.85 -> tuần thứ nhất trở đi giảm 15%)
+- long_stay: thuê từ min_days ngày -> nhân hệ số trên tổng (lấy mốc min_days lớn nhất đạt được)
+
+Thuê theo ngày: giá x tổng hệ số từng đêm (weekend, season), rồi giá tuần, rồi giảm giá thuê dài.
+Thuê theo tháng: số tháng x giá (không áp hệ số đêm), rồi giảm giá thuê dài.
+Không có quy tắc nào thì ra đúng công thức cũ: số ngày x giá, hoặc số tháng x giá.
+"""
+import os
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+RULE_KINDS = ("weekly", "weekend", "season", "long_stay")
+
+# Đêm Chủ nhật - thứ 5 là ngày thường (weekmask của np.busday_count, thứ tự T2..CN)
+WEEKDAY_NIGHTS = "1111001"
+
+# Quy tắc giá được cache trong RAM; ghi qua API thì xóa cache ngay, worker khác thấy sau tối đa ngần này giây
+RULES_CACHE_SECONDS = float(os.getenv("PRICING_RULES_CACHE_SECONDS", "30"))
+
+
+def rental_months(start_date: date, end_date: date) -> int:
+    """Số tháng tính tiền: làm tròn 30 ngày, tối thiểu 1 tháng"""
+    return max(1, ((end_date - start_date).days + 15) // 30)
+
+
+class RuleSet:
+    """Quy tắc giá đã gộp cho 1 tài sản; price() tính cho cả mảng khoảng ngày cùng lúc"""
+
+    def __init__(self, weekly: float = 1.0, weekend: float = 1.0,
+                 seasons: Sequence[Tuple[date, date, float]] = (),
+                 long_stay: Sequence[Tuple[int, float]] = ()):
+        self.weekly = weekly
+        self.weekend = weekend
+        # end_date của mùa tính hết ngày -> đổi sang nửa mở [start, end + 1)
+        self.seasons = [
+            (np.datetime64(start, "D"), np.datetime64(end + timedelta(days=1), "D"), factor)
+            for start, end, factor in seasons
+        ]
+        self.long_stay = sorted(long_stay)
+
+    def price(self, prices: np.ndarray, starts: np.ndarray, ends: np.ndarray, monthly: np.ndarray) -> np.ndarray:
+        """prices: float, starts / ends: datetime64[D], monthly: bool -> tổng tiền từng dòng"""
+        days = (ends - starts).astype(np.int64)
+
+        # Tổng hệ số các đêm: mỗi đêm 1, cộng thêm phần chênh của cuối tuần / mùa
+        nights = days.astype(np.float64)
+        if self.weekend != 1:
+            nights += (self.weekend - 1) * (days - np.busday_count(starts, ends, weekmask=WEEKDAY_NIGHTS))
+        for season_start, season_end, factor in self.seasons:
+            low = np.maximum(starts, season_start)
+            high = np.maximum(np.minimum(ends, season_end), low)
+            overlap = (high - low).astype(np.int64)
+            nights += (factor - 1) * overlap
+            if self.weekend != 1:
+                # Đêm cuối tuần trong mùa: hệ số nhân nhau
+                weekend_in_season = overlap - np.busday_count(low, high, weekmask=WEEKDAY_NIGHTS)
+                nights += (factor - 1) * (self.weekend - 1) * weekend_in_season
+        if self.weekly != 1:
+            full_weeks = days // 7 * 7
+            nights *= 1 - (1 - self.weekly) * full_weeks / np.maximum(days, 1)
+
+        months = np.maximum(1, (days + 15) // 30)
+        totals = np.where(monthly, months * prices, nights * prices)
+
+        if self.long_stay:
+            discount = np.ones_like(totals)
+            for min_days, factor in self.long_stay:
+                discount = np.where(days >= min_days, factor, discount)
+            totals *= discount
+        return np.round(totals, 2)
+
+
+NO_RULES = RuleSet()
+
+
+class RuleBook:
+    """Toàn bộ quy tắc giá, gom theo phạm vi; rule_set() gộp theo thứ tự tài sản > danh mục > toàn hệ thống"""
+
+    def __init__(self, rules: Iterable = ()):
+        # {phạm vi: {loại: [quy tắc]}}, phạm vi = ("property", id) / ("category", tên) / ("global", None)
+        self.scopes: Dict[tuple, Dict[str, list]] = defaultdict(lambda: defaultdict(list))
+        for rule in rules:
+            if rule.property_id is not None:
+                scope = ("property", rule.property_id)
+            elif rule.category:
+                scope = ("category", rule.category)
+            else:
+                scope = ("global", None)
+            self.scopes[scope][rule.kind].append(rule)
+        self._merged: Dict[tuple, RuleSet] = {}
+
+    def _pick(self, kind: str, property_id: Optional[int], category: Optional[str]) -> list:
+        for scope in (("property", property_id), ("category", category), ("global", None)):
+            found = self.scopes.get(scope, {}).get(kind)
+            if found:
+                return found
+        return []
+
+    def rule_set(self, property_id: Optional[int], category: Optional[str]) -> RuleSet:
+        if not self.scopes:
+            return NO_RULES
+        # Tài sản không có quy tắc riêng dùng chung RuleSet của danh mục
+        key = (property_id, category) if ("property", property_id) in self.scopes else (None, category)
+        merged = self._merged.get(key)
+        if merged is None:
+            weekly, weekend = self._pick("weekly", *key), self._pick("weekend", *key)
+            merged = RuleSet(
+                weekly=weekly[0].factor if weekly else 1.0,
+                weekend=weekend[0].factor if weekend else 1.0,
+                seasons=[(r.start_date, r.end_date, r.factor) for r in self._pick("season", *key)],
+                long_stay=[(r.min_days, r.factor) for r in self._pick("long_stay", *key)],
+            )
+            self._merged[key] = merged
+        return merged
+
+
+_book: Optional[RuleBook] = None
+_book_loaded_at = 0.0
+
+
+def cached_rules() -> Optional[RuleBook]:
+    """Quy tắc giá trong cache, None nếu chưa nạp hoặc đã quá RULES_CACHE_SECONDS"""
+    if _book is None or time.monotonic() - _book_loaded_at > RULES_CACHE_SECONDS:
+        return None
+    return _book
+
+
+def store_rules(rules: Iterable) -> RuleBook:
+    global _book, _book_loaded_at
+    _book, _book_loaded_at = RuleBook(rules), time.monotonic()
+    return _book
+
+
+def get_rule_book(db) -> RuleBook:
+    """Quy tắc giá (Session đồng bộ); bản async xem main.load_rule_book"""
+    from . import models
+
+    return cached_rules() or store_rules(db.query(models.PricingRule).order_by(models.PricingRule.id).all())
+
+
+def invalidate_rules():
+    global _book
+    _book = None
+
+
+def quote_many(book: RuleBook, properties: List[tuple], starts: Sequence[date], ends: Sequence[date],
+               rental_types: Sequence[str]) -> np.ndarray:
+    """Báo giá cả lô. properties[i] = (id, giá, danh mục) của dòng i; dòng cùng bộ quy tắc tính chung 1 lần"""
+    count = len(properties)
+    if not count:
+        return np.zeros(0)
+    prices = np.fromiter((p[1] or 0 for p in properties), dtype=np.float64, count=count)
+    start_arr = np.array(starts, dtype="datetime64[D]")
+    end_arr = np.array(ends, dtype="datetime64[D]")
+    monthly = np.fromiter((t == "monthly" for t in rental_types), dtype=bool, count=count)
+
+    groups: Dict[int, Tuple[RuleSet, List[int]]] = {}
+    for index, (property_id, _, category) in enumerate(properties):
+        rule_set = book.rule_set(property_id, category)
+        groups.setdefault(id(rule_set), (rule_set, []))[1].append(index)
+
+    totals = np.empty(count)
+    for rule_set, indexes in groups.values():
+        rows = np.array(indexes) if len(groups) > 1 else slice(None)
+        totals[rows] = rule_set.price(prices[rows], start_arr[rows], end_arr[rows], monthly[rows])
+    return totals
+
+
+def calculate_total_price(price: float, start_date: date, end_date: date, rental_type: str,
+                          rules: RuleSet = NO_RULES) -> float:
+    """Tính tổng tiền hợp đồng: theo ngày, hoặc theo tháng (cùng công thức với /quotes)"""
+    total = rules.price(
+        np.array([price or 0], dtype=np.float64),
+        np.array([start_date], dtype="datetime64[D]"),
+        np.array([end_date], dtype="datetime64[D]"),
+        np.array([rental_type == "monthly"]),
+    )
+    return float(total[0])
@@ -0,0 +1,193 @@
+"""Đo số query SQL + thời gian DB của từng request (phát hiện N+1, request chậm).
+
+- Listener before/after_cursor_execute trên mọi Engine (sync lẫn async) ghi vào profile của
+  request hiện tại (ContextVar: theo được qua run_in_threadpool và greenlet của AsyncSession).
+- Middleware trả header Server-Timing: `db;dur=12.3;desc="5 queries", app;dur=40.1`
+  (DevTools > Network > Timing hiển thị luôn).
+- Request chậm hơn SLOW_REQUEST_MS hoặc vượt QUERY_BUDGET query -> in ra các fingerprint
+  (câu SQL đã bỏ tham số), fingerprint lặp nhiều lần là dấu hiệu N+1.
+- Test: `with assert_max_queries(3): client.get(...)` báo lỗi nếu 1 request chạy quá 3 query.
+
+Query chạy sau khi đã trả header (body của StreamingResponse) không được tính.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROFILING_ENABLED = os.getenv("PROFILING", "true").lower() in ("1", "true", "yes")
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+# Số query tối đa cho 1 request trước khi bị cảnh báo (0 = không kiểm tra)
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "20"))
+# Số fingerprint in ra trong 1 dòng cảnh báo
+REPORT_TOP = 5
+
+_current: ContextVar[Optional["Profile"]] = ContextVar("sql_profile", default=None)
+_START = "profiling_started"
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PARAMS = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+|\?")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"(\(\?\+?\))(?:\s*,\s*\(\?\+?\))+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(statement: str) -> str:
+    """Bỏ chú thích, giá trị, tham số; gộp IN (?, ?, ...) / VALUES (...), (...) -> cùng 1 dạng"""
+    sql = _COMMENTS.sub(" ", statement)
+    sql = _STRINGS.sub("?", sql)
+    sql = _PARAMS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    sql = _LISTS.sub("(?+)", sql)
+    sql = _ROWS.sub(r"\1+", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def fingerprint(statement: str) -> str:
+    return hashlib.md5(normalize(statement).encode("utf-8")).hexdigest()[:8]
+
+
+@dataclass
+class QueryStat:
+    sql: str
+    count: int = 0
+    total_ms: float = 0.0
+
+
+@dataclass
+class Profile:
+    """Các query của 1 request (hoặc 1 khối assert_max_queries)"""
+    label: str = ""
+    queries: int = 0
+    db_ms: float = 0.0
+    total_ms: float = 0.0
+    statements: Dict[str, QueryStat] = field(default_factory=dict)
+
+    def record(self, statement: str, elapsed_ms: float):
+        key = fingerprint(statement)
+        stat = self.statements.get(key)
+        if stat is None:
+            stat = self.statements[key] = QueryStat(normalize(statement)[:200])
+        stat.count += 1
+        stat.total_ms += elapsed_ms
+        self.queries += 1
+        self.db_ms += elapsed_ms
+
+    def top(self, limit: int = REPORT_TOP) -> List[str]:
+        """Fingerprint chạy nhiều lần / tốn thời gian nhất: `a1b2c3d4 x12 8.4ms SELECT ...`"""
+        ranked = sorted(self.statements.items(), key=lambda item: (item[1].count, item[1].total_ms), reverse=True)
+        return [f"{key} x{stat.count} {stat.total_ms:.1f}ms {stat.sql}" for key, stat in ranked[:limit]]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.db_ms:.1f};desc="{self.queries} queries", app;dur={self.total_ms:.1f}'
+
+
+def current() -> Optional[Profile]:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault(_START, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    started = conn.info.get(_START)
+    if profile is None or not started:
+        return
+    elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+    profile.record(statement, elapsed_ms)
+    if elapsed_ms > SLOW_QUERY_MS:
+        print(f"🐢 Query chậm {elapsed_ms:.0f} ms ({profile.label}) {fingerprint(statement)} {normalize(statement)[:300]}")
+
+
+def _handle_error(exception_context):
+    # Query lỗi không tới after_cursor_execute -> bỏ mốc thời gian để không lệch các query sau
+    conn = exception_context.connection
+    started = conn.info.get(_START) if conn is not None else None
+    if started:
+        started.pop()
+
+
+event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+event.listen(Engine, "handle_error", _handle_error)
+
+
+# ---------- Theo dõi từ test ----------
+_watchers: List[List[Profile]] = []
+_watchers_lock = threading.Lock()
+
+
+def _notify(profile: Profile):
+    with _watchers_lock:
+        for finished in _watchers:
+            finished.append(profile)
+
+
+@contextmanager
+def track(label: str = ""):
+    """Đếm query của đoạn code chạy trong khối with (cùng context, kể cả qua run_in_threadpool)"""
+    profile = Profile(label)
+    token = _current.set(profile)
+    started = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.total_ms = (time.perf_counter() - started) * 1000
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """Mỗi request (qua middleware) và đoạn code trực tiếp trong khối with được chạy tối đa `limit` query.
+
+        with assert_max_queries(3):
+            client.get("/contracts/1/download")
+    """
+    finished: List[Profile] = []
+    with _watchers_lock:
+        _watchers.append(finished)
+    try:
+        with track("with assert_max_queries") as direct:
+            yield finished
+    finally:
+        with _watchers_lock:
+            _watchers.remove(finished)
+    over = [profile for profile in [direct, *finished] if profile.queries > limit]
+    if over:
+        details = "\n".join(
+            f"  {profile.label}: {profile.queries} query\n    " + "\n    ".join(profile.top())
+            for profile in over
+        )
+        raise AssertionError(f"Vượt {limit} query:\n{details}")
+
+
+# ---------- Middleware ----------
+async def profile_request(request, call_next):
+    """Gắn vào app bằng app.middleware("http"): Server-Timing + cảnh báo request chậm / quá nhiều query"""
+    if not PROFILING_ENABLED:
+        return await call_next(request)
+    with track(f"{request.method} {request.url.path}") as profile:
+        response = await call_next(request)
+    response.headers["Server-Timing"] = profile.server_timing()
+
+    over_budget = QUERY_BUDGET and profile.queries > QUERY_BUDGET
+    if over_budget or profile.total_ms > SLOW_REQUEST_MS:
+        reason = f"vượt ngân sách {QUERY_BUDGET} query" if over_budget else "request chậm"
+        print(f"⚠️  {profile.label} ({reason}): {profile.total_ms:.0f} ms, "
+              f"{profile.queries} query / {profile.db_ms:.0f} ms DB\n    " + "\n    ".join(profile.top()))
+    _notify(profile)
+    return response
@@ -0,0 +1,253 @@
+"""Số liệu tài chính cộng dồn (revenue_rollups) theo tài sản + tháng.
+
+Mỗi lần ghi hợp đồng / thanh toán / hư hỏng, listener after_flush tính phần chênh
+lệch (giá trị mới - giá trị cũ) và cộng thẳng vào dòng rollup tương ứng, trong cùng
+transaction. Dashboard chỉ đọc bảng này nên không phụ thuộc số lượng thanh toán.
+
+Nhập hàng loạt ghi bằng INSERT trực tiếp (không qua ORM) nên tự gọi RollupDelta.
+
+    python -m app.rollups rebuild   # tính lại toàn bộ từ dữ liệu gốc
+    python -m app.rollups verify    # so sánh rollup với dữ liệu gốc
+"""
+import sys
+from collections import defaultdict
+from datetime import date
+from itertools import chain
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Date, cast, delete, event, func, inspect, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import AppSession, dialect_insert
+
+MEASURES = ("revenue", "contract_value", "deposits", "damage_cost")
+
+# Sai số cho phép khi verify (tiền lưu bằng Float)
+TOLERANCE = 0.01
+
+_rollups = models.RevenueRollup.__table__
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+class RollupDelta:
+    """Gom phần chênh lệch theo (tài sản, tháng) rồi ghi 1 lần bằng UPSERT cộng dồn"""
+
+    def __init__(self):
+        self.rows: Dict[tuple, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(MEASURES, 0.0))
+
+    def add(self, property_id: Optional[int], day: Optional[date], measure: str, amount: Optional[float]):
+        if property_id is None or day is None or not amount:
+            return
+        self.rows[(property_id, month_start(day))][measure] += amount
+
+    def apply(self, conn):
+        rows = [
+            dict(values, property_id=property_id, month=month)
+            for (property_id, month), values in self.rows.items()
+            if any(abs(v) > 1e-9 for v in values.values())
+        ]
+        if not rows:
+            return
+        rows.sort(key=lambda r: (r["property_id"], r["month"]))  # thứ tự cố định, tránh deadlock
+        insert = dialect_insert(conn)(_rollups)
+        conn.execute(
+            insert.on_conflict_do_update(
+                index_elements=["property_id", "month"],
+                set_={name: _rollups.c[name] + insert.excluded[name] for name in MEASURES}
+            ),
+            rows
+        )
+
+
+# ---------- Listener: cập nhật trong cùng transaction với lần ghi ----------
+def _value(obj, attr: str, old: bool):
+    if not old:
+        return getattr(obj, attr)
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None if history.added else getattr(obj, attr)
+
+
+def _contribute(delta: RollupDelta, payments: List[tuple], obj, sign: int, old: bool):
+    value = lambda attr: _value(obj, attr, old)
+
+    if isinstance(obj, models.Contract):
+        delta.add(value("property_id"), value("start_date"), "contract_value", sign * (value("total_price") or 0))
+        delta.add(value("property_id"), value("start_date"), "deposits", sign * (value("deposit") or 0))
+    elif isinstance(obj, models.Payment):
+        if value("is_paid") is not False:
+            # Chưa biết tài sản -> tra theo contract_id sau
+            payments.append((value("contract_id"), value("payment_date"), sign * (value("amount") or 0)))
+    elif isinstance(obj, models.DamageReport):
+        delta.add(value("property_id"), value("reported_date"), "damage_cost", sign * (value("repair_cost") or 0))
+
+
+def _after_flush(session: Session, flush_context):
+    tracked = (models.Contract, models.Payment, models.DamageReport)
+    delta, payments = RollupDelta(), []
+
+    for obj in session.new:
+        if isinstance(obj, tracked):
+            _contribute(delta, payments, obj, +1, old=False)
+    for obj in session.deleted:
+        if isinstance(obj, tracked):
+            _contribute(delta, payments, obj, -1, old=True)
+    for obj in session.dirty:
+        if isinstance(obj, tracked) and session.is_modified(obj):
+            _contribute(delta, payments, obj, -1, old=True)
+            _contribute(delta, payments, obj, +1, old=False)
+
+    if payments:
+        # Hợp đồng có sẵn trong session (kể cả vừa bị xóa) thì không cần query
+        owners = {
+            obj.id: obj.property_id
+            for obj in chain(session.new, session.dirty, session.deleted)
+            if isinstance(obj, models.Contract)
+        }
+        missing = {cid for cid, _, _ in payments if cid is not None and cid not in owners}
+        # Handler vừa db.get(Contract) để kiểm tra tồn tại -> đã nằm trong identity map, không query lại
+        mapper = inspect(models.Contract)
+        for cid in list(missing):
+            loaded = session.identity_map.get(mapper.identity_key_from_primary_key((cid,)))
+            if loaded is not None and "property_id" in loaded.__dict__:
+                owners[cid] = loaded.property_id
+                missing.discard(cid)
+        if missing:
+            owners.update(session.connection().execute(
+                select(models.Contract.id, models.Contract.property_id).where(models.Contract.id.in_(missing))
+            ).all())
+        for contract_id, day, amount in payments:
+            delta.add(owners.get(contract_id), day, "revenue", amount)
+
+    # Tài sản vừa bị xóa: rollup đã bị xóa theo (ON DELETE CASCADE), ghi lại sẽ lỗi FK
+    deleted = {obj.id for obj in session.deleted if isinstance(obj, models.Property)}
+    if deleted:
+        delta.rows = {key: values for key, values in delta.rows.items() if key[0] not in deleted}
+    delta.apply(session.connection())
+
+
+event.listen(AppSession, "after_flush", _after_flush)
+
+
+# ---------- Tính lại từ dữ liệu gốc ----------
+def month_of(column, dialect: str):
+    if dialect == "sqlite":
+        return func.date(column, "start of month")
+    return cast(func.date_trunc("month", column), Date)
+
+
+def source_query(dialect: str, property_ids: Optional[Iterable[int]] = None):
+    """Tổng hợp trực tiếp từ contracts / payments / damage_reports (GROUP BY tài sản + tháng)"""
+    zero = literal(0.0)
+    contracts = select(
+        models.Contract.property_id.label("property_id"),
+        month_of(models.Contract.start_date, dialect).label("month"),
+        zero.label("revenue"),
+        models.Contract.total_price.label("contract_value"),
+        models.Contract.deposit.label("deposits"),
+        zero.label("damage_cost"),
+    )
+    payments = select(
+        models.Contract.property_id,
+        month_of(models.Payment.payment_date, dialect),
+        models.Payment.amount, zero, zero, zero,
+    ).join(models.Contract, models.Contract.id == models.Payment.contract_id).where(models.Payment.is_paid == True)
+    damages = select(
+        models.DamageReport.property_id,
+        month_of(models.DamageReport.reported_date, dialect),
+        zero, zero, zero, models.DamageReport.repair_cost,
+    )
+
+    if property_ids is not None:
+        ids = list(property_ids)
+        contracts = contracts.where(models.Contract.property_id.in_(ids))
+        payments = payments.where(models.Contract.property_id.in_(ids))
+        damages = damages.where(models.DamageReport.property_id.in_(ids))
+
+    combined = union_all(contracts, payments, damages).subquery()
+    return select(
+        combined.c.property_id,
+        combined.c.month,
+        *[func.coalesce(func.sum(combined.c[name]), 0).label(name) for name in MEASURES]
+    ).where(
+        combined.c.property_id.is_not(None), combined.c.month.is_not(None)
+    ).group_by(combined.c.property_id, combined.c.month)
+
+
+def rebuild(conn, property_ids: Optional[Iterable[int]] = None) -> int:
+    """Xóa rồi tính lại rollup (toàn bộ hoặc chỉ vài tài sản) trong transaction hiện tại"""
+    stmt = delete(_rollups)
+    if property_ids is not None:
+        property_ids = list(property_ids)
+        stmt = stmt.where(_rollups.c.property_id.in_(property_ids))
+    conn.execute(stmt)
+
+    query = source_query(conn.dialect.name, property_ids)
+    result = conn.execute(
+        _rollups.insert().from_select(["property_id", "month", *MEASURES], query)
+    )
+    return result.rowcount
+
+
+def is_empty(conn) -> bool:
+    return conn.execute(select(_rollups.c.property_id).limit(1)).first() is None
+
+
+def _as_date(value) -> date:
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def verify(conn) -> List[dict]:
+    """Trả về danh sách dòng lệch giữa rollup và dữ liệu gốc (rỗng = khớp)"""
+    def load(query):
+        return {
+            (row.property_id, _as_date(row.month)): {name: float(row._mapping[name]) for name in MEASURES}
+            for row in conn.execute(query)
+        }
+
+    expected = load(source_query(conn.dialect.name))
+    stored = load(select(_rollups))
+    zeros = dict.fromkeys(MEASURES, 0.0)
+
+    mismatches = []
+    for key in sorted(set(expected) | set(stored)):
+        want, have = expected.get(key, zeros), stored.get(key, zeros)
+        diff = {name: (have[name], want[name]) for name in MEASURES if abs(have[name] - want[name]) > TOLERANCE}
+        if diff:
+            mismatches.append({"property_id": key[0], "month": key[1].isoformat(), "diff": diff})
+    return mismatches
+
+
+def main():
+    from .database import engine
+
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command not in ("rebuild", "verify"):
+        print("Cách dùng: python -m app.rollups rebuild|verify")
+        sys.exit(2)
+
+    if command == "rebuild":
+        with engine.begin() as conn:
+            count = rebuild(conn)
+        print(f"✅ Đã tính lại {count} dòng rollup")
+
+    with engine.connect() as conn:
+        mismatches = verify(conn)
+    if mismatches:
+        for item in mismatches[:20]:
+            print(f"❌ Tài sản #{item['property_id']} tháng {item['month']}: "
+                  + ", ".join(f"{k} lưu {v[0]:,.0f} / đúng {v[1]:,.0f}" for k, v in item["diff"].items()))
+        print(f"❌ {len(mismatches)} dòng rollup bị lệch")
+        sys.exit(1)
+    print("✅ Rollup khớp với dữ liệu gốc")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Generic, List, Optional, TypeVar
 from datetime import date, datetime
 
+T = TypeVar("T")
+
+# --- Phân trang (keyset) ---
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
 # --- User ---
 class UserBase(BaseModel):
     username: str
@@ -18,6 +25,10 @@ class UserResponse(UserBase):
     class Config:
         from_attributes = True
 
+class TenantCreate(BaseModel):
+    email: str
+    full_name: Optional[str] = None
+
 # --- Property ---
 class PropertyBase(BaseModel):
     name: str
@@ -26,6 +37,9 @@ class PropertyBase(BaseModel):
     description: Optional[str] = None
     category: str = "real_estate"
     image_url:  Optional[str] = None
+    # Bỏ trống thì server tự geocode từ địa chỉ
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 class PropertyCreate(PropertyBase):
     pass
@@ -42,6 +56,7 @@ class PropertyResponse(PropertyBase):
     id: int
     status: str
     owner_id: int
+    distance_km: Optional[float] = None  # chỉ có khi tìm theo vị trí
     class Config:
         from_attributes = True
 
@@ -63,10 +78,94 @@ class ContractResponse(ContractBase):
     deposit: float
     total_price: float
     status:  str
+    rental_type: Optional[str] = None
     created_at: Optional[datetime] = None
     class Config:
         from_attributes = True
 
+class ContractSummaryResponse(ContractResponse):
+    paid: float = 0
+    remaining: float = 0
+    payment_count: int = 0
+    damage_total: float = 0
+
+# Số hợp đồng tối đa trong 1 lần đặt theo lô
+CONTRACT_BATCH_MAX = 200
+
+class ContractBatchCreate(BaseModel):
+    items: List[ContractCreate] = Field(..., min_length=1, max_length=CONTRACT_BATCH_MAX)
+    # atomic: 1 mục lỗi thì không ghi mục nào; partial: ghi các mục hợp lệ, báo lỗi từng mục
+    mode: str = Field("atomic", pattern="^(atomic|partial)$")
+
+class ContractBatchItemResult(BaseModel):
+    index: int
+    status_code: int  # 200 đã tạo, 400 / 404 / 409 lỗi, 424 không ghi vì mục khác lỗi (atomic)
+    contract: Optional[ContractResponse] = None
+    error: Optional[str] = None
+
+class ContractBatchResponse(BaseModel):
+    mode: str
+    created: int
+    failed: int
+    items: List[ContractBatchItemResult]
+
+# --- Lịch đã đặt (availability.py) ---
+class PropertyCalendar(BaseModel):
+    property_id: int
+    booked_days: int
+    bitset: Optional[str] = None  # base64, bit cao của byte đầu = date_from
+    ranges: Optional[List[List[date]]] = None  # [[ngày đầu, ngày cuối], ...]
+
+class CalendarResponse(BaseModel):
+    date_from: date
+    date_to: date
+    days: int
+    format: str
+    calendars: List[PropertyCalendar]
+
+# --- Pricing rule / báo giá ---
+class PricingRuleCreate(BaseModel):
+    kind: str = Field(..., pattern="^(weekly|weekend|season|long_stay)$")
+    factor: float = Field(..., gt=0)
+    property_id: Optional[int] = None
+    category: Optional[str] = None
+    start_date: Optional[date] = None  # season
+    end_date: Optional[date] = None  # season
+    min_days: Optional[int] = Field(None, ge=1)  # long_stay
+    name: Optional[str] = None
+
+class PricingRuleResponse(PricingRuleCreate):
+    id: int
+    class Config:
+        from_attributes = True
+
+# Số báo giá tối đa trong 1 request
+QUOTE_BATCH_MAX = 10000
+
+class QuoteItem(BaseModel):
+    property_id: int
+    start_date: date
+    end_date: date
+    rental_type: str = Field("daily", pattern="^(daily|monthly)$")
+
+class QuoteRequest(BaseModel):
+    items: List[QuoteItem] = Field(..., min_length=1, max_length=QUOTE_BATCH_MAX)
+
+class QuoteResult(QuoteItem):
+    total_price: Optional[float] = None
+    error: Optional[str] = None
+
+class QuoteResponse(BaseModel):
+    items: List[QuoteResult]
+
+class ContractZipRequest(BaseModel):
+    contract_ids: Optional[List[int]] = None
+    status: Optional[str] = None
+    property_id: Optional[int] = None
+    tenant_id: Optional[int] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
 # --- Payment ---
 class PaymentBase(BaseModel):
     amount: float
@@ -101,3 +200,91 @@ class DamageReportResponse(DamageReportBase):
     
     class Config:
         from_attributes = True
+
+# --- Hóa đơn từng kỳ (hợp đồng theo tháng) ---
+class InvoiceResponse(BaseModel):
+    id: int
+    contract_id: int
+    installment: int
+    due_date: date
+    amount: float
+    status: str
+    payment_id: Optional[int] = None
+    paid_at: Optional[datetime] = None
+    class Config:
+        from_attributes = True
+
+class InvoicePay(BaseModel):
+    payment_date: Optional[date] = None  # mặc định hôm nay
+    note: Optional[str] = None
+
+class BillingRunReport(BaseModel):
+    run_id: int
+    as_of: date
+    horizon: date
+    contracts: int
+    invoices_created: int
+    batches: int
+    seconds: float
+
+# --- Quét trạng thái theo ngày (sweeper.py) ---
+class SweepReport(BaseModel):
+    run_id: int
+    as_of: date
+    contracts_completed: int
+    properties_released: int
+    properties_rented: int
+    events_pruned: int
+    seconds: float
+
+# --- Bulk import ---
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportReport(BaseModel):
+    kind: str
+    total: int
+    inserted: int
+    failed: int
+    errors: List[ImportRowError] = []
+    errors_truncated: bool = False
+
+# --- Thống kê tài chính (dashboard) ---
+class StatsTotals(BaseModel):
+    revenue: float = 0
+    contract_value: float = 0
+    outstanding: float = 0
+    deposits: float = 0
+    damage_cost: float = 0
+
+class StatsGroup(StatsTotals):
+    key: str
+
+class StatsResponse(BaseModel):
+    totals: StatsTotals
+    groups: List[StatsGroup] = []
+
+class OccupancyMetrics(BaseModel):
+    properties: int
+    available_days: int
+    occupied_days: int
+    idle_days: int
+    occupancy_rate: float
+    revenue: float
+    revenue_per_available_day: float
+
+class OccupancyGroup(OccupancyMetrics):
+    key: str
+
+class OccupancyPoint(OccupancyMetrics):
+    period: str
+
+class OccupancyReport(BaseModel):
+    date_from: date
+    date_to: date
+    days: int
+    interval: str
+    totals: OccupancyMetrics
+    groups: List[OccupancyGroup] = []
+    series: List[OccupancyPoint] = []
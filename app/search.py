@@ -0,0 +1,60 @@
+"""Tìm kiếm tài sản không phân biệt dấu tiếng Việt.
+
+Cột properties.search_text lưu sẵn tên + địa chỉ + mô tả đã bỏ dấu, viết thường
+("Phòng trọ Đà Lạt" -> "phong tro da lat"). Trên PostgreSQL cột này có index GIN
+pg_trgm nên LIKE '%từ khóa%' không phải quét toàn bảng, và xếp hạng bằng word_similarity.
+"""
+import re
+import unicodedata
+from typing import List, Optional
+
+from sqlalchemy import case, event, func, literal
+
+from . import models
+
+# Số kết quả tối đa của 1 lần tìm có xếp hạng
+MAX_RESULTS = 100
+
+_spaces = re.compile(r"\s+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """Bỏ dấu, đ -> d, viết thường, gộp khoảng trắng"""
+    if not text:
+        return ""
+    text = text.replace("đ", "d").replace("Đ", "D")
+    decomposed = unicodedata.normalize("NFD", text)
+    stripped = "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+    return _spaces.sub(" ", stripped).strip().lower()
+
+
+def property_search_text(name: Optional[str], address: Optional[str], description: Optional[str]) -> str:
+    # Tên đứng đầu để "bắt đầu bằng từ khóa" được xếp hạng cao hơn
+    return " | ".join(normalize(part) for part in (name, address, description) if part)
+
+
+def tokens(keyword: str) -> List[str]:
+    return [token for token in normalize(keyword).split(" ") if token]
+
+
+def keyword_filter(query, keyword: str):
+    """Mọi từ trong từ khóa đều phải xuất hiện (mỗi từ 1 điều kiện LIKE dùng được index trigram)"""
+    for token in tokens(keyword):
+        query = query.filter(models.Property.search_text.contains(token, autoescape=True))
+    return query
+
+
+def rank(dialect: str, keyword: str):
+    """Điểm liên quan: PostgreSQL dùng word_similarity; DB khác: tên bắt đầu bằng từ khóa xếp trước"""
+    normalized = normalize(keyword)
+    if dialect == "postgresql":
+        return func.word_similarity(literal(normalized), models.Property.search_text)
+    return case((models.Property.search_text.startswith(normalized, autoescape=True), 1), else_=0)
+
+
+def _fill_search_text(mapper, connection, target: models.Property):
+    target.search_text = property_search_text(target.name, target.address, target.description)
+
+
+event.listen(models.Property, "before_insert", _fill_search_text)
+event.listen(models.Property, "before_update", _fill_search_text)
@@ -0,0 +1,127 @@
+"""Quét trạng thái hằng ngày: hợp đồng hết hạn và tài sản trống / đang thuê.
+
+Khi tạo hợp đồng chỉ đặt tài sản "rented" nếu hợp đồng bắt đầu từ hôm nay trở về trước;
+job này làm phần còn lại theo ngày as_of, mỗi bước là 1 câu UPDATE trên cả bảng:
+
+1. Hợp đồng active có end_date < as_of -> completed (index ix_contracts_active_end)
+2. Tài sản rented không còn hợp đồng active nào phủ as_of -> available
+3. Tài sản available có hợp đồng active phủ as_of (hợp đồng tương lai đến ngày bắt đầu) -> rented
+4. Xóa sự kiện change feed quá FEED_RETENTION_DAYS
+
+Cả 4 bước chạy trong 1 transaction nên chạy lại cùng ngày không đổi gì (idempotent).
+
+    python -m app.sweeper run
+    python -m app.sweeper run --as-of 2026-01-31
+"""
+import argparse
+import os
+import time
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import and_, exists, update
+
+from . import feed, jobs, models, versioning
+from .database import SessionLocal
+
+JOB_NAME = "sweeper"
+
+# Giờ (0-23, giờ server) chạy hằng ngày ngay trong process web; để trống = không tự chạy (dùng cron).
+# Chỉ đặt cho 1 process: mỗi worker có biến này đều tự quét (và chạy bù lúc khởi động)
+_schedule_hour = os.getenv("SWEEP_SCHEDULE_HOUR", "")
+SWEEP_SCHEDULE_HOUR = int(_schedule_hour) if _schedule_hour else None
+
+
+def covering_contract(as_of: date):
+    """Tài sản có hợp đồng active phủ ngày as_of (dùng index ix_contracts_property_status_dates)"""
+    contract = models.Contract
+    return exists().where(
+        contract.property_id == models.Property.id,
+        contract.status == "active",
+        contract.start_date <= as_of,
+        contract.end_date >= as_of,
+    )
+
+
+def sweep(db, as_of: date) -> dict:
+    """Chạy các câu UPDATE trong transaction của db (chưa commit), trả về số dòng đổi ở từng bước"""
+    contract, prop = models.Contract, models.Property
+    counts = {
+        "contracts_completed": db.execute(
+            update(contract)
+            .where(contract.status == "active", contract.end_date < as_of)
+            .values(status="completed")
+            .execution_options(synchronize_session=False)
+        ).rowcount,
+        "properties_released": db.execute(
+            update(prop)
+            .where(and_(prop.status == "rented", ~covering_contract(as_of)))
+            .values(status="available")
+            .execution_options(synchronize_session=False)
+        ).rowcount,
+        "properties_rented": db.execute(
+            update(prop)
+            .where(and_(prop.status == "available", covering_contract(as_of)))
+            .values(status="rented")
+            .execution_options(synchronize_session=False)
+        ).rowcount,
+    }
+
+    changed = []
+    if counts["contracts_completed"]:
+        changed.append("contracts")
+    if counts["properties_released"] or counts["properties_rented"]:
+        changed.append("properties")
+    if changed:
+        versioning.mark_changed(db, *changed)
+        # 1 sự kiện cho cả lần quét: trình duyệt tải lại danh sách thay vì nhận hàng nghìn sự kiện
+        feed.publish(db, "status.swept", 0, as_of=as_of, **counts)
+    counts["events_pruned"] = feed.prune(db)
+    return counts
+
+
+def run(engine, as_of: Optional[date] = None) -> dict:
+    """Quét 1 lần và ghi kết quả vào job_runs"""
+    as_of = as_of or date.today()
+    started = time.perf_counter()
+    run_id = jobs.start_run(engine, JOB_NAME, as_of)
+
+    db = SessionLocal(bind=engine)
+    try:
+        counts = sweep(db, as_of)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        jobs.finish_run(engine, run_id, "failed", error=str(e))
+        raise
+    finally:
+        db.close()
+
+    seconds = round(time.perf_counter() - started, 3)
+    processed = counts["contracts_completed"] + counts["properties_released"] + counts["properties_rented"]
+    jobs.finish_run(engine, run_id, "done", processed=processed, metrics={**counts, "seconds": seconds})
+    return {"run_id": run_id, "as_of": as_of.isoformat(), **counts, "seconds": seconds}
+
+
+async def schedule_daily(engine, hour: int):
+    """Chạy run() mỗi ngày lúc `hour` giờ; lỡ lần chạy hôm nay (server tắt) thì chạy bù khi khởi động"""
+    await jobs.run_daily(engine, JOB_NAME, hour, lambda: run(engine), catch_up=True)
+
+
+def main():
+    import json
+
+    from .database import engine
+    from .migrations import migrate
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["run"])
+    parser.add_argument("--as-of", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    migrate(engine)
+    print(json.dumps(run(engine, args.as_of), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
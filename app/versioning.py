@@ -0,0 +1,146 @@
+"""Phiên bản dữ liệu theo bảng: mọi lần ghi đều tăng version của bảng đó.
+
+Các endpoint danh sách dùng version làm ETag: client gửi If-None-Match trùng
+thì trả 304 luôn, chỉ tốn 1 query nhỏ vào change_versions (không chạm ORM).
+Version nằm trong DB nên đúng cho cả khi chạy nhiều worker uvicorn.
+
+Version được tăng ngay SAU khi transaction ghi commit, trong 1 transaction ngắn riêng: nếu tăng
+ngay trong transaction ghi, mọi transaction cùng ghi 1 bảng phải chờ khóa dòng change_versions
+của bảng đó tới lúc commit (các lượt đặt hợp đồng song song bị xếp hàng). Đổi lại, trong vài ms
+giữa commit và lúc tăng version, client có thể nhận 304 cho dữ liệu cũ; lần gọi sau là đúng.
+Tăng version lỗi thì thử lại; vẫn lỗi thì ghi log và tăng bù cùng lần commit kế tiếp của process.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from itertools import chain
+from typing import Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import AppSession, dialect_insert
+
+TRACKED_MODELS = (models.User, models.Property, models.Contract, models.Payment, models.DamageReport, models.Invoice)
+TRACKED_TABLES = tuple(model.__tablename__ for model in TRACKED_MODELS)
+
+_versions = models.ChangeVersion.__table__
+
+# Khóa trong session.info chứa các bảng đã ghi trong transaction hiện tại, chờ commit
+_CHANGED = "versioning_changed"
+
+# Số lần thử tăng version sau commit
+BUMP_ATTEMPTS = 3
+
+logger = logging.getLogger(__name__)
+
+# Bảng đã commit nhưng tăng version lỗi -> tăng bù ở lần bump_committed kế tiếp
+_unbumped: Set[str] = set()
+_unbumped_lock = threading.Lock()
+
+
+def seed(conn):
+    """Tạo sẵn dòng version cho các bảng được theo dõi (chạy trong migration)
+
+    Version khởi đầu bằng timestamp (ms) để reset DB không làm ETag cũ khớp nhầm.
+    """
+    insert = dialect_insert(conn)
+    start = int(time.time() * 1000)
+    conn.execute(
+        insert(_versions)
+        .values([{"table_name": name, "version": start} for name in TRACKED_TABLES])
+        .on_conflict_do_nothing(index_elements=["table_name"])
+    )
+
+
+def mark_changed(session: Session, *tables: str):
+    """Ghi bằng câu lệnh Core (listener không thấy) -> tăng version sau khi session commit"""
+    session.info.setdefault(_CHANGED, set()).update(tables)
+
+
+def bump(conn, tables: Iterable[str]):
+    """Tăng version trong transaction của conn (sau commit của lần ghi: dùng bump_committed)"""
+    tables = sorted(set(tables))  # thứ tự cố định để tránh deadlock giữa các transaction
+    if not tables:
+        return
+    conn.execute(
+        update(_versions)
+        .where(_versions.c.table_name.in_(tables))
+        .values(version=_versions.c.version + 1, updated_at=datetime.now(timezone.utc))
+    )
+
+
+def bump_committed(bind, tables: Iterable[str]) -> bool:
+    """Tăng version cho dữ liệu vừa commit, trong transaction ngắn riêng trên `bind` (engine)"""
+    with _unbumped_lock:
+        tables = set(tables) | _unbumped
+        _unbumped.clear()
+    if not tables:
+        return True
+    for attempt in range(1, BUMP_ATTEMPTS + 1):
+        try:
+            with bind.begin() as conn:
+                bump(conn, tables)
+            return True
+        except Exception:
+            if attempt < BUMP_ATTEMPTS:
+                logger.warning("Tăng version %s lỗi (lần %d), thử lại", sorted(tables), attempt, exc_info=True)
+    # Dữ liệu đã commit: giữ lại để tăng bù, ETag không bị kẹt ở bản cũ
+    logger.error("Tăng version %s lỗi sau %d lần thử, sẽ tăng bù ở lần ghi sau",
+                 sorted(tables), BUMP_ATTEMPTS, exc_info=True)
+    with _unbumped_lock:
+        _unbumped.update(tables)
+    return False
+
+
+async def current(db: AsyncSession, tables: Iterable[str]) -> Tuple[str, Optional[str]]:
+    """Trả về (ETag, Last-Modified) cho tập bảng mà 1 endpoint đọc"""
+    tables = sorted(set(tables))
+    result = await db.execute(
+        select(_versions.c.table_name, _versions.c.version, _versions.c.updated_at)
+        .where(_versions.c.table_name.in_(tables))
+    )
+    rows = {name: (version, updated_at) for name, version, updated_at in result}
+    etag = 'W/"' + "-".join(str(rows.get(name, (0, None))[0]) for name in tables) + '"'
+
+    timestamps = [updated_at for _, updated_at in rows.values() if updated_at]
+    last_modified = None
+    if timestamps:
+        latest = max(ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc) for ts in timestamps)
+        last_modified = format_datetime(latest, usegmt=True)
+    return etag, last_modified
+
+
+def _after_flush(session: Session, flush_context):
+    changed = {
+        obj.__tablename__
+        for obj in chain(session.new, session.deleted)
+        if isinstance(obj, TRACKED_MODELS)
+    }
+    changed.update(
+        obj.__tablename__
+        for obj in session.dirty
+        if isinstance(obj, TRACKED_MODELS) and session.is_modified(obj)
+    )
+    if changed:
+        mark_changed(session, *changed)
+
+
+def _after_commit(session: Session):
+    tables = session.info.pop(_CHANGED, None)
+    if tables:
+        # Kết nối riêng của cùng engine (session lúc này không còn transaction để chạy SQL)
+        bump_committed(session.get_bind(), tables)
+
+
+def _after_rollback(session: Session):
+    session.info.pop(_CHANGED, None)
+
+
+event.listen(AppSession, "after_flush", _after_flush)
+event.listen(AppSession, "after_commit", _after_commit)
+event.listen(AppSession, "after_rollback", _after_rollback)
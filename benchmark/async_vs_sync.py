@@ -0,0 +1,137 @@
+"""So sánh đường sync (def + threadpool) và async (AsyncSession + asyncpg).
+
+Mô phỏng đúng cách FastAPI chạy 2 loại endpoint:
+- sync : mỗi request chiếm 1 luồng của threadpool (mặc định 40 luồng) trong lúc chờ DB
+- async: request nhường event loop trong lúc chờ DB, không chiếm luồng nào
+
+N client chạy liên tục trong D giây (closed loop), mỗi lượt chạy query trang đầu
+của /contracts/summary. Hai bên dùng pool kết nối cùng kích thước để so sánh công bằng.
+--slow-ms thêm pg_sleep vào mỗi lượt (chỉ PostgreSQL) để thấy threadpool bị nghẽn
+khi query chậm.
+
+    python -m benchmark.async_vs_sync --clients 200 --duration 10 --pool-size 20 --slow-ms 50
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import DATABASE_URL, engine, to_async_url
+from app.main import contract_summary_query
+from app.migrations import migrate
+from app.pagination import paginate
+
+
+def build_statement(limit: int):
+    return paginate(contract_summary_query(), models.Contract.id, None, limit)
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def drive(call, clients: int, duration: float) -> dict:
+    """Chạy `clients` vòng lặp song song gọi call() đến hết thời gian, đo độ trễ từng lượt"""
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                await call()
+            except Exception:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+    }
+
+
+async def run(args) -> dict:
+    statement = build_statement(args.limit)
+    is_postgres = DATABASE_URL.startswith("postgresql")
+    sleep = text("SELECT pg_sleep(:s)") if args.slow_ms and is_postgres else None
+    if args.slow_ms and not is_postgres:
+        print("⚠️  --slow-ms chỉ dùng được với PostgreSQL, bỏ qua")
+
+    pool = {"pool_size": args.pool_size, "max_overflow": 0}
+    sync_engine = create_engine(DATABASE_URL, **pool)
+    async_url, connect_args = to_async_url(DATABASE_URL)
+    async_engine = create_async_engine(async_url, connect_args=connect_args, **pool)
+
+    def sync_query():
+        with Session(sync_engine) as db:
+            if sleep is not None:
+                db.execute(sleep, {"s": args.slow_ms / 1000})
+            return db.execute(statement).all()
+
+    async def sync_path():
+        # Giống endpoint `def`: Starlette đẩy sang threadpool
+        return await run_in_threadpool(sync_query)
+
+    async def async_path():
+        async with AsyncSession(async_engine) as db:
+            if sleep is not None:
+                await db.execute(sleep, {"s": args.slow_ms / 1000})
+            return (await db.execute(statement)).all()
+
+    results = {}
+    try:
+        for name, call in (("sync", sync_path), ("async", async_path)):
+            await drive(call, min(args.clients, args.pool_size), 1)  # làm nóng pool
+            results[name] = await drive(call, args.clients, args.duration)
+    finally:
+        sync_engine.dispose()
+        await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=100, help="Số hợp đồng mỗi trang")
+    parser.add_argument("--slow-ms", type=int, default=0, help="Độ trễ DB giả lập (pg_sleep)")
+    parser.add_argument("--json", action="store_true", help="In kết quả dạng JSON")
+    args = parser.parse_args()
+
+    migrate(engine)
+    results = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps({"config": vars(args), "results": results}, indent=2))
+        return
+
+    print(f"👥 {args.clients} client | ⏱️  {args.duration}s | pool {args.pool_size} | slow {args.slow_ms}ms")
+    for name, r in results.items():
+        print(f"{name:>5}: {r['rps']:>8} req/s | p50 {r['p50_ms']:>8} ms | p99 {r['p99_ms']:>8} ms | "
+              f"{r['requests']} ok, {r['errors']} lỗi")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Đo tốc độ lần chạy xuất hóa đơn hằng đêm.
+
+Tạo thêm hợp đồng theo tháng (6-12 kỳ, bắt đầu rải trong năm qua) cho đủ --contracts, rồi
+chạy billing.run 2 lần: lần đầu xuất mọi kỳ đã đến hạn, lần 2 phải không tạo thêm gì
+(idempotent). Cuối cùng đo truy vấn hóa đơn quá hạn.
+
+    python -m benchmark.billing_bench --contracts 100000
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select, text
+
+from app import billing, models
+from app.database import SessionLocal, engine
+from app.main import get_owner_id
+from app.migrations import migrate
+from app.pricing import calculate_total_price
+
+
+def seed(contracts: int, batch: int = 10000):
+    db = SessionLocal()
+    try:
+        existing = db.scalar(select(func.count(models.Contract.id)).where(models.Contract.rental_type == "monthly"))
+        if existing >= contracts:
+            return
+        owner_id = get_owner_id(db)
+        property_ids = db.scalars(
+            insert(models.Property).returning(models.Property.id),
+            [{"name": f"Billing #{i}", "address": "bench", "price": 3000000, "category": "real_estate",
+              "status": "available", "owner_id": owner_id} for i in range(1000)]
+        ).all()
+        rng = random.Random(11)
+        today = date.today()
+        while existing < contracts:
+            rows = []
+            for _ in range(min(batch, contracts - existing)):
+                start = today - timedelta(days=rng.randrange(365))
+                end = start + timedelta(days=30 * rng.randint(6, 12))
+                rows.append({
+                    "property_id": rng.choice(property_ids), "tenant_id": owner_id,
+                    "start_date": start, "end_date": end, "deposit": 0, "status": "active",
+                    "total_price": calculate_total_price(3000000, start, end, "monthly"),
+                    "rental_type": "monthly", "next_invoice_date": start,
+                })
+            db.execute(insert(models.Contract), rows)
+            db.commit()
+            existing += len(rows)
+            print(f"… {existing} hợp đồng theo tháng")
+        if engine.dialect.name == "postgresql":
+            db.execute(text("ANALYZE contracts"))
+            db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contracts", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=billing.BILLING_BATCH)
+    args = parser.parse_args()
+
+    migrate(engine)
+    seed(args.contracts)
+
+    for label in ("Lần 1", "Lần 2 (chạy lại)"):
+        report = billing.run(engine, batch_size=args.batch_size)
+        print(f"🧾 {label}: {report['invoices_created']} hóa đơn mới / {report['contracts']} hợp đồng "
+              f"trong {report['seconds']}s ({report['batches']} lô)")
+
+    with engine.connect() as conn:
+        started = time.perf_counter()
+        overdue_rows = billing.overdue_query().subquery()
+        overdue = conn.execute(select(func.count(), func.coalesce(func.sum(overdue_rows.c.amount), 0))).one()
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"⏰ {overdue[0]} hóa đơn quá hạn, tổng {overdue[1]:,.0f} ({elapsed:.1f} ms)")
+        if engine.dialect.name == "postgresql":
+            compiled = billing.overdue_query().order_by(models.Invoice.id).limit(100).compile(
+                engine, compile_kwargs={"literal_binds": True}
+            )
+            print("\n".join(row[0] for row in conn.execute(text(f"EXPLAIN ANALYZE {compiled}"))))
+
+
+if __name__ == "__main__":
+    main()
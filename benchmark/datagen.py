@@ -0,0 +1,178 @@
+"""Sinh dữ liệu giả có thể lặp lại (cùng --seed + DB trống -> cùng dữ liệu) để đo tải.
+
+Khách thuê, tài sản thuộc 3 danh mục (real_estate / vehicle / item), hợp đồng nối tiếp
+không chồng lịch trên từng tài sản (bất động sản thuê theo tháng, xe / đồ dùng theo ngày),
+thanh toán và báo cáo hư hỏng. Ghi theo lô qua BulkImporter (giống /import: tự điền
+search_text, geohash, rollup, version) rồi chạy sweeper để trạng thái khớp với ngày hôm nay.
+
+    python -m benchmark.datagen --tenants 2000 --properties 3000 --contracts 30000
+    python -m benchmark.datagen --reset ...   # XÓA SẠCH DB rồi sinh lại từ đầu
+
+Chạy được trên PostgreSQL hoặc SQLite (DATABASE_URL=sqlite:///./bench.db).
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+
+from sqlalchemy import insert, select
+
+from app import models, rollups, sweeper, versioning
+from app.bulk_import import import_file
+from app.database import SessionLocal, engine
+from app.main import get_owner_id
+from app.migrations import migrate
+
+# Địa chỉ có tên quận / thành phố để LocalGeocoder tìm được tọa độ
+PLACES = ["Quận 1, TP. Hồ Chí Minh", "Bình Thạnh, TP. Hồ Chí Minh", "Thủ Đức, TP. Hồ Chí Minh",
+          "Cầu Giấy, Hà Nội", "Hoàn Kiếm, Hà Nội", "Đà Nẵng", "Đà Lạt", "Nha Trang", "Cần Thơ", "Vũng Tàu"]
+
+CATEGORIES = {
+    # danh mục: (tên, khoảng giá, kiểu thuê, số ngày thuê tối thiểu / tối đa)
+    "real_estate": (["Căn hộ", "Phòng trọ", "Nhà nguyên căn", "Văn phòng"], (2_000_000, 20_000_000), "monthly", (60, 365)),
+    "vehicle": (["Xe máy", "Ô tô 4 chỗ", "Ô tô 7 chỗ", "Xe đạp điện"], (100_000, 1_500_000), "daily", (1, 14)),
+    "item": (["Máy ảnh", "Lều cắm trại", "Máy chiếu", "Flycam"], (50_000, 500_000), "daily", (1, 30)),
+}
+SEVERITIES = ["low", "medium", "high"]
+BATCH_SIZE = 2000
+
+
+def ndjson(rows: List[dict]) -> List[str]:
+    return [json.dumps(row, default=str, ensure_ascii=False) for row in rows]
+
+
+def check(report: dict):
+    if report["failed"]:
+        raise SystemExit(f"❌ Nhập {report['kind']} lỗi {report['failed']} dòng: {report['errors'][:3]}")
+
+
+def generate(args) -> Dict[str, int]:
+    rng = random.Random(args.seed)
+    today = date.today()
+    window_start = today - timedelta(days=365 * args.years_back)
+
+    db = SessionLocal()
+    try:
+        owner_id = get_owner_id(db)
+
+        emails = [f"tenant{i}@bench.local" for i in range(args.tenants)]
+        check(import_file(db, "tenants", ndjson([
+            {"email": email, "full_name": f"Khách {i}"} for i, email in enumerate(emails)
+        ]), fmt="ndjson", batch_size=BATCH_SIZE))
+
+        properties = []
+        for i in range(args.properties):
+            category = list(CATEGORIES)[i % len(CATEGORIES)]
+            names, (low, high), _, _ = CATEGORIES[category]
+            properties.append({
+                "name": f"{rng.choice(names)} #{i}",
+                "address": f"{rng.randint(1, 300)} đường số {rng.randint(1, 50)}, {rng.choice(PLACES)}",
+                "description": "Dữ liệu benchmark",
+                "price": rng.randrange(low, high, 10_000),
+                "category": category,
+            })
+        check(import_file(db, "properties", ndjson(properties), fmt="ndjson",
+                          batch_size=BATCH_SIZE, owner_id=owner_id))
+        property_rows = db.execute(
+            select(models.Property.id, models.Property.category)
+            .where(models.Property.description == "Dữ liệu benchmark").order_by(models.Property.id)
+        ).all()
+
+        # Hợp đồng nối tiếp nhau trên từng tài sản: kết thúc + nghỉ vài ngày rồi mới tới hợp đồng sau
+        contracts = []
+        per_property, extra = divmod(args.contracts, max(len(property_rows), 1))
+        for index, (property_id, category) in enumerate(property_rows):
+            _, _, rental_type, (min_days, max_days) = CATEGORIES[category]
+            day = window_start + timedelta(days=rng.randint(0, 60))
+            for _ in range(per_property + (index < extra)):
+                end = day + timedelta(days=rng.randint(min_days, max_days))
+                contracts.append({
+                    "property_id": property_id, "tenant_email": rng.choice(emails),
+                    "start_date": day, "end_date": end, "rental_type": rental_type,
+                    "deposit": rng.choice([0, 0, 500_000, 1_000_000]),
+                })
+                day = end + timedelta(days=rng.randint(1, 30))
+        check(import_file(db, "contracts", ndjson(contracts), fmt="ndjson", batch_size=BATCH_SIZE))
+
+        contract_rows = db.execute(
+            select(models.Contract.id, models.Contract.property_id, models.Contract.start_date,
+                   models.Contract.end_date, models.Contract.total_price)
+            .join(models.Property, models.Property.id == models.Contract.property_id)
+            .where(models.Property.description == "Dữ liệu benchmark").order_by(models.Contract.id)
+        ).all()
+
+        payments, damages = [], []
+        for contract_id, property_id, start, end, total in contract_rows:
+            if start > today:
+                continue
+            paid_until = min(end, today)
+            span = max((paid_until - start).days, 0)
+            for _ in range(rng.randint(0, args.max_payments)):
+                payments.append({
+                    "contract_id": contract_id,
+                    "amount": round((total or 0) / max(args.max_payments, 1) * rng.uniform(0.5, 1.0), -3),
+                    "payment_date": start + timedelta(days=rng.randint(0, span)),
+                    "note": "benchmark",
+                })
+            if rng.random() < args.damage_rate:
+                damages.append({
+                    "contract_id": contract_id, "property_id": property_id,
+                    "description": "Hư hỏng (benchmark)", "severity": rng.choice(SEVERITIES),
+                    "repair_cost": rng.randrange(100_000, 5_000_000, 50_000), "status": "pending",
+                    "reported_date": start + timedelta(days=rng.randint(0, span)),
+                })
+        check(import_file(db, "payments", ndjson(payments), fmt="ndjson", batch_size=BATCH_SIZE))
+
+        # Báo cáo hư hỏng không có trong /import: INSERT theo lô + tự cộng rollup / báo versioning
+        for offset in range(0, len(damages), BATCH_SIZE):
+            chunk = damages[offset:offset + BATCH_SIZE]
+            db.execute(insert(models.DamageReport), chunk)
+            delta = rollups.RollupDelta()
+            for row in chunk:
+                delta.add(row["property_id"], row["reported_date"], "damage_cost", row["repair_cost"])
+            delta.apply(db.connection())
+            versioning.mark_changed(db, "damage_reports")
+            db.commit()
+    finally:
+        db.close()
+
+    sweeper.run(engine)
+    return {
+        "tenants": args.tenants, "properties": len(property_rows), "contracts": len(contract_rows),
+        "payments": len(payments), "damage_reports": len(damages),
+    }
+
+
+def reset():
+    """Xóa toàn bộ bảng rồi tạo lại (giống app/reset_db.py)"""
+    models.Base.metadata.drop_all(bind=engine)
+    migrate(engine, force=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", type=int, default=2000)
+    parser.add_argument("--properties", type=int, default=3000)
+    parser.add_argument("--contracts", type=int, default=30000)
+    parser.add_argument("--max-payments", type=int, default=3, help="Số thanh toán tối đa mỗi hợp đồng")
+    parser.add_argument("--damage-rate", type=float, default=0.05, help="Tỷ lệ hợp đồng có hư hỏng")
+    parser.add_argument("--years-back", type=int, default=2, help="Hợp đồng bắt đầu từ ngần này năm trước")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="XÓA SẠCH dữ liệu trong DB trước khi sinh")
+    args = parser.parse_args()
+
+    if args.reset:
+        print(f"⚠️  Xóa toàn bộ dữ liệu trong {engine.url.render_as_string(hide_password=True)}")
+        reset()
+    else:
+        migrate(engine)
+
+    started = time.perf_counter()
+    counts = generate(args)
+    print(f"✅ Đã sinh {json.dumps(counts, ensure_ascii=False)} trong {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
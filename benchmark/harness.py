@@ -0,0 +1,331 @@
+"""Đo tải các endpoint chính, lưu kết quả JSON để so sánh giữa các commit.
+
+Kịch bản (mỗi kịch bản --requests lượt, --concurrency client song song):
+- list_properties:   GET /properties/ với bộ lọc ngẫu nhiên (danh mục, giá, trạng thái, từ khóa, ngày trống)
+- create_contract:   POST /contracts/ vào 1 nhóm nhỏ tài sản -> có cả 200 lẫn 409 trùng lịch
+                     (hợp đồng của lần chạy trước, khách bench*@bench.local, bị xóa trước mỗi lần chạy)
+- create_payment:    POST /payments/
+- contract_payments: GET /contracts/{id}/payments
+- download_contract: GET /contracts/{id}/download
+
+Mặc định gọi app ngay trong process (httpx + ASGI, không qua mạng); --url để đo server đang chạy
+(uvicorn nhiều worker...). Dữ liệu lấy từ DB hiện tại, nên sinh trước bằng benchmark.datagen.
+Tham số request sinh từ --seed, chạy lại trên cùng dữ liệu thì cùng chuỗi request.
+
+    python -m benchmark.datagen --reset
+    python -m benchmark.harness run --requests 500 --concurrency 16
+    python -m benchmark.harness compare benchmark/results/a.json benchmark/results/b.json
+
+Cần httpx (pip install httpx). `compare` chỉ đọc file JSON, không cần DB.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import AsyncExitStack
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+RESULTS_DIR = Path(__file__).parent / "results"
+KEYWORDS = ["can ho", "xe may", "Đà Lạt", "máy ảnh", "quan 1", "o to", "phong tro"]
+# Số tài sản bị đặt dồn trong create_contract (ít -> nhiều 409)
+HOT_PROPERTIES = 20
+# Email khách thuê của create_contract (khác tenant*@bench.local của datagen)
+BENCH_TENANTS = "bench%@bench.local"
+# Số query / request lấy từ header Server-Timing (app/profiling.py)
+QUERY_COUNT = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_context() -> dict:
+    """id tài sản / hợp đồng có sẵn để sinh request"""
+    from sqlalchemy import func, select
+
+    from app import models
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        properties = db.scalars(select(models.Property.id).order_by(models.Property.id)).all()
+        contracts = db.scalars(select(models.Contract.id).order_by(models.Contract.id)).all()
+        counts = {
+            name: db.scalar(select(func.count()).select_from(model))
+            for name, model in (("users", models.User), ("properties", models.Property),
+                                ("contracts", models.Contract), ("payments", models.Payment),
+                                ("damage_reports", models.DamageReport))
+        }
+    finally:
+        db.close()
+    if not properties or not contracts:
+        raise SystemExit("❌ DB chưa có dữ liệu, chạy `python -m benchmark.datagen` trước")
+    return {"properties": properties, "contracts": contracts, "counts": counts}
+
+
+def reset_bench_contracts() -> int:
+    """Xóa hợp đồng create_contract đã tạo ở lần chạy trước (kèm thanh toán, hóa đơn, sự kiện),
+    để chạy lại trên cùng dữ liệu đặt lại đúng các khoảng ngày đó với cùng tỷ lệ 200 / 409"""
+    from sqlalchemy import delete, select
+
+    from app import models, rollups, versioning
+    from app.database import engine
+
+    contract_ids = select(models.Contract.id).join(
+        models.User, models.User.id == models.Contract.tenant_id
+    ).where(models.User.email.like(BENCH_TENANTS))
+    with engine.begin() as conn:
+        property_ids = conn.scalars(
+            select(models.Contract.property_id).where(models.Contract.id.in_(contract_ids)).distinct()
+        ).all()
+        if not property_ids:
+            return 0
+        for model in (models.Invoice, models.Payment, models.DamageReport, models.ChangeEvent):
+            conn.execute(delete(model).where(model.contract_id.in_(contract_ids)))
+        deleted = conn.execute(delete(models.Contract).where(models.Contract.id.in_(contract_ids))).rowcount
+        rollups.rebuild(conn, property_ids)
+    versioning.bump_committed(engine, ["contracts", "payments", "invoices", "damage_reports"])
+    return deleted
+
+
+# ---------- Kịch bản: (rng, context) -> (method, url, kwargs) ----------
+def list_properties(rng: random.Random, ctx: dict):
+    params = {"limit": 20}
+    choice = rng.randrange(5)
+    if choice == 0:
+        params["category"] = rng.choice(["real_estate", "vehicle", "item"])
+    elif choice == 1:
+        low = rng.randrange(0, 5_000_000, 100_000)
+        params.update(min_price=low, max_price=low + 2_000_000)
+    elif choice == 2:
+        params["status"] = "available"
+    elif choice == 3:
+        params["q"] = rng.choice(KEYWORDS)
+    else:
+        start = date.today() + timedelta(days=rng.randint(0, 180))
+        params.update(available_from=start.isoformat(), available_to=(start + timedelta(days=7)).isoformat())
+    return "GET", "/properties/", {"params": params}
+
+
+def create_contract(rng: random.Random, ctx: dict):
+    start = date.today() + timedelta(days=rng.randint(30, 400))
+    return "POST", "/contracts/", {"json": {
+        "property_id": rng.choice(ctx["properties"][:HOT_PROPERTIES]),
+        "tenant_email": f"bench{rng.randrange(500)}@bench.local",
+        "start_date": start.isoformat(),
+        "end_date": (start + timedelta(days=rng.randint(1, 10))).isoformat(),
+        "deposit": 0,
+    }}
+
+
+def create_payment(rng: random.Random, ctx: dict):
+    return "POST", "/payments/", {"json": {
+        "contract_id": rng.choice(ctx["contracts"]),
+        "amount": rng.randrange(100_000, 2_000_000, 10_000),
+        "payment_date": date.today().isoformat(),
+        "note": "benchmark",
+    }}
+
+
+def contract_payments(rng: random.Random, ctx: dict):
+    return "GET", f"/contracts/{rng.choice(ctx['contracts'])}/payments", {}
+
+
+def download_contract(rng: random.Random, ctx: dict):
+    return "GET", f"/contracts/{rng.choice(ctx['contracts'])}/download", {}
+
+
+SCENARIOS: Dict[str, tuple] = {
+    # tên: (hàm sinh request, các mã trạng thái coi là thành công)
+    "list_properties": (list_properties, {200}),
+    "create_contract": (create_contract, {200, 409}),
+    "create_payment": (create_payment, {200}),
+    "contract_payments": (contract_payments, {200}),
+    "download_contract": (download_contract, {200}),
+}
+
+
+async def drive(client, build: Callable, expected: set, ctx: dict, requests: int, concurrency: int, seed: int) -> dict:
+    """Gửi `requests` request từ `concurrency` client song song, đo độ trễ từng request"""
+    rng = random.Random(seed)
+    # Sinh trước toàn bộ request: thứ tự cố định, không phụ thuộc client nào chạy nhanh hơn
+    plan = [build(rng, ctx) for _ in range(requests)]
+    latencies: List[float] = []
+    queries: List[int] = []
+    statuses: Counter = Counter()
+    errors = 0
+    queue = iter(plan)
+
+    async def worker():
+        nonlocal errors
+        for method, url, kwargs in queue:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                await response.aread()
+            except Exception as e:
+                errors += 1
+                statuses[type(e).__name__] += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            counted = QUERY_COUNT.search(response.headers.get("server-timing", ""))
+            if counted:
+                queries.append(int(counted.group(1)))
+            statuses[str(response.status_code)] += 1
+            if response.status_code not in expected:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "status_codes": dict(sorted(statuses.items())),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "max_ms": round(max(latencies), 2) if latencies else 0.0,
+        "queries_mean": round(sum(queries) / len(queries), 2) if queries else None,
+        "queries_max": max(queries) if queries else None,
+    }
+
+
+async def run(args) -> dict:
+    import httpx
+
+    from app.database import engine
+
+    names = args.scenarios or list(SCENARIOS)
+    if "create_contract" in names:
+        removed = reset_bench_contracts()
+        if removed:
+            print(f"🧹 Đã xóa {removed} hợp đồng của lần chạy trước")
+    ctx = load_context()
+    async with AsyncExitStack() as stack:
+        if args.url:
+            client = await stack.enter_async_context(httpx.AsyncClient(base_url=args.url, timeout=60))
+        else:
+            from app.main import app
+
+            # Chạy lifespan (migrate, làm nóng pool, change feed...) như server thật
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            client = await stack.enter_async_context(httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=60
+            ))
+
+        results = {}
+        for index, name in enumerate(names):
+            build, expected = SCENARIOS[name]
+            if args.warmup:
+                await drive(client, build, expected, ctx, args.warmup, args.concurrency, args.seed - 1)
+            results[name] = await drive(
+                client, build, expected, ctx, args.requests, args.concurrency, args.seed + index
+            )
+            r = results[name]
+            print(f"{name:18} {r['throughput_rps']:8.1f} req/s | p50 {r['p50_ms']:7.1f} | p95 {r['p95_ms']:7.1f} | "
+                  f"p99 {r['p99_ms']:7.1f} ms | query {r['queries_mean']} | lỗi {r['errors']} {r['status_codes']}")
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "database": engine.dialect.name,
+            "target": args.url or "in-process",
+            "python": platform.python_version(),
+            "data": ctx["counts"],
+            "config": {"requests": args.requests, "concurrency": args.concurrency,
+                       "warmup": args.warmup, "seed": args.seed},
+        },
+        "scenarios": results,
+    }
+
+
+def compare(base_path: str, new_path: str, threshold: float) -> int:
+    """In chênh lệch từng chỉ số; trả về số chỉ số chậm đi quá threshold %"""
+    base, new = (json.loads(Path(path).read_text(encoding="utf-8")) for path in (base_path, new_path))
+    print(f"📏 {base['meta'].get('commit')} -> {new['meta'].get('commit')} "
+          f"({base['meta']['database']} / {new['meta']['database']})")
+    regressions = 0
+    for name, after in new["scenarios"].items():
+        before = base["scenarios"].get(name)
+        if not before:
+            print(f"{name:18} (mới)")
+            continue
+        parts = []
+        for metric, higher_is_better in (("throughput_rps", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False)):
+            old, value = before[metric], after[metric]
+            change = (value - old) / old * 100 if old else 0.0
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > threshold:
+                regressions += 1
+                flag = " ⚠️"
+            parts.append(f"{metric} {old:g} -> {value:g} ({change:+.1f}%){flag}")
+        print(f"{name:18} " + " | ".join(parts))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Chạy các kịch bản và lưu kết quả JSON")
+    run_parser.add_argument("--requests", type=int, default=500, help="Số request mỗi kịch bản")
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument("--warmup", type=int, default=50, help="Số request làm nóng (không tính)")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--scenario", dest="scenarios", action="append", choices=sorted(SCENARIOS))
+    run_parser.add_argument("--url", help="Đo server đang chạy thay vì gọi app trong process")
+    run_parser.add_argument("--output", help="File kết quả (mặc định benchmark/results/<thời gian>-<commit>.json)")
+
+    compare_parser = commands.add_parser("compare", help="So sánh 2 file kết quả")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=10, help="% chậm đi coi là regression")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        sys.exit(1 if compare(args.base, args.new, args.threshold) else 0)
+
+    if not args.url:
+        from app.database import engine
+        from app.migrations import migrate
+
+        migrate(engine)
+    report = asyncio.run(run(args))
+    output = Path(args.output) if args.output else (
+        RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{report['meta']['commit'] or 'local'}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"💾 Đã lưu {output}")
+
+
+if __name__ == "__main__":
+    main()
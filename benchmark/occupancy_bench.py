@@ -0,0 +1,90 @@
+"""Đo thời gian tính công suất cho thuê (/analytics/occupancy) trên khoảng 5 năm.
+
+Tạo thêm tài sản cho đủ --properties, mỗi tài sản có các hợp đồng nối tiếp nhau (5-60 ngày,
+nghỉ 0-20 ngày giữa 2 hợp đồng) trong --years năm qua, rồi đo riêng phần query và phần NumPy.
+
+    python -m benchmark.occupancy_bench --properties 10000 --years 5
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select, text
+
+from app import models, occupancy
+from app.database import SessionLocal, engine
+from app.main import get_owner_id
+from app.migrations import migrate
+
+
+def seed(properties: int, start: date, end: date):
+    db = SessionLocal()
+    try:
+        existing = db.scalar(select(func.count(models.Property.id)).where(models.Property.address == "occupancy-bench"))
+        if existing >= properties:
+            return
+        owner_id = get_owner_id(db)
+        rng = random.Random(5)
+        while existing < properties:
+            chunk = min(1000, properties - existing)
+            ids = db.scalars(
+                insert(models.Property).returning(models.Property.id),
+                [{"name": f"Occupancy #{existing + i}", "address": "occupancy-bench", "price": 500000,
+                  "category": rng.choice(["real_estate", "vehicle", "equipment"]), "status": "available",
+                  "owner_id": owner_id} for i in range(chunk)]
+            ).all()
+            rows = []
+            for property_id in ids:
+                day = start + timedelta(days=rng.randint(0, 30))
+                while day < end:
+                    last = day + timedelta(days=rng.randint(5, 60))
+                    rows.append({
+                        "property_id": property_id, "tenant_id": owner_id, "start_date": day, "end_date": last,
+                        "total_price": (last - day).days * 500000, "deposit": 0, "status": "completed",
+                        "rental_type": "daily",
+                    })
+                    day = last + timedelta(days=rng.randint(1, 20))
+            db.execute(insert(models.Contract), rows)
+            db.commit()
+            existing += chunk
+            print(f"… {existing} tài sản")
+        if engine.dialect.name == "postgresql":
+            db.execute(text("ANALYZE properties"))
+            db.execute(text("ANALYZE contracts"))
+            db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--properties", type=int, default=10000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    date_to = date.today()
+    date_from = date_to - timedelta(days=365 * args.years)
+    migrate(engine)
+    seed(args.properties, date_from, date_to)
+
+    for _ in range(args.repeat):
+        with engine.connect() as conn:
+            started = time.perf_counter()
+            props = conn.execute(select(models.Property.id, models.Property.category)).all()
+            contracts = conn.execute(occupancy.contracts_query(date_from, date_to, engine.dialect.name)).all()
+            loaded = time.perf_counter()
+        for interval in ("month", "day"):
+            computed = time.perf_counter()
+            report = occupancy.compute(
+                date_from, date_to, [r.id for r in props], [r.category for r in props], contracts, "property", interval
+            )
+            finished = time.perf_counter()
+            print(f"📊 {len(props)} tài sản, {len(contracts)} hợp đồng, {report['days']} ngày ({interval}): "
+                  f"query {(loaded - started) * 1000:.0f} ms | NumPy {(finished - computed) * 1000:.0f} ms | "
+                  f"lấp đầy {report['totals']['occupancy_rate']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
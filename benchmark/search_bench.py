@@ -0,0 +1,90 @@
+"""Đo tốc độ tìm kiếm tài sản (cột search_text + index trigram).
+
+Tạo thêm tài sản giả (tên / địa chỉ tiếng Việt có dấu) cho đủ --rows, rồi chạy
+lặp lại truy vấn tìm kiếm giống /properties/?q=... và in p50 / p99. Trên PostgreSQL
+in thêm kế hoạch thực thi để kiểm tra index ix_properties_search_trgm có được dùng.
+
+    python -m benchmark.search_bench --rows 300000 --repeat 50
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import func, insert, select, text
+
+from app import models, search
+from app.database import SessionLocal, engine
+from app.main import get_owner_id
+from app.migrations import migrate
+
+NAMES = ["Phòng trọ", "Căn hộ", "Nhà nguyên căn", "Xe máy", "Ô tô", "Máy ảnh", "Văn phòng", "Mặt bằng"]
+PLACES = ["Quận 1", "Bình Thạnh", "Thủ Đức", "Đà Lạt", "Hà Nội", "Đà Nẵng", "Cần Thơ", "Nha Trang", "Huế", "Vũng Tàu"]
+DETAILS = ["gần chợ", "có ban công", "full nội thất", "đời mới", "giá rẻ", "view biển", "yên tĩnh", "mặt tiền"]
+KEYWORDS = ["phong tro da lat", "Căn hộ", "xe may thu duc", "nha trang view bien", "ô tô đời mới", "van phong quan 1"]
+
+
+def seed(rows: int, batch: int = 5000):
+    db = SessionLocal()
+    try:
+        existing = db.scalar(select(func.count(models.Property.id)))
+        owner_id = get_owner_id(db)
+        rng = random.Random(7)
+        while existing < rows:
+            chunk = []
+            for i in range(min(batch, rows - existing)):
+                name = f"{rng.choice(NAMES)} {rng.choice(DETAILS)} #{existing + i}"
+                address = f"{rng.randint(1, 300)} đường số {rng.randint(1, 50)}, {rng.choice(PLACES)}"
+                description = " ".join(rng.sample(DETAILS, 3))
+                chunk.append({
+                    "name": name, "address": address, "description": description,
+                    "price": rng.randint(1, 50) * 100000, "category": "real_estate",
+                    "status": "available", "owner_id": owner_id,
+                    "search_text": search.property_search_text(name, address, description),
+                })
+            db.execute(insert(models.Property), chunk)
+            db.commit()
+            existing += len(chunk)
+            print(f"… {existing} tài sản")
+        if engine.dialect.name == "postgresql":
+            db.execute(text("ANALYZE properties"))
+            db.commit()
+    finally:
+        db.close()
+
+
+def build_query(keyword: str, limit: int):
+    score = search.rank(engine.dialect.name, keyword)
+    query = search.keyword_filter(select(models.Property.id), keyword)
+    return query.order_by(score.desc(), models.Property.id).limit(limit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    migrate(engine)
+    seed(args.rows)
+
+    with engine.connect() as conn:
+        for keyword in KEYWORDS:
+            stmt = build_query(keyword, args.limit)
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                found = conn.execute(stmt).all()
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p50 = timings[len(timings) // 2]
+            p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+            print(f"🔎 {keyword!r:28} {len(found):>3} kết quả | p50 {p50:7.2f} ms | p99 {p99:7.2f} ms")
+
+        if engine.dialect.name == "postgresql":
+            compiled = build_query(KEYWORDS[0], args.limit).compile(engine, compile_kwargs={"literal_binds": True})
+            print("\n".join(row[0] for row in conn.execute(text(f"EXPLAIN ANALYZE {compiled}"))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Stress test đặt lịch song song.
+
+Nhiều request đồng thời cùng gọi create_contract cho một nhóm nhỏ tài sản với các khoảng
+ngày chồng lấn nhau, sau đó kiểm tra trong DB không có 2 hợp đồng active nào
+trùng lịch. Cần PostgreSQL: trên SQLite không có exclusion constraint nên
+test sẽ FAIL (chính là race condition "kiểm tra rồi mới insert").
+
+    python -m benchmark.stress_booking --properties 5 --attempts 400 --workers 16
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, event, text
+
+from app import models, schemas
+from app.database import AsyncSessionLocal, SessionLocal, async_engine, engine
+from app.main import create_contract, get_or_create_admin, upsert_tenant
+from app.migrations import migrate
+
+OVERLAP_SQL = text("""
+    SELECT count(*) FROM contracts a
+    JOIN contracts b
+      ON a.property_id = b.property_id
+     AND a.id < b.id
+     AND a.start_date <= b.end_date
+     AND a.end_date >= b.start_date
+    WHERE a.status = 'active' AND b.status = 'active'
+      AND a.property_id IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+
+async def book(property_id: int, start: date, end: date, email: str) -> tuple:
+    """(mã trạng thái, độ trễ ms)"""
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        try:
+            await create_contract(schemas.ContractCreate(
+                property_id=property_id,
+                tenant_email=email,
+                start_date=start,
+                end_date=end,
+                deposit=10
+            ), db)
+            status = 200
+        except HTTPException as e:
+            status = e.status_code
+    return status, (time.perf_counter() - started) * 1000
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def create_tenants(emails: list):
+    # Tạo trước khách thuê để chỉ đo tranh chấp ở bước đặt lịch
+    async with AsyncSessionLocal() as db:
+        for email in emails:
+            await upsert_tenant(db, email)
+        await db.commit()
+
+
+async def run_bookings(jobs: list, workers: int) -> list:
+    # Semaphore giới hạn số request chạy cùng lúc (tương đương số luồng trước đây)
+    limit = asyncio.Semaphore(workers)
+
+    async def run(job):
+        async with limit:
+            return await book(*job)
+
+    try:
+        return await asyncio.gather(*(run(job) for job in jobs))
+    finally:
+        await async_engine.dispose()
+
+
+def setup_properties(count: int) -> list:
+    db = SessionLocal()
+    try:
+        admin = get_or_create_admin(db)
+        props = [
+            models.Property(
+                name=f"Stress #{i}", address="stress", price=100,
+                category="item", owner_id=admin.id, status="available"
+            )
+            for i in range(count)
+        ]
+        db.add_all(props)
+        db.commit()
+        return [p.id for p in props]
+    finally:
+        db.close()
+
+
+def cleanup(property_ids: list):
+    contracts = "(SELECT id FROM contracts WHERE property_id IN :ids)"
+    statements = [
+        f"DELETE FROM invoices WHERE contract_id IN {contracts}",
+        f"DELETE FROM payments WHERE contract_id IN {contracts}",
+        f"DELETE FROM change_events WHERE contract_id IN {contracts}",
+        "DELETE FROM contracts WHERE property_id IN :ids",
+        "DELETE FROM revenue_rollups WHERE property_id IN :ids",
+        "DELETE FROM properties WHERE id IN :ids",
+    ]
+    with engine.begin() as conn:
+        for sql in statements:
+            conn.execute(text(sql).bindparams(bindparam("ids", expanding=True)), {"ids": property_ids})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--properties", type=int, default=5)
+    parser.add_argument("--attempts", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--window-days", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Giữ lại dữ liệu test")
+    args = parser.parse_args()
+
+    migrate(engine)
+    rng = random.Random(args.seed)
+    emails = [f"stress{i}@example.com" for i in range(50)]
+    property_ids = setup_properties(args.properties)
+    base = date.today() + timedelta(days=365)
+
+    jobs = []
+    for i in range(args.attempts):
+        start = base + timedelta(days=rng.randrange(args.window_days))
+        end = start + timedelta(days=rng.randint(1, 7))
+        jobs.append((rng.choice(property_ids), start, end, rng.choice(emails)))
+
+    statements = Counter()
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements["total"] += 1
+
+    async def run_all():
+        await create_tenants(emails)
+        event.listen(async_engine.sync_engine, "before_cursor_execute", count_statement)
+        started = time.perf_counter()
+        try:
+            results = await run_bookings(jobs, args.workers)
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", count_statement)
+        return results, time.perf_counter() - started
+
+    outcomes, elapsed = asyncio.run(run_all())
+    results = [status for status, _ in outcomes]
+    booked = [ms for status, ms in outcomes if status == 200]
+
+    with engine.connect() as conn:
+        overlaps = conn.execute(OVERLAP_SQL, {"ids": property_ids}).scalar()
+
+    status = Counter(results)
+    print(f"⏱️  {len(jobs)} lượt đặt / {elapsed:.2f}s = {len(jobs) / elapsed:.1f} req/s ({args.workers} request đồng thời)")
+    print(f"✅ Thành công: {status.get(200, 0)} | ⛔ 409 trùng lịch: {status.get(409, 0)} | "
+          f"❌ Khác: {sum(v for k, v in status.items() if k not in (200, 409))}")
+    print(f"⏱️  Độ trễ đặt thành công: p50 {percentile(booked, 50):.1f} ms | p95 {percentile(booked, 95):.1f} ms | "
+          f"p99 {percentile(booked, 99):.1f} ms | {statements['total'] / len(jobs):.1f} câu lệnh SQL / lượt")
+    print(f"🔍 Cặp hợp đồng active trùng lịch trong DB: {overlaps}")
+
+    if not args.keep:
+        cleanup(property_ids)
+
+    if overlaps:
+        print("❌ FAIL: phát hiện đặt trùng lịch!")
+        sys.exit(1)
+    print("✅ PASS")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,20 +18,70 @@ function showToast(message, type = 'success') {
     setTimeout(() => toast.remove(), 4000);
 }
 
+// Token của lần ghi gần nhất: gửi lại để server đọc từ DB chính (replica có thể còn trễ)
+let writeToken = null;
+
+async function apiFetch(url, options = {}) {
+    const headers = new Headers(options.headers || {});
+    if (writeToken) headers.set("X-Read-Your-Writes", writeToken);
+
+    const res = await fetch(url, { ...options, headers });
+    const token = res.headers.get("X-Write-Token");
+    if (token) writeToken = token;
+    return res;
+}
+
+// Gọi API có phân trang (cursor) và gom hết các trang
+async function fetchAllPages(url) {
+    const items = [];
+    let cursor = null;
+    do {
+        const sep = url.includes("?") ? "&" : "?";
+        const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : "";
+        const res = await apiFetch(`${url}${sep}limit=500${cursorParam}`);
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        const page = await res.json();
+        items.push(...page.items);
+        cursor = page.next_cursor;
+    } while (cursor);
+    return items;
+}
+
 // ============================================================
 // 1. QUẢN LÝ TÀI SẢN
 // ============================================================
+let searchTimer = null;
+
+// Gõ xong 300ms mới tìm, tránh gọi API theo từng phím
+function searchProperties() {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(loadProperties, 300);
+}
+
 async function loadProperties() {
     try {
         const filterCat = document.getElementById("filterCategory")?.value || "";
-        const res = await fetch(`${API_URL}/properties/`);
-        
-        if (!res.ok) {
+        const keyword = document.getElementById("searchProperty")?.value.trim() || "";
+        const params = new URLSearchParams();
+        if (filterCat) params.set("category", filterCat);
+        let data;
+        try {
+            if (keyword) {
+                // Tìm không dấu, xếp theo độ liên quan (server trả tối đa 100 kết quả, 1 trang)
+                params.set("q", keyword);
+                params.set("limit", "100");
+                const res = await apiFetch(`${API_URL}/properties/?${params}`);
+                if (!res.ok) throw new Error(`HTTP ${res.status}`);
+                data = (await res.json()).items;
+            } else {
+                const query = params.toString() ? `?${params}` : "";
+                data = await fetchAllPages(`${API_URL}/properties/${query}`);
+            }
+        } catch (err) {
             showToast("Lỗi kết nối Backend", "error");
             return;
         }
 
-        const data = await res.json();
         const listBody = document.getElementById("propertyList");
         const selectBox = document.getElementById("contractPropId");
         let propertyCount = 0;
@@ -39,7 +89,7 @@ async function loadProperties() {
         listBody.innerHTML = "";
         selectBox.innerHTML = `<option value="">-- Chọn tài sản --</option>`;
 
-        const filteredData = Array.isArray(data) ? data. filter(p => ! filterCat || p.category === filterCat) : [];
+        const filteredData = data;
         propertyCount = filteredData.length;
         
         if (filteredData.length === 0) {
@@ -105,7 +155,7 @@ document.getElementById("propertyForm")?.addEventListener("submit", async e => {
     };
 
     try {
-        const res = await fetch(`${API_URL}/properties/`, {
+        const res = await apiFetch(`${API_URL}/properties/`, {
             method: "POST",
             headers: { "Content-Type": "application/json" },
             body: JSON.stringify(payload)
@@ -129,7 +179,7 @@ document.getElementById("propertyForm")?.addEventListener("submit", async e => {
 async function deleteProperty(id) {
     if (!confirm("Xóa tài sản này? ")) return;
     try {
-        const res = await fetch(`${API_URL}/properties/${id}`, { method: "DELETE" });
+        const res = await apiFetch(`${API_URL}/properties/${id}`, { method: "DELETE" });
         if (res.ok) {
             showToast("✅ Đã xóa tài sản");
             loadProperties();
@@ -146,121 +196,178 @@ async function deleteProperty(id) {
 // ============================================================
 // 2. TÍNH TIỀN HỢP ĐỒNG
 // ============================================================
-function calculateTotal() {
-    const propSelect = document.getElementById("contractPropId");
-    const option = propSelect?. options[propSelect.selectedIndex];
-    const price = Number(option?.dataset.price || 0);
+// Chỉ hiển thị kết quả của lần báo giá mới nhất (người dùng đổi ngày liên tục)
+let quoteSeq = 0;
 
+async function calculateTotal() {
+    const propId = Number(document.getElementById("contractPropId")?.value || 0);
     const start = document.getElementById("startDate")?.value;
     const end = document.getElementById("endDate")?.value;
     const rentalType = document.querySelector('input[name="rentalType"]:checked')?.value || "daily";
     const display = document.getElementById("previewTotal");
+    const seq = ++quoteSeq;
 
-    if (!price || !start || !end) {
+    if (!propId || !start || !end) {
         if (display) display.innerText = "0 đ";
         return;
     }
-
-    const startDate = new Date(start);
-    const endDate = new Date(end);
-    const diffTime = endDate - startDate;
-    const days = Math.ceil(diffTime / (1000 * 60 * 60 * 24));
-
-    if (days <= 0) {
+    if (end <= start) {
         if (display) display.innerText = "Ngày không hợp lệ";
         return;
     }
 
-    let total = 0;
-    if (rentalType === "daily") {
-        total = days * price;
-    } else if (rentalType === "monthly") {
-        const months = Math.max(1, Math.ceil((days + 15) / 30));
-        total = months * price;
+    // Giá tính ở server (giá tuần, cuối tuần, theo mùa, thuê dài) -> đúng bằng tổng tiền khi tạo hợp đồng
+    try {
+        const res = await apiFetch(`${API_URL}/quotes`, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({
+                items: [{ property_id: propId, start_date: start, end_date: end, rental_type: rentalType }]
+            })
+        });
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        const quote = (await res.json()).items[0];
+        if (seq !== quoteSeq || !display) return;
+        display.innerText = quote.error ? quote.error : fmtMoney(quote.total_price);
+    } catch (err) {
+        if (seq === quoteSeq && display) display.innerText = "Không tính được giá";
     }
+}
+
+// Các khoảng ngày đã có người thuê của tài sản đang chọn (1 năm tới)
+async function loadBookedDays() {
+    const propId = Number(document.getElementById("contractPropId")?.value || 0);
+    const hint = document.getElementById("bookedDays");
+    if (!hint) return;
+    hint.innerText = "";
+    if (!propId) return;
 
-    if (display) display.innerText = fmtMoney(total);
+    try {
+        const res = await apiFetch(`${API_URL}/properties/${propId}/calendar?format=ranges`);
+        if (!res.ok) return;
+        const ranges = (await res.json()).calendars[0].ranges;
+        if (Number(document.getElementById("contractPropId").value) !== propId) return;
+        const fmt = (d) => new Date(d).toLocaleDateString("vi-VN");
+        hint.innerText = ranges.length
+            ? "Đã kín: " + ranges.map(([start, end]) => `${fmt(start)} - ${fmt(end)}`).join(", ")
+            : "Còn trống cả năm tới";
+    } catch (err) {
+        hint.innerText = "";
+    }
 }
 
 // ============================================================
 // 3. QUẢN LÝ HỢP ĐỒNG
 // ============================================================
+// Hợp đồng đang hiển thị, theo id (để cập nhật từng thẻ khi có sự kiện)
+const contractsById = new Map();
+
 async function loadContracts() {
     try {
-        const res = await fetch(`${API_URL}/contracts/`);
-        if (!res.ok) return;
-
-        const data = await res.json();
+        // 1 request duy nhất: server đã tính sẵn đã thu / còn thiếu cho từng hợp đồng
+        const data = await fetchAllPages(`${API_URL}/contracts/summary`);
         const list = document.getElementById("contractList");
         if (! list) return;
 
+        contractsById.clear();
         list.innerHTML = "";
-        let totalRevenue = 0;
-        let contractCount = 0;
+        for (const c of data) {
+            contractsById.set(c.id, c);
+            list.insertAdjacentHTML("beforeend", renderContractCard(c));
+        }
+        renderContractTotals();
+        loadStats();
 
-        if (! Array.isArray(data) || data.length === 0) {
-            list.innerHTML = `<div class="text-center text-muted py-4">📋 Chưa có hợp đồng nào</div>`;
-        } else {
-            for (const c of data) {
-                contractCount++;
-                let paid = 0;
-                try {
-                    const payRes = await fetch(`${API_URL}/contracts/${c.id}/payments`);
-                    if (payRes.ok) {
-                        const payments = await payRes.json();
-                        if (Array.isArray(payments)) {
-                            paid = payments.reduce((s, p) => s + p.amount, 0);
-                        }
-                    }
-                } catch (err) {
-                    console.error(err);
-                }
+    } catch (err) {
+        console.error(err);
+    }
+}
 
-                totalRevenue += paid;
-                const percent = Math.min(100, (paid / (c.total_price || 1)) * 100);
-                const progressColor = paid >= c.total_price ? '#10b981' : '#f59e0b';
-
-                list.innerHTML += `
-                    <div class="contract-item" onclick="openPaymentModal(${c.id}, '${c.status || 'active'}')">
-                        <div class="contract-item-header">
-                            <div class="contract-item-title">HĐ #${c.id}</div>
-                            <span class="badge badge-success">${c.status || 'Active'}</span>
-                        </div>
-                        <div class="contract-item-dates">
-                            <i class="fas fa-calendar"></i> ${c.start_date} → ${c.end_date}
-                        </div>
-                        <div class="contract-item-row">
-                            <span class="contract-item-label">Tổng tiền:</span>
-                            <span class="contract-item-value">${fmtMoney(c.total_price || 0)}</span>
-                        </div>
-                        <div class="contract-item-row">
-                            <span class="contract-item-label">Đã thu:</span>
-                            <span class="contract-item-value" style="color: #10b981;">${fmtMoney(paid)}</span>
-                        </div>
-                        <div class="progress">
-                            <div class="progress-bar" style="background-color: ${progressColor}; width: ${percent}%"></div>
-                        </div>
-                        <div style="display: flex; gap: 6px;">
-                            <button class="btn btn-primary w-100 btn-sm" onclick="openPaymentModal(${c.id}, '${c.status || 'active'}'); event.stopPropagation();">
-                                <i class="fas fa-plus"></i> Nộp tiền
-                            </button>
-                            <button class="btn btn-info w-100 btn-sm" onclick="downloadContractPDF(${c.id}); event.stopPropagation();">
-                                <i class="fas fa-download"></i> PDF
-                            </button>
-                        </div>
-                    </div>
-                `;
-            }
-        }
+function renderContractCard(c) {
+    const paid = c.paid || 0;
+    const percent = Math.min(100, (paid / (c.total_price || 1)) * 100);
+    const progressColor = paid >= c.total_price ? '#10b981' : '#f59e0b';
+
+    return `
+        <div class="contract-item" id="contract-${c.id}" onclick="openPaymentModal(${c.id}, '${c.status || 'active'}')">
+            <div class="contract-item-header">
+                <div class="contract-item-title">HĐ #${c.id}</div>
+                <span class="badge ${c.status === 'completed' ? 'badge-secondary' : 'badge-success'}">${c.status || 'Active'}</span>
+            </div>
+            <div class="contract-item-dates">
+                <i class="fas fa-calendar"></i> ${c.start_date} → ${c.end_date}
+            </div>
+            <div class="contract-item-row">
+                <span class="contract-item-label">Tổng tiền:</span>
+                <span class="contract-item-value">${fmtMoney(c.total_price || 0)}</span>
+            </div>
+            <div class="contract-item-row">
+                <span class="contract-item-label">Đã thu:</span>
+                <span class="contract-item-value" style="color: #10b981;">${fmtMoney(paid)}</span>
+            </div>
+            <div class="progress">
+                <div class="progress-bar" style="background-color: ${progressColor}; width: ${percent}%"></div>
+            </div>
+            <div style="display: flex; gap: 6px;">
+                <button class="btn btn-primary w-100 btn-sm" onclick="openPaymentModal(${c.id}, '${c.status || 'active'}'); event.stopPropagation();">
+                    <i class="fas fa-plus"></i> Nộp tiền
+                </button>
+                <button class="btn btn-info w-100 btn-sm" onclick="downloadContractPDF(${c.id}); event.stopPropagation();">
+                    <i class="fas fa-download"></i> PDF
+                </button>
+            </div>
+        </div>
+    `;
+}
 
-        document. getElementById("totalContracts").innerText = contractCount;
-        document.getElementById("totalRevenue").innerText = fmtMoney(totalRevenue);
+function renderContractTotals() {
+    const list = document.getElementById("contractList");
+    if (list && contractsById.size === 0) {
+        list.innerHTML = `<div class="text-center text-muted py-4">📋 Chưa có hợp đồng nào</div>`;
+    }
+
+    document.getElementById("totalContracts").innerText = contractsById.size;
+}
 
+// Tổng doanh thu: server cộng dồn sẵn (bảng rollup), không cần cộng từng thanh toán
+async function loadStats() {
+    try {
+        const res = await apiFetch(`${API_URL}/stats`);
+        if (!res.ok) return;
+        const stats = await res.json();
+        document.getElementById("totalRevenue").innerText = fmtMoney(stats.totals.revenue);
     } catch (err) {
         console.error(err);
     }
 }
 
+// Lấy lại 1 hợp đồng rồi thay đúng thẻ của nó (gọi nhiều lần vẫn cho cùng kết quả)
+async function refreshContract(contractId) {
+    const res = await apiFetch(`${API_URL}/contracts/${contractId}/summary`);
+    if (res.status === 404) return removeContract(contractId);
+    if (!res.ok) return;
+
+    const c = await res.json();
+    const list = document.getElementById("contractList");
+    if (!list) return;
+    if (contractsById.size === 0) list.innerHTML = "";
+    contractsById.set(c.id, c);
+
+    const card = document.getElementById(`contract-${c.id}`);
+    if (card) card.outerHTML = renderContractCard(c);
+    else list.insertAdjacentHTML("beforeend", renderContractCard(c));
+    renderContractTotals();
+    loadStats();
+}
+
+function removeContract(contractId) {
+    contractsById.delete(contractId);
+    const card = document.getElementById(`contract-${contractId}`);
+    if (card) card.remove();
+    renderContractTotals();
+    loadStats();
+}
+
 // Download PDF Hợp Đồng
 function downloadContractPDF(contractId) {
     const url = `${API_URL}/contracts/${contractId}/download`;
@@ -280,7 +387,7 @@ document.getElementById("contractForm")?.addEventListener("submit", async e => {
     };
 
     try {
-        const res = await fetch(`${API_URL}/contracts/`, {
+        const res = await apiFetch(`${API_URL}/contracts/`, {
             method: "POST",
             headers: { "Content-Type":  "application/json" },
             body: JSON.stringify(payload)
@@ -308,7 +415,7 @@ async function deleteContract(id, event) {
     if (!confirm("Hủy hợp đồng này?")) return;
     
     try {
-        const res = await fetch(`${API_URL}/contracts/${id}`, { method: "DELETE" });
+        const res = await apiFetch(`${API_URL}/contracts/${id}`, { method: "DELETE" });
         if (res.ok) {
             showToast("✅ Đã hủy hợp đồng");
             loadContracts();
@@ -344,13 +451,11 @@ async function openPaymentModal(cid, status) {
     let paid = 0;
 
     try {
-        const contractRes = await fetch(`${API_URL}/contracts/`);
-        if (contractRes.ok) {
-            const contracts = await contractRes.json();
-            const contract = contracts.find(c => c.id === cid);
-            if (contract) {
-                totalPrice = contract.total_price || 0;
-            }
+        const summaryRes = await apiFetch(`${API_URL}/contracts/${cid}/summary`);
+        if (summaryRes.ok) {
+            const summary = await summaryRes.json();
+            totalPrice = summary.total_price || 0;
+            paid = summary.paid || 0;
         }
     } catch (err) {
         console.error(err);
@@ -360,34 +465,29 @@ async function openPaymentModal(cid, status) {
     if (tbody) tbody.innerHTML = "<tr><td colspan='4' class='text-center text-muted py-4'>Đang tải... </td></tr>";
 
     try {
-        const res = await fetch(`${API_URL}/contracts/${cid}/payments`);
-        if (res.ok) {
-            const payments = await res.json();
-            if (tbody) {
-                tbody.innerHTML = "";
-                if (! Array.isArray(payments) || payments.length === 0) {
-                    tbody.innerHTML = "<tr><td colspan='4' class='text-center text-muted py-3'>Chưa có giao dịch</td></tr>";
-                } else {
-                    paid = payments.reduce((s, p) => s + p.amount, 0);
-                    
-                    payments.forEach(p => {
-                        tbody.innerHTML += `
-                            <tr>
-                                <td><small>${p.payment_date || '-'}</small></td>
-                                <td><small>${p.note || '-'}</small></td>
-                                <td class="text-end"><small style="color: #10b981; font-weight: 600;">+${fmtMoney(p.amount)}</small></td>
-                                <td class="text-center">
-                                    <button class="btn btn-sm btn-warning" onclick="editPayment(${p.id}, ${cid})" title="Sửa">
-                                        <i class="fas fa-edit"></i>
-                                    </button>
-                                    <button class="btn btn-sm btn-danger" onclick="deletePayment(${p.id}, ${cid})" title="Xóa">
-                                        <i class="fas fa-trash"></i>
-                                    </button>
-                                </td>
-                            </tr>
-                        `;
-                    });
-                }
+        const payments = await fetchAllPages(`${API_URL}/contracts/${cid}/payments`);
+        if (tbody) {
+            tbody.innerHTML = "";
+            if (! Array.isArray(payments) || payments.length === 0) {
+                tbody.innerHTML = "<tr><td colspan='4' class='text-center text-muted py-3'>Chưa có giao dịch</td></tr>";
+            } else {
+                payments.forEach(p => {
+                    tbody.innerHTML += `
+                        <tr>
+                            <td><small>${p.payment_date || '-'}</small></td>
+                            <td><small>${p.note || '-'}</small></td>
+                            <td class="text-end"><small style="color: #10b981; font-weight: 600;">+${fmtMoney(p.amount)}</small></td>
+                            <td class="text-center">
+                                <button class="btn btn-sm btn-warning" onclick="editPayment(${p.id}, ${cid})" title="Sửa">
+                                    <i class="fas fa-edit"></i>
+                                </button>
+                                <button class="btn btn-sm btn-danger" onclick="deletePayment(${p.id}, ${cid})" title="Xóa">
+                                    <i class="fas fa-trash"></i>
+                                </button>
+                            </td>
+                        </tr>
+                    `;
+                });
             }
         }
     } catch (e) {
@@ -445,7 +545,7 @@ document.getElementById("paymentForm")?.addEventListener("submit", async e => {
     };
 
     try {
-        const res = await fetch(`${API_URL}/payments/`, {
+        const res = await apiFetch(`${API_URL}/payments/`, {
             method: "POST",
             headers: { "Content-Type": "application/json" },
             body: JSON. stringify(payload)
@@ -471,7 +571,7 @@ async function deletePayment(paymentId, contractId) {
     if (!confirm("Xóa thanh toán này? ")) return;
     
     try {
-        const res = await fetch(`${API_URL}/payments/${paymentId}`, { method: "DELETE" });
+        const res = await apiFetch(`${API_URL}/payments/${paymentId}`, { method: "DELETE" });
         if (res.ok) {
             showToast("✅ Đã xóa thanh toán");
             openPaymentModal(contractId);
@@ -493,7 +593,7 @@ async function editPayment(paymentId, contractId) {
     }
     
     try {
-        const res = await fetch(`${API_URL}/payments/${paymentId}`, { 
+        const res = await apiFetch(`${API_URL}/payments/${paymentId}`, { 
             method: "PUT",
             headers: { "Content-Type": "application/json" },
             body: JSON.stringify({
@@ -522,10 +622,7 @@ async function editPayment(paymentId, contractId) {
 // ============================================================
 async function loadDamages(contractId) {
     try {
-        const res = await fetch(`${API_URL}/contracts/${contractId}/damages`);
-        if (!res.ok) return;
-
-        const damages = await res.json();
+        const damages = await fetchAllPages(`${API_URL}/contracts/${contractId}/damages`);
         const list = document.getElementById('damageList');
         list.innerHTML = '';
 
@@ -585,10 +682,9 @@ document. getElementById('damageForm')?.addEventListener('submit', async e => {
     
     let propertyId = 0;
     try {
-        const res = await fetch(`${API_URL}/contracts/`);
-        const contracts = await res.json();
-        const contract = contracts.find(c => c.id === parseInt(cid));
-        propertyId = contract?. property_id || 0;
+        const res = await apiFetch(`${API_URL}/contracts/${cid}/summary`);
+        const contract = await res.json();
+        propertyId = contract?.property_id || 0;
     } catch (err) {
         console.error(err);
     }
@@ -603,7 +699,7 @@ document. getElementById('damageForm')?.addEventListener('submit', async e => {
     };
 
     try {
-        const res = await fetch(`${API_URL}/damage-reports/`, {
+        const res = await apiFetch(`${API_URL}/damage-reports/`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(payload)
@@ -625,7 +721,7 @@ document. getElementById('damageForm')?.addEventListener('submit', async e => {
 // Đánh dấu đã sửa
 async function markRepaired(damageId, contractId) {
     try {
-        const res = await fetch(`${API_URL}/damage-reports/${damageId}/mark-repaired`, { method: 'PATCH' });
+        const res = await apiFetch(`${API_URL}/damage-reports/${damageId}/mark-repaired`, { method: 'PATCH' });
         if (res.ok) {
             showToast('✅ Đã cập nhật trạng thái');
             loadDamages(contractId);
@@ -639,7 +735,7 @@ async function markRepaired(damageId, contractId) {
 async function deleteDamage(damageId, contractId) {
     if (!confirm('Xóa báo cáo này?')) return;
     try {
-        const res = await fetch(`${API_URL}/damage-reports/${damageId}`, { method: 'DELETE' });
+        const res = await apiFetch(`${API_URL}/damage-reports/${damageId}`, { method: 'DELETE' });
         if (res.ok) {
             showToast('✅ Đã xóa báo cáo');
             loadDamages(contractId);
@@ -649,14 +745,58 @@ async function deleteDamage(damageId, contractId) {
     }
 }
 
+// ============================================================
+// 6. CẬP NHẬT REALTIME (SERVER-SENT EVENTS)
+// ============================================================
+function subscribeChanges() {
+    if (!window.EventSource) return;
+
+    // Trình duyệt tự kết nối lại và gửi Last-Event-ID -> server gửi bù sự kiện bị lỡ
+    const source = new EventSource(`${API_URL}/events`);
+    const onContractChanged = (e) => {
+        const msg = JSON.parse(e.data);
+        refreshContract(msg.contract_id);
+        refreshOpenModal(msg.contract_id);
+    };
+
+    source.addEventListener("contract.created", onContractChanged);
+    source.addEventListener("contract.deleted", (e) => {
+        removeContract(JSON.parse(e.data).contract_id);
+        loadProperties();
+    });
+    for (const type of ["payment.added", "payment.edited", "payment.removed"]) {
+        source.addEventListener(type, onContractChanged);
+    }
+    for (const type of ["damage.reported", "damage.updated", "damage.repaired", "damage.removed"]) {
+        source.addEventListener(type, onContractChanged);
+    }
+    for (const type of ["property.created", "property.deleted"]) {
+        source.addEventListener(type, () => loadProperties());
+    }
+    // Lỡ quá nhiều sự kiện, vừa nhập hàng loạt hoặc job quét trạng thái -> tải lại toàn bộ
+    for (const type of ["reset", "import.completed", "status.swept"]) {
+        source.addEventListener(type, () => {
+            loadProperties();
+            loadContracts();
+        });
+    }
+}
+
+// Modal thanh toán đang mở đúng hợp đồng vừa đổi -> làm mới nội dung modal
+function refreshOpenModal(contractId) {
+    const modalElem = document.getElementById("paymentModal");
+    const payContractId = document.getElementById("payContractId");
+    if (!modalElem || !modalElem.classList.contains("show") || !payContractId) return;
+    if (Number(payContractId.value) !== contractId) return;
+
+    const c = contractsById.get(contractId);
+    openPaymentModal(contractId, c ? c.status : "active");
+}
+
 // KHỞI CHẠY
 window.addEventListener('DOMContentLoaded', () => {
     initPaymentModal();
     loadProperties();
     loadContracts();
-    
-    // Refresh dữ liệu mỗi 30 giây
-    setInterval(() => {
-        loadContracts();
-    }, 30000);
+    subscribeChanges();
 });
@@ -0,0 +1,53 @@
+"""Cấu hình chung cho test: chạy app trên 1 file SQLite tạm (hoặc TEST_DATABASE_URL nếu đặt).
+
+DATABASE_URL phải được đặt trước khi import app (database.py tạo engine lúc import).
+Mọi test dùng chung 1 DB trong cả phiên, nên mỗi test tự tạo dữ liệu riêng và chỉ kiểm tra dữ liệu đó.
+"""
+import os
+import tempfile
+from datetime import date, timedelta
+
+import pytest
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{_tmpdir.name}/test.db"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as c:
+        yield c
+    _tmpdir.cleanup()
+
+
+@pytest.fixture(scope="session")
+def days():
+    """days(n): ngày cách hôm nay n ngày, dạng ISO"""
+    return lambda n: (date.today() + timedelta(days=n)).isoformat()
+
+
+@pytest.fixture(scope="session")
+def create_property(client):
+    """Tạo tài sản qua API, trả về JSON của tài sản"""
+    def create(**fields) -> dict:
+        response = client.post("/properties/", json={"name": "Phòng test", "address": "Quận 1", "price": 100, **fields})
+        assert response.status_code == 200, response.text
+        return response.json()
+    return create
+
+
+@pytest.fixture(scope="session")
+def create_contract(client, days):
+    """Tạo hợp đồng qua API (start / end: số ngày tính từ hôm nay), trả về JSON của hợp đồng"""
+    def create(property_id: int, start: int, end: int, **fields) -> dict:
+        response = client.post("/contracts/", json={
+            "property_id": property_id, "tenant_email": "khach@example.com", "deposit": 0,
+            "start_date": days(start), "end_date": days(end), **fields,
+        })
+        assert response.status_code == 200, response.text
+        return response.json()
+    return create
@@ -0,0 +1,28 @@
+"""Tầng DB async: URL driver async cho từng loại DB, endpoint async def chạy được trên cả 2 engine."""
+from app import database
+
+
+def test_async_driver_for_each_backend():
+    url, connect_args = database.to_async_url("sqlite:////tmp/app.db")
+    assert url.drivername == "sqlite+aiosqlite"
+    assert connect_args == {}
+
+    url, connect_args = database.to_async_url("postgresql://u:p@db:5432/rental?sslmode=require")
+    assert url.drivername == "postgresql+asyncpg"
+    # asyncpg không nhận sslmode trong URL -> chuyển sang connect_args
+    assert "sslmode" not in url.query
+    assert connect_args == {"ssl": "require"}
+
+
+def test_async_engine_is_configured(client):
+    # Thiếu driver (asyncpg / aiosqlite) thì async_engine = None và mọi endpoint async đều lỗi
+    assert database.async_engine is not None
+    assert database.async_engine.dialect.is_async
+
+
+def test_async_and_sync_endpoints_share_data(client, create_property, create_contract):
+    prop = create_property(name="Dùng chung 2 engine")                   # async def
+    contract = create_contract(prop["id"], 200, 205)                     # async def
+    assert client.get(f"/contracts/{contract['id']}/download").status_code == 200   # def (engine sync)
+    assert client.delete(f"/contracts/{contract['id']}").status_code == 200        # def
+    assert client.get(f"/contracts/{contract['id']}/summary").status_code == 404   # async def
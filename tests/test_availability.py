@@ -0,0 +1,35 @@
+"""Tìm tài sản còn trống trong khoảng ngày (available_from / available_to)."""
+
+
+def available_ids(client, date_from: str, date_to: str) -> set:
+    response = client.get("/properties/", params={
+        "category": "availability_test", "available_from": date_from, "available_to": date_to, "limit": 1000,
+    })
+    assert response.status_code == 200, response.text
+    return {item["id"] for item in response.json()["items"]}
+
+
+def test_booked_property_is_excluded_only_when_ranges_overlap(client, create_property, create_contract, days):
+    booked = create_property(category="availability_test")["id"]
+    free = create_property(category="availability_test")["id"]
+    create_contract(booked, 10, 15)
+
+    assert available_ids(client, days(12), days(13)) == {free}
+    # Giao nhau ở đúng 1 ngày đầu / cuối vẫn tính là trùng
+    assert available_ids(client, days(15), days(20)) == {free}
+    assert available_ids(client, days(5), days(10)) == {free}
+    assert available_ids(client, days(16), days(20)) == {booked, free}
+
+
+def test_deleted_contract_frees_the_property(client, create_property, create_contract, days):
+    prop = create_property(category="availability_test")["id"]
+    contract = create_contract(prop, 30, 35)
+    assert prop not in available_ids(client, days(31), days(32))
+
+    assert client.delete(f"/contracts/{contract['id']}").status_code == 200
+    assert prop in available_ids(client, days(31), days(32))
+
+
+def test_both_dates_are_required(client, days):
+    assert client.get("/properties/", params={"available_from": days(1)}).status_code == 400
+    assert client.get("/properties/", params={"available_from": days(5), "available_to": days(1)}).status_code == 400
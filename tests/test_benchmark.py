@@ -0,0 +1,55 @@
+"""Bộ đo tải (benchmark/harness.py): chạy lại create_contract ra cùng kết quả, so sánh 2 lần chạy."""
+import json
+import random
+
+from app import rollups
+from app.database import engine
+from benchmark import harness
+
+
+def replay(client, ctx: dict, seed: int, requests: int = 40) -> list:
+    """Mã trạng thái của chuỗi request create_contract sinh từ seed (giống harness.drive, tuần tự)"""
+    rng = random.Random(seed)
+    statuses = []
+    for _ in range(requests):
+        method, url, kwargs = harness.create_contract(rng, ctx)
+        statuses.append(client.request(method, url, **kwargs).status_code)
+    return statuses
+
+
+def test_create_contract_runs_are_repeatable(client, create_property, create_contract):
+    ctx = {"properties": [create_property()["id"] for _ in range(2)]}
+    other = create_contract(ctx["properties"][0], 1000, 1002, tenant_email="khach-that@example.com")
+
+    first = replay(client, ctx, seed=7)
+    assert set(first) == {200, 409}
+    deleted = harness.reset_bench_contracts()
+    assert deleted == first.count(200)
+    assert replay(client, ctx, seed=7) == first
+
+    harness.reset_bench_contracts()
+    assert harness.reset_bench_contracts() == 0
+    remaining = client.get("/contracts/", params={"property_id": ctx["properties"][0]}).json()["items"]
+    assert [c["id"] for c in remaining] == [other["id"]]
+    with engine.connect() as conn:
+        assert rollups.verify(conn) == []
+
+
+def result(throughput: float, p95: float) -> dict:
+    return {"throughput_rps": throughput, "p50_ms": 10, "p95_ms": p95, "p99_ms": 50}
+
+
+def test_compare_counts_regressions(tmp_path, capsys):
+    base, new = tmp_path / "base.json", tmp_path / "new.json"
+    meta = {"commit": "abc", "database": "sqlite"}
+    base.write_text(json.dumps({"meta": meta, "scenarios": {
+        "list_properties": result(100, 20), "create_payment": result(50, 30),
+    }}), encoding="utf-8")
+    new.write_text(json.dumps({"meta": meta, "scenarios": {
+        # throughput giảm 20% và p95 tăng 50%: 2 chỉ số chậm đi; create_payment trong ngưỡng
+        "list_properties": result(80, 30), "create_payment": result(48, 31), "create_contract": result(10, 5),
+    }}), encoding="utf-8")
+
+    assert harness.compare(str(base), str(new), threshold=10) == 2
+    assert "(mới)" in capsys.readouterr().out
+    assert harness.compare(str(base), str(new), threshold=60) == 0
@@ -0,0 +1,80 @@
+"""Xuất hóa đơn từng kỳ (/billing/run): chạy lại không tạo trùng, tổng các kỳ = tổng tiền - cọc."""
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from app import models
+from app.database import SessionLocal
+
+
+def invoices_of(client, contract_id: int, **params) -> list:
+    return client.get("/invoices/", params={"contract_id": contract_id, "limit": 100, **params}).json()["items"]
+
+
+def run_billing(client, as_of: date) -> dict:
+    response = client.post("/billing/run", params={"as_of": as_of.isoformat()})
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.fixture
+def monthly(client, create_property, create_contract):
+    prop = create_property(price=1000)
+    return create_contract(prop["id"], -200, -110, rental_type="monthly", deposit=40)
+
+
+def test_billing_run_is_idempotent(client, monthly):
+    end = date.fromisoformat(monthly["end_date"])
+    first = run_billing(client, end)
+    invoices = invoices_of(client, monthly["id"])
+    assert [i["installment"] for i in invoices] == list(range(1, len(invoices) + 1))
+    assert len(invoices) > 1 and first["invoices_created"] >= len(invoices)
+    assert round(sum(i["amount"] for i in invoices), 2) == monthly["total_price"] - monthly["deposit"]
+
+    assert run_billing(client, end)["invoices_created"] == 0
+
+    # Lần chạy bị ngắt sau INSERT, trước UPDATE next_invoice_date: chạy lại không xuất trùng
+    with SessionLocal() as db:
+        db.execute(update(models.Contract).where(models.Contract.id == monthly["id"])
+                   .values(next_invoice_date=date.fromisoformat(monthly["start_date"])))
+        db.commit()
+    assert run_billing(client, end)["invoices_created"] == 0
+    assert invoices_of(client, monthly["id"]) == invoices
+
+
+def test_unique_installment_per_contract(client, monthly):
+    run_billing(client, date.fromisoformat(monthly["end_date"]))
+    first = invoices_of(client, monthly["id"])[0]
+    with SessionLocal() as db:
+        db.add(models.Invoice(contract_id=monthly["id"], installment=first["installment"],
+                              due_date=date.fromisoformat(first["due_date"]), amount=1, status="open"))
+        with pytest.raises(IntegrityError, match="contract_id|uq_invoices_contract_installment"):
+            db.commit()
+
+
+def test_only_due_installments_are_billed(client, create_property, create_contract, days):
+    contract = create_contract(create_property(price=1000)["id"], 0, 95, rental_type="monthly")
+    start = date.fromisoformat(contract["start_date"])
+    run_billing(client, start)
+    assert [i["installment"] for i in invoices_of(client, contract["id"])] == [1]
+    run_billing(client, start + timedelta(days=40))
+    assert [i["installment"] for i in invoices_of(client, contract["id"])] == [1, 2]
+
+
+def test_paying_every_invoice_settles_the_contract(client, monthly):
+    run_billing(client, date.fromisoformat(monthly["end_date"]))
+    invoices = invoices_of(client, monthly["id"])
+    assert invoices_of(client, monthly["id"], overdue=True) == invoices
+
+    for invoice in invoices:
+        paid = client.post(f"/invoices/{invoice['id']}/pay", json={})
+        assert paid.status_code == 200
+        assert paid.json()["status"] == "paid" and paid.json()["payment_id"]
+    assert client.post(f"/invoices/{invoices[0]['id']}/pay", json={}).status_code == 409
+    assert invoices_of(client, monthly["id"], status="open") == []
+
+    summary = client.get(f"/contracts/{monthly['id']}/summary").json()
+    assert summary["paid"] == monthly["total_price"]
+    assert summary["remaining"] == 0
@@ -0,0 +1,44 @@
+"""Đặt lịch song song: exclusion constraint contracts_no_overlap + lỗi 23P01 -> 409.
+
+Chỉ chạy trên PostgreSQL (TEST_DATABASE_URL=postgresql://...): SQLite không có exclusion
+constraint nên 2 request cùng qua bước kiểm tra vẫn ghi được cả 2.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from threading import Barrier
+
+import pytest
+from sqlalchemy import func, select
+
+from app import models
+from app.database import engine
+
+pytestmark = pytest.mark.skipif(engine.dialect.name != "postgresql", reason="cần PostgreSQL (exclusion constraint)")
+
+ATTEMPTS = 16
+
+
+def test_concurrent_bookings_of_same_range(client):
+    prop = client.post("/properties/", json={"name": "Phòng tranh chấp", "address": "Quận 3", "price": 100}).json()
+    start = date.today() + timedelta(days=700)
+    payload = {
+        "property_id": prop["id"],
+        "start_date": start.isoformat(),
+        "end_date": (start + timedelta(days=5)).isoformat(),
+        "deposit": 10,
+    }
+    barrier = Barrier(ATTEMPTS)
+
+    def book(index: int) -> int:
+        barrier.wait()  # cùng bắt đầu để các request chen nhau giữa bước kiểm tra và INSERT
+        return client.post("/contracts/", json=dict(payload, tenant_email=f"race{index}@example.com")).status_code
+
+    with ThreadPoolExecutor(ATTEMPTS) as pool:
+        statuses = sorted(pool.map(book, range(ATTEMPTS)))
+
+    assert statuses == [200] + [409] * (ATTEMPTS - 1)
+    with engine.connect() as conn:
+        active = conn.execute(select(func.count()).select_from(models.Contract).where(
+            models.Contract.property_id == prop["id"], models.Contract.status == "active"
+        )).scalar_one()
+    assert active == 1
@@ -0,0 +1,69 @@
+"""Nhập hàng loạt: dòng hợp lệ được ghi, dòng lỗi báo theo số dòng."""
+import json
+
+
+def chunks(data: bytes, size: int):
+    """Body upload chia nhỏ (có thể cắt giữa 1 ký tự UTF-8 / 1 dòng)"""
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_csv_properties_report_per_row_errors(client):
+    body = (
+        "name,address,price,category,description\n"
+        "Nhà Bến Nghé,Quận 1,500,real_estate,\"Nhiều dòng\nvẫn là 1 ô\"\n"
+        "Giá sai,Quận 3,không-phải-số,real_estate,\n"
+        ",Quận 5,100,real_estate,\n"
+        "Xe Đà Lạt,Đà Lạt,80,vehicle,\n"
+    ).encode("utf-8")
+    # Chunk 7 byte: nhiều ký tự có dấu bị cắt đôi giữa 2 lần nhận
+    response = client.post("/import/properties", content=chunks(body, 7), headers={"content-type": "text/csv"})
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert (report["total"], report["inserted"], report["failed"]) == (4, 2, 2)
+    assert [error["row"] for error in report["errors"]] == [2, 3]
+    assert "price" in report["errors"][0]["error"]
+
+    found = client.get("/properties/", params={"keyword": "Bến Nghé"}).json()["items"]
+    assert [item["description"] for item in found] == ["Nhiều dòng\nvẫn là 1 ô"]
+
+
+def test_ndjson_payments_report_bad_json_and_unknown_contract(client, create_property, create_contract, days):
+    contract = create_contract(create_property()["id"], -30, -20)
+    lines = [
+        json.dumps({"contract_id": contract["id"], "amount": 10, "payment_date": days(-25)}),
+        "{không phải json",
+        json.dumps({"contract_id": 999999, "amount": 10, "payment_date": days(-25)}),
+        "",
+        json.dumps({"contract_id": contract["id"], "amount": 15, "payment_date": days(-24)}),
+    ]
+    response = client.post(
+        "/import/payments", params={"batch_size": 2},
+        content="\n".join(lines).encode(), headers={"content-type": "application/x-ndjson"},
+    )
+    report = response.json()
+    assert (report["total"], report["inserted"], report["failed"]) == (4, 2, 2)
+    assert [error["row"] for error in report["errors"]] == [2, 3]
+    assert "999999" in report["errors"][1]["error"]
+
+    paid = client.get(f"/contracts/{contract['id']}/summary").json()["paid"]
+    assert paid == 25
+
+
+def test_contract_rows_that_overlap_are_rejected(client, create_property, create_contract, days):
+    prop = create_property()["id"]
+    create_contract(prop, 100, 110)
+    body = "\n".join([
+        "property_id,tenant_email,start_date,end_date,deposit",
+        f"{prop},nhap1@example.com,{days(105)},{days(108)},0",    # trùng hợp đồng có sẵn
+        f"{prop},nhap2@example.com,{days(120)},{days(125)},0",
+        f"{prop},nhap3@example.com,{days(124)},{days(130)},0",    # trùng dòng ngay trên
+        f"{prop},nhap4@example.com,{days(140)},{days(135)},0",    # ngày ngược
+    ])
+    report = client.post("/import/contracts", content=body.encode(), headers={"content-type": "text/csv"}).json()
+    assert (report["inserted"], report["failed"]) == (1, 3)
+    assert [error["row"] for error in report["errors"]] == [1, 3, 4]
+
+
+def test_unknown_kind(client):
+    assert client.post("/import/invoices", content=b"").status_code == 404
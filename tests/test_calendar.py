@@ -0,0 +1,73 @@
+"""Lịch đã đặt của tài sản (/properties/{id}/calendar, /calendars): bitset base64 hoặc khoảng ngày."""
+import base64
+
+import numpy as np
+import pytest
+
+from app import availability
+
+# Cửa sổ 18 ngày [900, 917] tính từ hôm nay
+WINDOW = (900, 917)
+
+
+@pytest.fixture(scope="module")
+def booked(create_property, create_contract):
+    """Tài sản có hợp đồng vắt qua đầu cửa sổ, 2 hợp đồng nối nhau và 1 hợp đồng lẻ"""
+    prop = create_property()
+    for start, end in ((896, 901), (905, 907), (908, 909), (914, 915)):
+        create_contract(prop["id"], start, end)
+    return prop["id"]
+
+
+def window(days, **params) -> dict:
+    return {"date_from": days(WINDOW[0]), "date_to": days(WINDOW[1]), **params}
+
+
+def expected_days() -> list:
+    booked = set(range(896, 902)) | set(range(905, 910)) | set(range(914, 916))
+    return [day in booked for day in range(WINDOW[0], WINDOW[1] + 1)]
+
+
+def test_bitset(client, booked, days):
+    body = client.get(f"/properties/{booked}/calendar", params=window(days)).json()
+    assert body["days"] == 18 and body["format"] == "bitset"
+    [calendar] = body["calendars"]
+    assert "ranges" not in calendar
+    bits = np.unpackbits(np.frombuffer(base64.b64decode(calendar["bitset"]), dtype=np.uint8))
+    assert len(bits) == 24  # 18 bit làm tròn lên 3 byte, phần thừa là 0
+    assert bits[:18].astype(bool).tolist() == expected_days()
+    assert not bits[18:].any()
+    assert calendar["booked_days"] == sum(expected_days())
+
+
+def test_ranges_merge_back_to_back_contracts(client, booked, days):
+    body = client.get(f"/properties/{booked}/calendar", params=window(days, format="ranges")).json()
+    [calendar] = body["calendars"]
+    assert "bitset" not in calendar
+    assert calendar["ranges"] == [[days(900), days(901)], [days(905), days(909)], [days(914), days(915)]]
+
+
+def test_many_properties_in_one_request(client, booked, create_property, days):
+    empty = create_property()["id"]
+    body = client.get("/calendars", params=window(
+        days, property_ids=f"{booked},{empty},999999,{booked}", format="ranges")).json()
+    assert [c["property_id"] for c in body["calendars"]] == [booked, empty, 999999]
+    assert [c["booked_days"] for c in body["calendars"]] == [sum(expected_days()), 0, 0]
+    assert body["calendars"][1]["ranges"] == []
+
+
+def test_default_window_is_a_year_from_today(client, booked):
+    body = client.get(f"/properties/{booked}/calendar").json()
+    assert body["days"] == availability.DEFAULT_CALENDAR_DAYS
+    assert len(base64.b64decode(body["calendars"][0]["bitset"])) == 46
+
+
+def test_invalid_requests(client, booked, days):
+    assert client.get("/properties/999999/calendar").status_code == 404
+    assert client.get(f"/properties/{booked}/calendar",
+                      params={"date_from": days(10), "date_to": days(5)}).status_code == 400
+    assert client.get(f"/properties/{booked}/calendar", params={
+        "date_from": days(0), "date_to": days(availability.MAX_CALENDAR_DAYS)}).status_code == 400
+    assert client.get("/calendars", params={"property_ids": "1,a"}).status_code == 400
+    too_many = ",".join(str(i) for i in range(1, availability.MAX_CALENDAR_PROPERTIES + 2))
+    assert client.get("/calendars", params={"property_ids": too_many}).status_code == 400
@@ -0,0 +1,106 @@
+"""Đặt hợp đồng theo lô: atomic (lỗi 1 mục -> không ghi gì, 424) / partial (ghi mục hợp lệ)."""
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app import main, models
+from app.database import SessionLocal
+
+
+@pytest.fixture
+def props(create_property):
+    return [create_property(name=f"Máy ảnh {i}", category="item")["id"] for i in range(3)]
+
+
+def item(days, property_id: int, start: int, end: int) -> dict:
+    return {"property_id": property_id, "tenant_email": "lo@example.com", "deposit": 0,
+            "start_date": days(start), "end_date": days(end)}
+
+
+def contract_count(client, property_ids) -> int:
+    return sum(len(client.get("/contracts/", params={"property_id": pid}).json()["items"]) for pid in property_ids)
+
+
+def test_atomic_batch_all_or_nothing(client, props, create_contract, days):
+    create_contract(props[1], 600, 605)
+    response = client.post("/contracts/batch", json={"items": [
+        item(days, props[0], 600, 605),
+        item(days, props[1], 603, 604),   # trùng hợp đồng có sẵn
+        item(days, props[2], 600, 605),
+    ]})
+    assert response.status_code == 409
+    body = response.json()
+    assert [r["status_code"] for r in body["items"]] == [424, 409, 424]
+    assert (body["created"], body["failed"]) == (0, 3)
+    assert contract_count(client, [props[0], props[2]]) == 0
+
+    ok = client.post("/contracts/batch", json={"items": [item(days, pid, 610, 612) for pid in props]})
+    assert ok.status_code == 200
+    assert ok.json()["created"] == 3
+    assert [r["contract"]["property_id"] for r in ok.json()["items"]] == props
+
+
+def test_partial_batch_reports_each_item(client, props, create_contract, days):
+    create_contract(props[1], 620, 625)
+    response = client.post("/contracts/batch", json={"mode": "partial", "items": [
+        item(days, props[0], 620, 622),
+        item(days, props[1], 621, 623),   # trùng hợp đồng có sẵn
+        item(days, props[2], 625, 620),   # ngày ngược
+        item(days, 999999, 620, 622),     # tài sản không tồn tại
+        item(days, props[0], 622, 624),   # trùng mục #0 trong cùng lô
+        item(days, props[2], 620, 622),
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert [r["status_code"] for r in body["items"]] == [200, 409, 400, 404, 409, 200]
+    assert "#0" in body["items"][4]["error"]
+    assert (body["created"], body["failed"]) == (2, 4)
+    assert contract_count(client, [props[0], props[2]]) == 2
+
+
+def race(monkeypatch, competitor: dict):
+    """Lần gọi book_contracts đầu tiên: request khác chen vào đặt `competitor` rồi constraint báo trùng
+    (giống PostgreSQL khi 2 transaction cùng qua bước kiểm tra)"""
+    real, calls = main.book_contracts, []
+
+    async def book_contracts(db, items, atomic):
+        calls.append(atomic)
+        if len(calls) == 1:
+            with SessionLocal() as other:
+                other.add(models.Contract(status="active", total_price=0, deposit=0, tenant_id=main._owner_id,
+                                          **competitor))
+                other.commit()
+            raise IntegrityError("INSERT INTO contracts", {}, Exception(f"violates {main.BOOKING_CONSTRAINT}"))
+        return await real(db, items, atomic)
+
+    monkeypatch.setattr(main, "book_contracts", book_contracts)
+    return calls
+
+
+def test_partial_batch_retries_after_a_concurrent_booking(client, props, days, monkeypatch):
+    start = date.fromisoformat(days(640))
+    calls = race(monkeypatch, {"property_id": props[1], "start_date": start, "end_date": start + timedelta(days=2)})
+    response = client.post("/contracts/batch", json={"mode": "partial", "items": [
+        item(days, props[0], 640, 642), item(days, props[1], 640, 642),
+    ]})
+    assert response.status_code == 200
+    assert [r["status_code"] for r in response.json()["items"]] == [200, 409]
+    assert len(calls) == 2
+
+
+def test_atomic_batch_conflict_is_409(client, props, days, monkeypatch):
+    start = date.fromisoformat(days(650))
+    calls = race(monkeypatch, {"property_id": props[1], "start_date": start, "end_date": start + timedelta(days=2)})
+    response = client.post("/contracts/batch", json={"items": [
+        item(days, props[0], 650, 652), item(days, props[1], 650, 652),
+    ]})
+    assert response.status_code == 409
+    assert len(calls) == 1
+    assert contract_count(client, [props[0]]) == 0
+
+
+def test_batch_size_is_limited(client, props, days):
+    items = [item(days, props[0], 700 + i * 3, 701 + i * 3) for i in range(201)]
+    assert client.post("/contracts/batch", json={"items": items}).status_code == 422
+    assert client.post("/contracts/batch", json={"items": []}).status_code == 422
@@ -0,0 +1,34 @@
+"""Số liệu thanh toán của hợp đồng tính bằng SQL (/contracts/summary, /contracts/{id}/summary)."""
+
+
+def test_summary_aggregates_payments_and_damages(client, create_property, create_contract, days):
+    prop = create_property(price=100)
+    contract = create_contract(prop["id"], -20, -11, deposit=30)
+    for amount in (50, 20):
+        client.post("/payments/", json={"contract_id": contract["id"], "amount": amount, "payment_date": days(-15)})
+    for cost in (15, 5):
+        client.post("/damage-reports/", json={
+            "contract_id": contract["id"], "property_id": prop["id"], "description": "Vỡ kính",
+            "repair_cost": cost, "reported_date": days(-12),
+        })
+
+    summary = client.get(f"/contracts/{contract['id']}/summary").json()
+    # Tiền cọc được ghi thành 1 thanh toán lúc tạo hợp đồng
+    assert summary["paid"] == 100
+    assert summary["payment_count"] == 3
+    assert summary["damage_total"] == 20
+    assert summary["remaining"] == contract["total_price"] - 100
+
+    listed = client.get("/contracts/summary", params={"property_id": prop["id"]}).json()["items"]
+    assert listed == [summary]
+
+
+def test_contract_without_payments(client, create_property, create_contract):
+    contract = create_contract(create_property()["id"], -5, -3)
+    summary = client.get(f"/contracts/{contract['id']}/summary").json()
+    assert (summary["paid"], summary["payment_count"], summary["damage_total"]) == (0, 0, 0)
+    assert summary["remaining"] == contract["total_price"]
+
+
+def test_unknown_contract(client):
+    assert client.get("/contracts/999999/summary").status_code == 404
@@ -0,0 +1,27 @@
+"""Văn bản hợp đồng: ETag theo nội dung, 304 khi không đổi, đổi dữ liệu thì đổi phiên bản."""
+
+
+def test_download_etag_follows_content(client, create_property, create_contract, days):
+    contract = create_contract(create_property(name="Căn hộ Thảo Điền")["id"], -10, -5, tenant_email="vanban@example.com")
+    path = f"/contracts/{contract['id']}/download"
+
+    first = client.get(path)
+    assert first.status_code == 200
+    assert first.headers["content-type"].startswith("text/html")
+    assert "Căn hộ Thảo Điền" in first.text
+    etag = first.headers["etag"]
+
+    assert client.get(path).headers["etag"] == etag
+    cached = client.get(path, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    client.post("/payments/", json={"contract_id": contract["id"], "amount": 12345, "payment_date": days(-7)})
+    changed = client.get(path, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert "12,345" in changed.text
+
+
+def test_unknown_contract(client):
+    assert client.get("/contracts/999999/download").status_code == 404
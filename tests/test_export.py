@@ -0,0 +1,56 @@
+"""Xuất dữ liệu dạng stream: CSV / NDJSON / gzip, lọc theo ngày."""
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def export_day(client, create_property, create_contract, days):
+    """1 ngày riêng chỉ có 3 thanh toán của module này"""
+    contract = create_contract(create_property()["id"], -3010, -3000)
+    for amount, note in ((10, "tiền mặt"), (20, 'có "ngoặc", dấu phẩy'), (30, None)):
+        client.post("/payments/", json={
+            "contract_id": contract["id"], "amount": amount, "payment_date": days(-3005), "note": note,
+        })
+    return days(-3005)
+
+
+def export(client, export_day, **params):
+    response = client.get("/export/payments", params={"date_from": export_day, "date_to": export_day, **params})
+    assert response.status_code == 200, response.text
+    return response
+
+
+def test_csv(client, export_day):
+    response = export(client, export_day)
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(float(row["amount"]), row["note"]) for row in rows] == [
+        (10, "tiền mặt"), (20, 'có "ngoặc", dấu phẩy'), (30, ""),
+    ]
+
+
+def test_ndjson(client, export_day):
+    rows = [json.loads(line) for line in export(client, export_day, format="ndjson").text.splitlines()]
+    assert [row["amount"] for row in rows] == [10, 20, 30]
+    assert {row["payment_date"] for row in rows} == {export_day}
+
+
+def test_gzip(client, export_day):
+    response = export(client, export_day, format="ndjson", gzip="true")
+    assert response.headers["content-disposition"].endswith('.ndjson.gz"')
+    lines = gzip.decompress(response.content).decode("utf-8").splitlines()
+    assert len(lines) == 3
+
+
+def test_empty_range_still_has_header(client):
+    response = client.get("/export/payments", params={"date_from": "1990-01-01", "date_to": "1990-01-02"})
+    assert response.text.splitlines() == ["id,contract_id,amount,payment_date,note,is_paid"]
+
+
+def test_unknown_kind(client):
+    assert client.get("/export/users").status_code == 404
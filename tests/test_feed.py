@@ -0,0 +1,94 @@
+"""Change feed: sự kiện commit ngược thứ tự id vẫn tới client, đọc bù không query liên tục."""
+import asyncio
+
+import pytest
+
+from app import feed
+
+
+def run(scenario, timeout: float = 5):
+    """Chạy kịch bản async; quá thời gian (VD: vòng lặp không bao giờ chờ) thì báo lỗi thay vì treo"""
+    return asyncio.run(asyncio.wait_for(scenario, timeout))
+
+
+def message(event_id: int) -> dict:
+    return {"id": event_id, "type": "test", "entity_id": None, "contract_id": None, "data": {}}
+
+
+@pytest.fixture
+def change_feed(monkeypatch):
+    """ChangeFeed không có vòng đọc DB: test tự đưa sự kiện vào bằng _receive()"""
+    monkeypatch.setattr(feed, "oldest_and_latest_id", lambda: (1, 0))
+    instance = feed.ChangeFeed()
+    instance._pump = lambda: asyncio.sleep(3600)
+    return instance
+
+
+def receive(change_feed, *ids: int):
+    change_feed._receive([message(event_id) for event_id in ids])
+    change_feed._new_data.set()
+    change_feed._new_data = asyncio.Event()
+
+
+def test_skipped_ids_are_tracked_until_they_arrive(change_feed):
+    change_feed._receive([message(1), message(2), message(5)])
+    assert change_feed.last_id == 5
+    assert list(change_feed._gaps) == [3, 4]
+
+    change_feed._receive([message(4)])
+    assert list(change_feed._gaps) == [3]
+    assert [m["id"] for _, m in change_feed.buffer] == [1, 2, 5, 4]
+
+
+def test_gaps_expire(change_feed, monkeypatch):
+    monkeypatch.setattr(feed, "GAP_SECONDS", -1)
+    change_feed._receive([message(1), message(5)])
+    assert not change_feed._gaps
+
+
+def test_live_subscriber_gets_late_events(change_feed):
+    async def scenario():
+        await change_feed.start()
+        events = change_feed.subscribe(None)
+        waiting = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0)
+        receive(change_feed, 1, 3)
+        got = [(await waiting)["id"], (await events.__anext__())["id"]]
+        receive(change_feed, 2)  # transaction id 2 commit sau id 3
+        got.append((await events.__anext__())["id"])
+        await change_feed.stop()
+        return got
+
+    assert run(scenario()) == [1, 3, 2]
+
+
+def test_empty_catch_up_waits_instead_of_polling(change_feed, monkeypatch):
+    calls = []
+
+    def load_events_after(since, limit=feed.CATCH_UP_BATCH, gaps=()):
+        calls.append(since)
+        return []  # sự kiện sau `since` đã bị dọn / rollback
+
+    monkeypatch.setattr(feed, "load_events_after", load_events_after)
+    monkeypatch.setattr(feed, "KEEPALIVE_SECONDS", 0.05)
+    monkeypatch.setattr(feed, "oldest_and_latest_id", lambda: (1, 50))
+
+    async def scenario():
+        await change_feed.start()
+        events = change_feed.subscribe(10)
+        assert await events.__anext__() is None  # keepalive, không quay vòng đọc DB
+        receive(change_feed, 51)
+        received = await events.__anext__()
+        await change_feed.stop()
+        return received
+
+    assert run(scenario())["id"] == 51
+    assert calls == [10]
+
+
+def test_catch_up_query_includes_gaps(client, create_property):
+    create_property()
+    create_property()
+    _, latest = feed.oldest_and_latest_id()
+    ids = [m["id"] for m in feed.load_events_after(latest, gaps=[latest - 1])]
+    assert ids == [latest - 1]
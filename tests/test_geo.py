@@ -0,0 +1,81 @@
+"""Tìm tài sản quanh 1 điểm / trong khung bản đồ, geocode địa chỉ Việt Nam."""
+import pytest
+
+from app import geo
+
+# Vùng không có dữ liệu của các test khác
+CENTER = (12.5, 104.0)
+
+
+def at(north_km: float, east_km: float = 0.0) -> dict:
+    """Tọa độ cách CENTER một số km về phía bắc / đông"""
+    return {"latitude": CENTER[0] + north_km / 111.2, "longitude": CENTER[1] + east_km / 108.6}
+
+
+@pytest.fixture(scope="module")
+def nearby(create_property):
+    return {
+        km: create_property(name=f"Cách {km} km", address="Không rõ", **at(km))["id"]
+        for km in (2.0, 0.5, 4.5, 1.0, 30.0)
+    }
+
+
+def near(client, **params) -> list:
+    response = client.get("/properties/", params={"near_lat": CENTER[0], "near_lng": CENTER[1], **params})
+    assert response.status_code == 200, response.text
+    return response.json()["items"]
+
+
+def test_nearest_first_within_radius(client, nearby):
+    items = near(client, radius_km=5)
+    assert [item["id"] for item in items] == [nearby[km] for km in (0.5, 1.0, 2.0, 4.5)]
+    assert [round(item["distance_km"], 1) for item in items] == [0.5, 1.0, 2.0, 4.5]
+    assert [item["id"] for item in near(client, radius_km=1.5)] == [nearby[0.5], nearby[1.0]]
+
+
+def test_candidates_are_ordered_before_the_limit(client, nearby, monkeypatch):
+    # Vùng dày đặc: chỉ lấy 2 ứng viên từ DB, phải là 2 điểm gần nhất chứ không phải 2 id nhỏ nhất
+    monkeypatch.setattr(geo, "MAX_CANDIDATES", 2)
+    assert [item["id"] for item in near(client, radius_km=5)] == [nearby[0.5], nearby[1.0]]
+
+
+def test_bbox(client, nearby):
+    south, west = at(0.7, -1)["latitude"], at(0, -1)["longitude"]
+    north, east = at(2.5, 1)["latitude"], at(0, 1)["longitude"]
+    response = client.get("/properties/", params={"bbox": f"{south},{west},{north},{east}"}).json()
+    assert {item["id"] for item in response["items"]} == {nearby[1.0], nearby[2.0]}
+    assert response["next_cursor"] is None
+
+
+@pytest.mark.parametrize("params", [
+    {"near_lat": 10.0},
+    {"bbox": "1,2,3"},
+    {"bbox": "10,100,5,90"},
+    {"near_lat": 10, "near_lng": 100, "radius_km": 500},
+])
+def test_invalid_geo_parameters(client, params):
+    assert client.get("/properties/", params=params).status_code in (400, 422)
+
+
+@pytest.mark.parametrize("address, place", [
+    ("Quận 1, TP HCM", "quan 1"),
+    ("12 Nguyễn Huệ, Phường Bến Nghé, Quận 1, TP.HCM", "quan 1"),  # "Huệ" trong tên đường không phải Huế
+    ("45 Lê Lợi, Thành phố Huế", "hue"),
+    ("Thôn 3, Tỉnh Đà Lạt", "da lat"),
+    ("Hẻm 5, tphcm", "ho chi minh"),
+    ("Hà Nội", "ha noi"),
+])
+def test_local_geocoder(address, place):
+    assert geo.LocalGeocoder().geocode(address) == geo.LocalGeocoder.PLACES[place]
+
+
+def test_unknown_address_is_not_geocoded():
+    assert geo.LocalGeocoder().geocode("123 Main Street, Springfield") is None
+
+
+def test_properties_are_geocoded_on_create(client, create_property):
+    prop = create_property(address="7 Trần Phú, Nha Trang, Khánh Hòa")
+    assert (prop["latitude"], prop["longitude"]) == geo.LocalGeocoder.PLACES["nha trang"]
+    # Đã nhập tọa độ thì giữ nguyên, không geocode
+    explicit = create_property(address="Nha Trang", latitude=-33.9, longitude=18.4)
+    assert (explicit["latitude"], explicit["longitude"]) == (-33.9, 18.4)
@@ -0,0 +1,64 @@
+"""Công suất cho thuê (/analytics/occupancy): số ngày thuê / trống, doanh thu, chuỗi theo ngày / tháng."""
+from datetime import date
+
+import pytest
+
+from app import occupancy
+
+CATEGORY = "occupancy-test"
+
+
+@pytest.fixture(scope="module")
+def window(create_property, create_contract, days):
+    """2 tài sản giá 10/ngày trong khoảng 10 ngày [800, 809]"""
+    first, second = (create_property(price=10, category=CATEGORY) for _ in range(2))
+    create_contract(first["id"], 798, 802)    # 40 cho 5 ngày (tính cả 2 đầu), 3 ngày trong khoảng
+    create_contract(second["id"], 805, 806)   # 10 cho 2 ngày, nằm trọn trong khoảng
+    return first["id"], second["id"], {"date_from": days(800), "date_to": days(809), "category": CATEGORY}
+
+
+def report(client, **params) -> dict:
+    response = client.get("/analytics/occupancy", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_totals_and_groups(client, window):
+    first, second, params = window
+    body = report(client, **params)
+    assert body["days"] == 10
+    totals = body["totals"]
+    assert (totals["properties"], totals["available_days"], totals["occupied_days"], totals["idle_days"]) == (2, 20, 5, 15)
+    assert totals["occupancy_rate"] == 0.25
+    assert totals["revenue"] == 34
+    assert totals["revenue_per_available_day"] == 1.7
+
+    groups = {g["key"]: g for g in body["groups"]}
+    assert (groups[str(first)]["occupied_days"], groups[str(first)]["revenue"]) == (3, 24)
+    assert (groups[str(second)]["occupied_days"], groups[str(second)]["revenue"]) == (2, 10)
+
+    [by_category] = report(client, group_by="category", **params)["groups"]
+    assert by_category["key"] == CATEGORY and by_category["occupied_days"] == 5
+
+
+def test_daily_series(client, window):
+    _, _, params = window
+    series = report(client, interval="day", **params)["series"]
+    assert len(series) == 10
+    assert [s["occupied_days"] for s in series] == [1, 1, 1, 0, 0, 1, 1, 0, 0, 0]
+    assert sum(s["revenue"] for s in series) == pytest.approx(34)
+
+
+def test_monthly_series_splits_at_month_start():
+    # 1 hợp đồng 4 ngày (40) vắt qua cuối tháng: mỗi tháng 2 ngày, 20
+    result = occupancy.compute(date(2026, 1, 30), date(2026, 2, 2), [1], ["x"], [(1, 0, 3, 40.0)])
+    assert [(s["period"], s["occupied_days"], s["revenue"]) for s in result["series"]] == [
+        ("2026-01", 2, 20), ("2026-02", 2, 20),
+    ]
+    assert result["totals"]["occupancy_rate"] == 1
+
+
+def test_window_validation(client, days):
+    assert client.get("/analytics/occupancy", params={"date_from": days(10), "date_to": days(5)}).status_code == 400
+    too_long = {"date_from": days(0), "date_to": days(occupancy.MAX_HORIZON_DAYS)}
+    assert client.get("/analytics/occupancy", params=too_long).status_code == 400
@@ -0,0 +1,54 @@
+"""Phân trang keyset: mọi danh sách trả về Page{items, next_cursor}."""
+import pytest
+
+
+def collect(client, path: str, **params) -> list:
+    """Đi hết các trang theo next_cursor, trả về danh sách id theo thứ tự nhận"""
+    ids, cursor = [], None
+    while True:
+        response = client.get(path, params=dict(params, **({"cursor": cursor} if cursor else {})))
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert set(page) == {"items", "next_cursor"}
+        assert len(page["items"]) <= params["limit"]
+        ids += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def test_properties_are_paged_by_id(client, create_property):
+    created = [create_property(name=f"Trang {i}", category="page_test")["id"] for i in range(5)]
+
+    first = client.get("/properties/", params={"category": "page_test", "limit": 2}).json()
+    assert [item["id"] for item in first["items"]] == created[:2]
+    assert first["next_cursor"]
+
+    assert collect(client, "/properties/", category="page_test", limit=2) == created
+    # Vừa đủ 1 trang: không có trang sau
+    assert client.get("/properties/", params={"category": "page_test", "limit": 5}).json()["next_cursor"] is None
+
+
+def test_payments_are_paged_with_date_filter(client, create_property, create_contract, days):
+    contract = create_contract(create_property()["id"], -100, -90)
+    for offset in (-99, -98, -97, -80):
+        client.post("/payments/", json={"contract_id": contract["id"], "amount": 10, "payment_date": days(offset)})
+
+    path = f"/contracts/{contract['id']}/payments"
+    assert len(collect(client, path, limit=1)) == 4
+    assert len(collect(client, path, limit=2, date_from=days(-98), date_to=days(-90))) == 2
+
+
+def test_contract_summaries_are_paged(client, create_property, create_contract):
+    prop = create_property()
+    contracts = [create_contract(prop["id"], start, start + 2)["id"] for start in (-60, -50, -40)]
+    assert collect(client, "/contracts/summary", property_id=prop["id"], limit=2) == contracts
+
+
+@pytest.mark.parametrize("params, status", [
+    ({"cursor": "không-phải-cursor"}, 400),
+    ({"limit": 0}, 422),
+    ({"limit": 100000}, 422),
+])
+def test_invalid_paging_parameters(client, params, status):
+    assert client.get("/properties/", params=params).status_code == status
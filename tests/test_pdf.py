@@ -0,0 +1,59 @@
+"""PDF hợp đồng: cache trên đĩa theo phiên bản nội dung, tải ZIP nhiều hợp đồng.
+
+PDF được ghi sẵn vào cache nên test không cần render thật (weasyprint + thư viện hệ thống).
+"""
+import io
+import zipfile
+
+import pytest
+
+from app import pdf
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf, "PDF_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(pdf, "is_available", lambda: True)
+    return tmp_path
+
+
+def cache_pdf(client, contract_id: int) -> bytes:
+    """Ghi PDF giả vào cache cho phiên bản hiện tại của hợp đồng (ETag của /download)"""
+    version = client.get(f"/contracts/{contract_id}/download").headers["etag"].strip('"')
+    content = f"%PDF-1.4 hợp đồng {contract_id}".encode()
+    pdf.write_cached(version, content)
+    return content
+
+
+def test_pdf_is_served_from_cache(client, cache_dir, create_property, create_contract):
+    contract = create_contract(create_property()["id"], -40, -35)
+    content = cache_pdf(client, contract["id"])
+
+    response = client.get(f"/contracts/{contract['id']}/pdf")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.content == content
+
+    cached = client.get(f"/contracts/{contract['id']}/pdf", headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+
+
+def test_zip_contains_one_pdf_per_contract(client, cache_dir, create_property, create_contract):
+    prop = create_property()["id"]
+    contracts = [create_contract(prop, start, start + 2)["id"] for start in (-60, -55)]
+    expected = {f"HD-{cid:04d}.pdf": cache_pdf(client, cid) for cid in contracts}
+
+    response = client.post("/contracts/pdf-zip", json={"contract_ids": contracts})
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert {name: archive.read(name) for name in archive.namelist()} == expected
+
+
+def test_zip_without_matches(client, cache_dir):
+    assert client.post("/contracts/pdf-zip", json={"contract_ids": [999999]}).status_code == 404
+
+
+def test_pdf_needs_weasyprint(client, monkeypatch, create_property, create_contract):
+    monkeypatch.setattr(pdf, "is_available", lambda: False)
+    contract = create_contract(create_property()["id"], -70, -65)
+    assert client.get(f"/contracts/{contract['id']}/pdf").status_code == 501
@@ -0,0 +1,36 @@
+"""Pool kết nối: thống kê /health/pool, định tuyến đọc replica / primary (X-Write-Token)."""
+import time
+
+from app import database
+
+
+def test_pool_stats_count_checkouts(client):
+    before = client.get("/health/pool").json()
+    assert {"primary", "primary_async"} <= set(before)
+    assert {"size", "checked_out", "overflow", "checkouts", "timeouts", "wait_avg_ms"} <= set(before["primary"])
+
+    client.get("/contracts/999999/download")  # endpoint sync -> lấy 1 kết nối từ pool primary
+    after = client.get("/health/pool").json()
+    assert after["primary"]["checkouts"] > before["primary"]["checkouts"]
+
+
+def test_writes_return_a_token_reads_do_not(client):
+    response = client.post("/properties/", json={"name": "Token", "address": "Quận 7", "price": 1})
+    assert response.headers["x-write-token"].isdigit()
+    assert "x-write-token" not in client.get("/properties/", params={"limit": 1}).headers
+    # Request ghi bị lỗi không trả token
+    assert "x-write-token" not in client.post("/contracts/", json={}).headers
+
+
+class FakeRequest:
+    def __init__(self, token: str):
+        self.headers = {"x-read-your-writes": token} if token is not None else {}
+
+
+def test_recent_write_token_reads_from_primary():
+    fresh = database.write_token()
+    stale = str(int((time.time() - database.READ_YOUR_WRITES_SECONDS - 1) * 1000))
+    assert database.wants_primary(FakeRequest(fresh))
+    assert not database.wants_primary(FakeRequest(stale))
+    assert not database.wants_primary(FakeRequest("abc"))
+    assert not database.wants_primary(FakeRequest(None))
@@ -0,0 +1,91 @@
+"""Quy tắc giá theo phạm vi (tài sản > danh mục > toàn hệ thống) và /quotes khớp giá hợp đồng."""
+import pytest
+
+from app import pricing
+
+
+@pytest.fixture
+def add_rule(client):
+    """Tạo quy tắc giá qua API; xóa hết sau test (quy tắc toàn hệ thống ảnh hưởng mọi test khác)"""
+    created = []
+
+    def add(**fields) -> dict:
+        response = client.post("/pricing-rules/", json=fields)
+        assert response.status_code == 200, response.text
+        created.append(response.json()["id"])
+        return response.json()
+
+    yield add
+    for rule_id in created:
+        client.delete(f"/pricing-rules/{rule_id}")
+
+
+def quote(client, *items) -> list:
+    response = client.post("/quotes", json={"items": list(items)})
+    assert response.status_code == 200
+    return response.json()["items"]
+
+
+def test_most_specific_scope_wins_per_kind(client, create_property, add_rule, days):
+    own, same_category, other = (create_property(price=100, category=category)
+                                 for category in ("pricing-a", "pricing-a", "pricing-b"))
+    add_rule(kind="weekly", factor=0.5)
+    add_rule(kind="weekly", factor=0.8, category="pricing-a")
+    add_rule(kind="weekly", factor=0.9, property_id=own["id"])
+    add_rule(kind="long_stay", factor=0.5, min_days=10, category="pricing-a")
+
+    # 14 đêm x 100: giá tuần của phạm vi cụ thể nhất, giảm giá thuê dài lấy của danh mục
+    stay = {"start_date": days(300), "end_date": days(314)}
+    totals = [r["total_price"] for r in quote(client, *({"property_id": p["id"], **stay}
+                                                        for p in (own, same_category, other)))]
+    assert totals == [630, 560, 700]
+
+
+def test_quote_matches_created_contract(client, create_property, create_contract, add_rule, days):
+    prop = create_property(price=80, category="pricing-c")
+    add_rule(kind="weekend", factor=1.5, category="pricing-c")
+    add_rule(kind="season", factor=2, property_id=prop["id"], start_date=days(320), end_date=days(322))
+
+    for rental_type, start, end in (("daily", 318, 327), ("monthly", 330, 400)):
+        [quoted] = quote(client, {"property_id": prop["id"], "start_date": days(start),
+                                  "end_date": days(end), "rental_type": rental_type})
+        contract = create_contract(prop["id"], start, end, rental_type=rental_type)
+        assert quoted["error"] is None
+        assert quoted["total_price"] == contract["total_price"]
+        if rental_type == "daily":
+            # Có đêm cuối tuần và mùa: đắt hơn giá gốc 9 đêm x 80
+            assert quoted["total_price"] > 9 * 80
+
+
+def test_quote_errors_are_per_item(client, create_property, days):
+    prop = create_property(price=50)
+    results = quote(
+        client,
+        {"property_id": prop["id"], "start_date": days(340), "end_date": days(342)},
+        {"property_id": 999999, "start_date": days(340), "end_date": days(342)},
+        {"property_id": prop["id"], "start_date": days(342), "end_date": days(340)},
+    )
+    assert [r["total_price"] for r in results] == [100, None, None]
+    assert "999999" in results[1]["error"] and results[2]["error"]
+
+
+def test_rule_validation(client, create_property, days):
+    prop = create_property()
+    assert client.post("/pricing-rules/", json={
+        "kind": "weekly", "factor": 0.9, "property_id": prop["id"], "category": "x"}).status_code == 400
+    assert client.post("/pricing-rules/", json={"kind": "season", "factor": 2}).status_code == 400
+    assert client.post("/pricing-rules/", json={"kind": "long_stay", "factor": 0.9}).status_code == 400
+    assert client.post("/pricing-rules/", json={
+        "kind": "weekly", "factor": 0.9, "property_id": 999999}).status_code == 404
+    assert client.post("/pricing-rules/", json={"kind": "weekly", "factor": 0}).status_code == 422
+
+
+def test_rule_changes_invalidate_the_cache(client, create_property, add_rule, days):
+    prop = create_property(price=100, category="pricing-d")
+    item = {"property_id": prop["id"], "start_date": days(350), "end_date": days(357)}
+    assert quote(client, item)[0]["total_price"] == 700
+    assert pricing.cached_rules() is not None
+    rule = add_rule(kind="weekly", factor=0.5, category="pricing-d")
+    assert quote(client, item)[0]["total_price"] == 350
+    assert client.delete(f"/pricing-rules/{rule['id']}").status_code == 200
+    assert quote(client, item)[0]["total_price"] == 700
@@ -0,0 +1,67 @@
+"""Giữ số query của các endpoint đã tối ưu (N+1, tra cứu thừa) không tăng trở lại.
+
+Dữ liệu có nhiều hợp đồng / thanh toán: số query phải cố định, không tăng theo số dòng.
+"""
+import pytest
+
+from app.profiling import assert_max_queries
+
+CONTRACTS = 5
+
+
+@pytest.fixture(scope="module")
+def contract_ids(client, days):
+    ids = []
+    for i in range(CONTRACTS):
+        prop = client.post("/properties/", json={"name": f"Phòng {i}", "address": "Quận 1", "price": 100})
+        assert prop.status_code == 200, prop.text
+        contract = client.post("/contracts/", json={
+            "property_id": prop.json()["id"],
+            "tenant_email": f"tenant{i}@example.com",
+            "start_date": days(-900 + 20 * i),
+            "end_date": days(-890 + 20 * i),
+            "deposit": 10,
+        })
+        assert contract.status_code == 200, contract.text
+        ids.append(contract.json()["id"])
+        client.post("/payments/", json={"contract_id": ids[-1], "amount": 50, "payment_date": days(-895 + 20 * i)})
+    return ids
+
+
+def test_contract_summary_list(client, contract_ids):
+    with assert_max_queries(2):
+        response = client.get("/contracts/summary")
+    assert response.status_code == 200
+    assert len(response.json()["items"]) >= CONTRACTS
+
+
+def test_download_contract(client, contract_ids):
+    with assert_max_queries(1):
+        response = client.get(f"/contracts/{contract_ids[0]}/download")
+    assert response.status_code == 200
+
+
+def test_create_payment(client, contract_ids, days):
+    with assert_max_queries(5):
+        response = client.post("/payments/", json={
+            "contract_id": contract_ids[1], "amount": 20, "payment_date": days(-870),
+        })
+    assert response.status_code == 200, response.text
+
+
+def test_update_payment(client, contract_ids, days):
+    payment = client.post("/payments/", json={
+        "contract_id": contract_ids[2], "amount": 20, "payment_date": days(-850),
+    }).json()
+    with assert_max_queries(6):
+        response = client.put(f"/payments/{payment['id']}", json={
+            "contract_id": contract_ids[2], "amount": 30, "payment_date": days(-850),
+        })
+    assert response.status_code == 200
+    assert response.json()["amount"] == 30
+
+
+def test_assert_max_queries_reports_overrun(client, contract_ids):
+    with pytest.raises(AssertionError, match="Vượt 0 query"):
+        with assert_max_queries(0):
+            client.get(f"/contracts/{contract_ids[0]}/download")
@@ -0,0 +1,92 @@
+"""Rollup doanh thu cộng dồn luôn khớp dữ liệu gốc sau mọi đường ghi / xóa."""
+import pytest
+
+from app import models, rollups
+from app.database import engine
+
+ROLLUPS = models.RevenueRollup.__table__
+
+
+def assert_rollups_match():
+    with engine.connect() as conn:
+        assert rollups.verify(conn) == []
+
+
+def property_stats(client, property_id: int) -> dict:
+    return client.get("/stats", params={"property_id": property_id}).json()["totals"]
+
+
+@pytest.fixture
+def contract(client, create_property, create_contract, days):
+    prop = create_property(price=100)
+    contract = create_contract(prop["id"], -40, -31, deposit=200)
+    client.post("/payments/", json={"contract_id": contract["id"], "amount": 300, "payment_date": days(-35)})
+    client.post("/damage-reports/", json={
+        "contract_id": contract["id"], "property_id": prop["id"], "description": "Hỏng khóa",
+        "repair_cost": 50, "reported_date": days(-33),
+    })
+    return contract
+
+
+def test_stats_follow_writes(client, contract):
+    assert_rollups_match()
+    totals = property_stats(client, contract["property_id"])
+    assert totals["revenue"] == 500
+    assert totals["deposits"] == 200
+    assert totals["contract_value"] == contract["total_price"]
+    assert totals["outstanding"] == contract["total_price"] - 500
+    assert totals["damage_cost"] == 50
+
+
+def test_payment_edit_and_delete(client, contract, days):
+    payment = client.get(f"/contracts/{contract['id']}/payments").json()["items"][-1]
+    # Đổi số tiền và chuyển sang tháng khác
+    client.put(f"/payments/{payment['id']}", json={
+        "contract_id": contract["id"], "amount": 120, "payment_date": days(-400),
+    })
+    assert_rollups_match()
+    assert property_stats(client, contract["property_id"])["revenue"] == 320
+
+    assert client.delete(f"/payments/{payment['id']}").status_code == 200
+    assert_rollups_match()
+    assert property_stats(client, contract["property_id"])["revenue"] == 200
+
+
+def test_damage_update_and_delete(client, contract, days):
+    damage = client.get(f"/contracts/{contract['id']}/damages").json()["items"][0]
+    client.put(f"/damage-reports/{damage['id']}", json={
+        "contract_id": contract["id"], "property_id": contract["property_id"], "description": "Hỏng khóa",
+        "repair_cost": 80, "reported_date": days(-33),
+    })
+    client.patch(f"/damage-reports/{damage['id']}/mark-repaired")
+    assert_rollups_match()
+    assert property_stats(client, contract["property_id"])["damage_cost"] == 80
+
+    assert client.delete(f"/damage-reports/{damage['id']}").status_code == 200
+    assert_rollups_match()
+    assert property_stats(client, contract["property_id"])["damage_cost"] == 0
+
+
+def test_contract_then_property_delete(client, contract):
+    damage = client.get(f"/contracts/{contract['id']}/damages").json()["items"][0]
+    client.delete(f"/damage-reports/{damage['id']}")
+    assert client.delete(f"/contracts/{contract['id']}").status_code == 200
+    assert_rollups_match()
+    assert property_stats(client, contract["property_id"]) == {
+        "revenue": 0, "contract_value": 0, "outstanding": 0, "deposits": 0, "damage_cost": 0,
+    }
+
+    # Dòng rollup (toàn 0) của tài sản bị xóa theo
+    assert client.delete(f"/properties/{contract['property_id']}").status_code == 200
+    assert_rollups_match()
+
+
+def test_rebuild_reproduces_incremental_rollups(client, contract):
+    with engine.connect() as conn:
+        before = conn.execute(ROLLUPS.select().order_by("property_id", "month")).all()
+    with engine.begin() as conn:
+        rollups.rebuild(conn)
+    with engine.connect() as conn:
+        after = conn.execute(ROLLUPS.select().order_by("property_id", "month")).all()
+    nonzero = lambda rows: [row for row in rows if any(row._mapping[name] for name in rollups.MEASURES)]
+    assert nonzero(after) == nonzero(before)
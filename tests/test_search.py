@@ -0,0 +1,62 @@
+"""Tìm kiếm tài sản không dấu: keyword (lọc) và q (xếp hạng)."""
+import pytest
+
+from app import models
+from app.database import SessionLocal
+from app.search import normalize
+
+
+def names(client, **params) -> list:
+    response = client.get("/properties/", params=params)
+    assert response.status_code == 200, response.text
+    return [item["name"] for item in response.json()["items"]]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def listings(create_property):
+    create_property(name="Homestay Xuyên Mộc view biển", address="Bà Rịa - Vũng Tàu")
+    create_property(name="Nhà nghỉ Hồ Tràm", address="Xuyên Mộc, Bà Rịa - Vũng Tàu", description="Gần biển")
+    create_property(name="Xe máy Xuyên Mộc", address="Bà Rịa", category="vehicle", description="Giảm 50% cuối tuần")
+
+
+def test_normalize():
+    assert normalize("  Phòng   trọ ĐÀ Lạt ") == "phong tro da lat"
+
+
+@pytest.mark.parametrize("keyword", ["xuyen moc", "XUYÊN MỘC", "Xuyên  mộc"])
+def test_keyword_ignores_accents_and_case(client, keyword):
+    assert names(client, keyword=keyword) == [
+        "Homestay Xuyên Mộc view biển", "Nhà nghỉ Hồ Tràm", "Xe máy Xuyên Mộc",
+    ]
+
+
+def test_every_word_must_match(client):
+    assert names(client, keyword="xuyen moc bien") == ["Homestay Xuyên Mộc view biển", "Nhà nghỉ Hồ Tràm"]
+    assert names(client, keyword="xuyen moc bien", category="vehicle") == []
+
+
+def test_like_wildcards_are_literal(client):
+    assert names(client, keyword="xuyen 50%") == ["Xe máy Xuyên Mộc"]
+    assert names(client, keyword="xuyen _0") == []
+
+
+def test_ranked_search_puts_name_prefix_first(client):
+    response = client.get("/properties/", params={"q": "xe may xuyen"}).json()
+    assert response["items"][0]["name"] == "Xe máy Xuyên Mộc"
+    assert response["next_cursor"] is None
+
+    assert names(client, q="xuyen moc")[:1] != ["Nhà nghỉ Hồ Tràm"]
+
+
+def test_search_text_follows_updates(client, create_property):
+    prop = create_property(name="Căn Thủ Thiêm", address="Quận 2")
+    assert names(client, keyword="thu thiem") == ["Căn Thủ Thiêm"]
+
+    db = SessionLocal()
+    try:
+        db.get(models.Property, prop["id"]).name = "Căn Sala"
+        db.commit()
+    finally:
+        db.close()
+    assert names(client, keyword="thu thiem") == []
+    assert names(client, keyword="can sala") == ["Căn Sala"]
@@ -0,0 +1,49 @@
+"""Khởi động: import không chạm DB, lifespan nạp sẵn id ông chủ, DB chưa sẵn sàng vẫn lên được."""
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+from app import main
+
+ROOT = Path(__file__).resolve().parent.parent
+# Thư mục không tồn tại: tạo engine được, mọi lần kết nối đều lỗi
+UNREACHABLE_DB = "sqlite:////nonexistent-dir/rental.db"
+
+
+def run_python(code: str, **env) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-c", textwrap.dedent(code)], cwd=ROOT, capture_output=True, text=True, timeout=60,
+        env={**os.environ, "DATABASE_URL": UNREACHABLE_DB, "TEST_DATABASE_URL": "", **env},
+    )
+
+
+def test_ready_after_lifespan(client):
+    state = client.get("/health/ready").json()
+    assert state["ready"] is True
+    assert state["migrations"] in ("applied", "up_to_date")
+    assert {"owner_id", "total"} <= set(state["timings_ms"])
+
+
+def test_owner_id_is_loaded_once(client, create_property):
+    assert main._owner_id is not None
+    assert create_property()["owner_id"] == create_property()["owner_id"] == main._owner_id
+
+
+def test_import_does_not_touch_the_database():
+    result = run_python("import app.main; print('imported')")
+    assert result.returncode == 0, result.stderr
+    assert "imported" in result.stdout
+
+
+def test_starts_without_a_database():
+    result = run_python("""
+        from fastapi.testclient import TestClient
+        from app.main import app
+        with TestClient(app) as client:
+            response = client.get("/health/ready")
+            print(response.status_code, response.json()["ready"])
+    """, MIGRATE_ON_STARTUP="false")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "200 True"
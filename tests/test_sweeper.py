@@ -0,0 +1,51 @@
+"""Quét trạng thái hằng ngày (/sweeper/run): hợp đồng hết hạn -> completed, tài sản rented / available."""
+from sqlalchemy import update
+
+from app import models
+from app.database import SessionLocal
+
+STEPS = ("contracts_completed", "properties_released", "properties_rented")
+
+
+def sweep(client) -> dict:
+    response = client.post("/sweeper/run")
+    assert response.status_code == 200
+    return response.json()
+
+
+def status_of(model, row_id: int) -> str:
+    with SessionLocal() as db:
+        return db.get(model, row_id).status
+
+
+def set_property_status(property_id: int, status: str):
+    with SessionLocal() as db:
+        db.execute(update(models.Property).where(models.Property.id == property_id).values(status=status))
+        db.commit()
+
+
+def test_sweeper_transitions(client, create_property, create_contract):
+    expired = create_contract(create_property()["id"], -30, -20)
+    current_prop, released_prop, future_prop = (create_property() for _ in range(3))
+    create_contract(current_prop["id"], -3, 3)
+    create_contract(future_prop["id"], 5, 10)
+    # Lệch trạng thái: tài sản có hợp đồng phủ hôm nay lại "available" và ngược lại
+    set_property_status(current_prop["id"], "available")
+    set_property_status(released_prop["id"], "rented")
+
+    report = sweep(client)
+    assert all(report[step] >= 1 for step in STEPS)
+
+    assert status_of(models.Contract, expired["id"]) == "completed"
+    assert status_of(models.Property, current_prop["id"]) == "rented"
+    assert status_of(models.Property, released_prop["id"]) == "available"
+    assert status_of(models.Property, future_prop["id"]) == "available"
+
+
+def test_sweeper_is_idempotent(client, create_property, create_contract):
+    create_contract(create_property()["id"], -10, -5)
+    sweep(client)
+    assert {step: sweep(client)[step] for step in STEPS} == dict.fromkeys(STEPS, 0)
+
+    last = client.get("/health/jobs").json()["sweeper"]
+    assert last["status"] == "done"
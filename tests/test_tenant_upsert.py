@@ -0,0 +1,39 @@
+"""Tạo / tìm khách thuê bằng 1 câu INSERT ... ON CONFLICT ngay trong lúc tạo hợp đồng."""
+from app.profiling import assert_max_queries
+
+
+def user_statements(profile) -> list:
+    return [stat.sql for stat in profile.statements.values() if " users " in f" {stat.sql} "]
+
+
+def test_new_and_existing_tenant_use_one_statement(client, create_property, create_contract):
+    prop = create_property()["id"]
+    with assert_max_queries(8) as requests:
+        first = create_contract(prop, 500, 505, tenant_email="upsert@example.com")
+    with assert_max_queries(8) as again:
+        second = create_contract(prop, 510, 515, tenant_email="upsert@example.com")
+
+    assert first["tenant_id"] == second["tenant_id"]
+    for profile in (requests[0], again[0]):
+        statements = user_statements(profile)
+        assert len(statements) == 1 and statements[0].startswith("INSERT INTO users")
+
+
+def test_tenant_is_listed_once(client, create_property, create_contract):
+    prop = create_property()["id"]
+    for start in (520, 530):
+        create_contract(prop, start, start + 3, tenant_email="mot-lan@example.com")
+    users = client.get("/users/", params={"role": "user", "limit": 1000}).json()["items"]
+    assert [user["email"] for user in users].count("mot-lan@example.com") == 1
+
+
+def test_rejected_booking_creates_no_tenant(client, create_property, create_contract, days):
+    prop = create_property()["id"]
+    create_contract(prop, 540, 545)
+    response = client.post("/contracts/", json={
+        "property_id": prop, "tenant_email": "bi-tu-choi@example.com", "deposit": 0,
+        "start_date": days(542), "end_date": days(548),
+    })
+    assert response.status_code == 409
+    users = client.get("/users/", params={"limit": 1000}).json()["items"]
+    assert "bi-tu-choi@example.com" not in {user["email"] for user in users}
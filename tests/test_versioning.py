@@ -0,0 +1,63 @@
+"""Version theo bảng (ETag / 304) và tăng version sau commit."""
+from sqlalchemy import select
+
+from app import models, versioning
+from app.database import engine
+
+
+def version_of(table: str) -> int:
+    with engine.connect() as conn:
+        return conn.execute(
+            select(models.ChangeVersion.version).where(models.ChangeVersion.table_name == table)
+        ).scalar_one()
+
+
+def test_list_returns_304_until_the_table_changes(client, create_property):
+    first = client.get("/properties/", params={"limit": 1})
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    cached = client.get("/properties/", params={"limit": 1}, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert cached.content == b""
+
+    create_property()
+    changed = client.get("/properties/", params={"limit": 1}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_writes_to_other_tables_keep_the_etag(client, create_property, create_contract, days):
+    contract = create_contract(create_property()["id"], -300, -290)
+    path = f"/contracts/{contract['id']}/payments"
+    etag = client.get(path).headers["etag"]
+
+    # /contracts/{id}/payments chỉ phụ thuộc bảng payments
+    client.post("/damage-reports/", json={
+        "contract_id": contract["id"], "property_id": contract["property_id"], "description": "Trầy",
+        "reported_date": days(-295),
+    })
+    assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/payments/", json={"contract_id": contract["id"], "amount": 5, "payment_date": days(-295)})
+    assert client.get(path, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_failed_bump_is_retried_then_carried_over(client, monkeypatch):
+    real_bump, calls = versioning.bump, []
+
+    def failing_bump(conn, tables):
+        calls.append(sorted(tables))
+        raise RuntimeError("mất kết nối")
+
+    before = version_of("payments")
+    monkeypatch.setattr(versioning, "bump", failing_bump)
+    assert versioning.bump_committed(engine, ["payments"]) is False
+    assert calls == [["payments"]] * versioning.BUMP_ATTEMPTS
+    assert version_of("payments") == before
+
+    # Lần commit sau (bảng khác) tăng bù luôn bảng đã lỡ
+    monkeypatch.setattr(versioning, "bump", real_bump)
+    assert versioning.bump_committed(engine, ["users"]) is True
+    assert version_of("payments") == before + 1